@@ -6,6 +6,11 @@ from django.contrib import messages
 from django.core.exceptions import ValidationError
 from django.urls import reverse
 from django.utils.html import format_html
+from apps.orgs.cache_utils import bump_organization_cache_versions
+from apps.orgs.counters import recount_organization_counters
+from core.pagination import ApproximateCountAdminMixin
+from core.search import IndexedSearchMixin
+from .backends import invalidate_cached_users
 from .models import User
 
 
@@ -55,13 +60,14 @@ class UserChangeForm(forms.ModelForm):
         return self.initial["password"]
 
 
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(ApproximateCountAdminMixin, IndexedSearchMixin, BaseUserAdmin):
     form = UserChangeForm
     add_form = UserCreationForm
 
     list_display = ('email', 'full_name', 'get_organization_link', 'get_role_display', 'is_active', 'date_joined')
     list_filter = ('is_active', 'is_staff', 'is_org_admin', 'organization', 'date_joined')
     readonly_fields = ('date_joined', 'last_login', 'get_organization_link')
+    list_select_related = ('organization',)
     
     # Acciones útiles pero simples
     actions = ['activate_users', 'deactivate_users', 'make_org_admin', 'remove_org_admin']
@@ -93,7 +99,9 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
     
+    # La búsqueda usa search_text indexado (core.search), también por nombre de organización
     search_fields = ('email', 'first_name', 'last_name', 'organization__name')
+    search_related = ('organization',)
     ordering = ('-date_joined',)
     
     def full_name(self, obj):
@@ -104,7 +112,7 @@ class UserAdmin(BaseUserAdmin):
     def get_organization_link(self, obj):
         """Link a la organización"""
         if obj.organization:
-            org_url = reverse('admin:orgs_organization_change', args=[obj.organization.pk])
+            org_url = reverse('admin:orgs_organization_change', args=[obj.organization_id])
             return format_html('<a href="{}">{}</a>', org_url, obj.organization.name)
         return 'Sin organización'
     get_organization_link.short_description = 'Organización'
@@ -121,10 +129,25 @@ class UserAdmin(BaseUserAdmin):
             return format_html('<span style="color: gray;">👤 Usuario</span>')
     get_role_display.short_description = 'Rol'
     
+    def _update_users(self, queryset, **values):
+        """
+        QuerySet.update no pasa por User.save: recalcular contadores e invalidar
+        cache. Las filas se fijan ANTES del update: el queryset conserva los
+        filtros del changelist (p.ej. is_active) y después ya no coincidiría.
+        """
+        rows = list(queryset.values_list('pk', 'organization_id'))
+        pks = [pk for pk, _ in rows]
+        organization_ids = {organization_id for _, organization_id in rows if organization_id}
+        updated = User.objects.filter(pk__in=pks).update(**values)
+        recount_organization_counters(organization_ids)
+        bump_organization_cache_versions(organization_ids)
+        invalidate_cached_users(pks)
+        return updated
+    
     # Acciones útiles
     def activate_users(self, request, queryset):
         """Activar usuarios seleccionados"""
-        updated = queryset.update(is_active=True)
+        updated = self._update_users(queryset, is_active=True)
         self.message_user(
             request,
             f"✅ Se activaron {updated} usuarios correctamente.",
@@ -134,7 +157,7 @@ class UserAdmin(BaseUserAdmin):
     
     def deactivate_users(self, request, queryset):
         """Desactivar usuarios seleccionados"""
-        updated = queryset.update(is_active=False)
+        updated = self._update_users(queryset, is_active=False)
         self.message_user(
             request,
             f"❌ Se desactivaron {updated} usuarios correctamente.",
@@ -144,7 +167,7 @@ class UserAdmin(BaseUserAdmin):
     
     def make_org_admin(self, request, queryset):
         """Convertir en administradores de organización"""
-        updated = queryset.update(is_org_admin=True)
+        updated = self._update_users(queryset, is_org_admin=True)
         self.message_user(
             request,
             f"👨‍💼 Se convirtieron {updated} usuarios en administradores de organización.",
@@ -154,7 +177,7 @@ class UserAdmin(BaseUserAdmin):
     
     def remove_org_admin(self, request, queryset):
         """Quitar permisos de administrador de organización"""
-        updated = queryset.update(is_org_admin=False)
+        updated = self._update_users(queryset, is_org_admin=False)
         self.message_user(
             request,
             f"👤 Se removieron permisos de admin de org a {updated} usuarios.",
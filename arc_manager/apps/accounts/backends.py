@@ -0,0 +1,214 @@
+"""
+Carga cacheada del usuario autenticado.
+
+``AuthenticationMiddleware`` llama en cada request a ``backend.get_user(id)``,
+que con ``ModelBackend`` es una consulta; después los middlewares de tenant
+leen ``request.user.organization`` (otra consulta). ``CachedModelBackend``
+resuelve el usuario desde un cache de dos niveles:
+
+1. LRU en memoria del proceso, con TTL corto (``USER_CACHE_LOCAL_TTL``).
+2. Cache compartido (Redis), con ``USER_CACHE_TIMEOUT``. La entrada guarda la
+   versión del usuario con la que se construyó; un solo ``get_many`` trae la
+   entrada y la versión vigente.
+
+Si ambos fallan, UNA consulta trae usuario + organización + suscripción +
+plan + alerta y deja cacheado también el snapshot de la organización.
+
+La organización se adjunta desde su snapshot versionado
+(``apps.orgs.cache_utils``), que ya se invalida al cambiar organización,
+suscripción, plan o pagos. Con ambos caches calientes identificar al usuario y
+su tenant no hace consultas.
+
+La versión del usuario se incrementa al guardar o borrar el usuario (cambio de
+contraseña incluido) y en las acciones masivas del admin. Otros workers pueden
+servir su copia local hasta ``USER_CACHE_LOCAL_TTL`` segundos.
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from core.cache import LocalLRUCache
+
+logger = logging.getLogger(__name__)
+
+# Vigencia de la entrada en el cache compartido
+USER_CACHE_TIMEOUT = getattr(settings, 'USER_CACHE_TIMEOUT', 5 * 60)
+
+# Vigencia y tamaño del LRU en memoria de cada worker
+USER_CACHE_LOCAL_TTL = getattr(settings, 'USER_CACHE_LOCAL_TTL', 5)
+USER_CACHE_LOCAL_SIZE = getattr(settings, 'USER_CACHE_LOCAL_SIZE', 1000)
+
+
+def _user_key(user_id):
+    return f"auth_user:{user_id}"
+
+
+def _user_version_key(user_id):
+    return f"auth_user_version:{user_id}"
+
+
+local_users = LocalLRUCache(max_size=USER_CACHE_LOCAL_SIZE, ttl=USER_CACHE_LOCAL_TTL)
+
+
+# =============================================================================
+# Serialización
+# =============================================================================
+
+def _user_to_dict(user):
+    """
+    Campos del usuario SIN el hash de la contraseña. La sesión solo necesita
+    get_session_auth_hash(): se guarda ya calculado.
+    """
+    return {
+        'fields': {
+            field.attname: getattr(user, field.attname)
+            for field in user._meta.concrete_fields
+            if field.attname != 'password'
+        },
+        'session_auth_hash': user.get_session_auth_hash(),
+    }
+
+
+def _user_from_dict(data):
+    """Instancia con `password` diferido (se consulta solo si algo lo lee, p.ej. check_password)"""
+    fields = data['fields']
+    user = get_user_model().from_db(DEFAULT_DB_ALIAS, list(fields), list(fields.values()))
+    session_auth_hash = data['session_auth_hash']
+
+    def get_session_auth_hash():
+        # Si la contraseña se cargó o cambió en este request, el hash real
+        if 'password' in user.__dict__:
+            return type(user).get_session_auth_hash(user)
+        return session_auth_hash
+
+    user.get_session_auth_hash = get_session_auth_hash
+    return user
+
+
+def _attach_organization(user):
+    """Cachea request.user.organization desde su snapshot (sin consultas si está en cache)"""
+    from apps.orgs.cache_utils import get_organization_snapshot, organization_from_snapshot
+
+    if not user.organization_id:
+        return user
+    snapshot, organization = get_organization_snapshot(user.organization_id)
+    if snapshot is None:
+        return user
+    if organization is None:
+        organization = organization_from_snapshot(snapshot)
+    user._meta.get_field('organization').set_cached_value(user, organization)
+    # TenantContext reutiliza el snapshot en lugar de volver a leerlo
+    user._tenant_snapshot = snapshot
+    return user
+
+
+# =============================================================================
+# Carga
+# =============================================================================
+
+def _load_from_db(user_id):
+    """Usuario + organización + suscripción + plan + alerta en UNA consulta"""
+    from apps.orgs.cache_utils import prime_organization_snapshot
+
+    User = get_user_model()
+    user = (
+        User._default_manager
+        .select_related('organization__subscription__plan', 'organization__alert')
+        .filter(pk=user_id)
+        .first()
+    )
+    if user is None:
+        return None, None
+    snapshot = None
+    if user.organization_id:
+        try:
+            snapshot = prime_organization_snapshot(user.organization)
+        except Exception as e:
+            logger.warning(f"No se pudo cachear el snapshot de la organización {user.organization_id}: {e}")
+    return user, snapshot
+
+
+def get_cached_user(user_id):
+    """
+    Usuario activo o no (la validación la hace el backend) con su organización
+    adjunta, o None si no existe. Cache local -> cache compartido -> BD.
+    """
+    data = local_users.get(user_id)
+    if data is None:
+        try:
+            cached = cache.get_many([_user_key(user_id), _user_version_key(user_id)])
+        except Exception as e:
+            logger.warning(f"Cache de usuarios no disponible: {e}")
+            cached = None
+
+        if cached is not None:
+            version = cached.get(_user_version_key(user_id), 1)
+            entry = cached.get(_user_key(user_id))
+            # Las entradas sin 'fields' son del formato anterior (con la contraseña)
+            if entry is not None and entry['version'] == version and 'fields' in entry['user']:
+                data = entry['user']
+
+        if data is None:
+            user, snapshot = _load_from_db(user_id)
+            if user is None:
+                return None
+            data = _user_to_dict(user)
+            if cached is not None:
+                try:
+                    cache.set(_user_key(user_id), {'version': version, 'user': data}, USER_CACHE_TIMEOUT)
+                except Exception as e:
+                    logger.warning(f"No se pudo cachear el usuario {user_id}: {e}")
+            local_users.set(user_id, data)
+            if snapshot is not None:
+                # La organización ya viene del select_related; solo se comparte el snapshot
+                user._tenant_snapshot = snapshot
+            return user
+
+        local_users.set(user_id, data)
+
+    # Instancia nueva por request: los cambios en memoria no afectan al cache
+    user = _user_from_dict(data)
+    try:
+        return _attach_organization(user)
+    except Exception as e:
+        logger.warning(f"No se pudo adjuntar la organización del usuario {user_id}: {e}")
+        return user
+
+
+def invalidate_cached_user(user_id):
+    """Descarta la copia local e incrementa la versión compartida del usuario"""
+    local_users.delete(user_id)
+    key = _user_version_key(user_id)
+    try:
+        # La versión implícita es 1: si la clave no existe la creamos ya en 2
+        if cache.add(key, 2, None):
+            return
+        try:
+            cache.incr(key)
+        except ValueError:
+            # La clave se desalojó entre add() e incr()
+            cache.set(key, 2, None)
+    except Exception as e:
+        logger.warning(f"No se pudo invalidar el cache del usuario {user_id}: {e}")
+
+
+def invalidate_cached_users(user_ids):
+    """Invalida varios usuarios (p.ej. tras un queryset.update() sin señales)"""
+    for user_id in set(user_ids):
+        invalidate_cached_user(user_id)
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend cuyo get_user (una vez por request) sale del cache de usuarios"""
+
+    def get_user(self, user_id):
+        try:
+            user_id = get_user_model()._meta.pk.to_python(user_id)
+        except Exception:
+            return None
+        user = get_cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
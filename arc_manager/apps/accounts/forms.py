@@ -1,7 +1,9 @@
 from django import forms
-from django.contrib.auth.forms import AuthenticationForm
+from django.contrib.auth.forms import AuthenticationForm, PasswordResetForm
+from django.core.mail import EmailMultiAlternatives
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.template.loader import render_to_string
 
 class CustomAuthenticationForm(AuthenticationForm):
     error_messages = {
@@ -30,4 +32,24 @@ class CustomAuthenticationForm(AuthenticationForm):
             # Si ocurre un error, asegúrate de que use los mensajes en español
             if hasattr(e, 'message') and e.message == 'Please enter a correct username and password. Note that both fields may be case-sensitive.':
                 e.message = self.error_messages['invalid_login']
-            raise e
\ No newline at end of file
+            raise e
+
+class OutboxPasswordResetForm(PasswordResetForm):
+    """PasswordResetForm que encola el email en el outbox en lugar de enviarlo en el request"""
+    
+    def send_mail(self, subject_template_name, email_template_name, context,
+                  from_email, to_email, html_email_template_name=None):
+        from apps.main.outbox import enqueue_email
+        
+        subject = render_to_string(subject_template_name, context)
+        # El asunto no debe tener saltos de línea
+        subject = ''.join(subject.splitlines())
+        body = render_to_string(email_template_name, context)
+        
+        email_message = EmailMultiAlternatives(subject, body, from_email, [to_email])
+        if html_email_template_name is not None:
+            html_email = render_to_string(html_email_template_name, context)
+            email_message.attach_alternative(html_email, 'text/html')
+        
+        # El enlace de reseteo es una credencial: se borra al entregarse
+        enqueue_email(email_message, category='password_reset', sensitive=True)
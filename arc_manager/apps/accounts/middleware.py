@@ -4,10 +4,12 @@ from django.urls import reverse
 from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 from django.contrib import messages
-from django.http import HttpResponseServerError
+from django.core.exceptions import BadRequest, PermissionDenied, SuspiciousOperation
+from django.http import Http404, HttpResponseServerError
 from django.template import loader
 import logging
-import re
+
+from core.routing import classify_path, classify_request
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +23,7 @@ class LoginRequiredMiddleware:
     
     def __init__(self, get_response):
         self.get_response = get_response
-        # URLs que son accesibles sin autenticación
-        self.exempt_urls = [re.compile(url) for url in getattr(settings, 'LOGIN_EXEMPT_URLS', [])]
+        # URLs accesibles sin autenticación: LOGIN_EXEMPT_URLS, compiladas en core.routing
         # URL de login
         self.login_url = getattr(settings, 'LOGIN_URL', '/accounts/login/')
 
@@ -36,6 +37,10 @@ class LoginRequiredMiddleware:
         Si el usuario no está autenticado y la URL no está en la lista de excepciones,
         redirigir al login.
         """
+        return self.process_request(request)
+
+    def process_request(self, request):
+        """Verificación de autenticación; también usada como etapa de apps.orgs.pipeline"""
         
         # Si el usuario ya está autenticado, continuar
         if request.user.is_authenticated:
@@ -44,7 +49,7 @@ class LoginRequiredMiddleware:
         path = request.path_info.lstrip('/')
         
         # Verificar si la URL actual está en la lista de URLs exentas
-        if path == self.login_url.lstrip('/') or any(pattern.match(path) for pattern in self.exempt_urls):
+        if classify_request(request).login_exempt:
             return None  # Permitir acceso sin autenticación
         
         # Si llegamos aquí, redirigir al login
@@ -58,18 +63,23 @@ class SuperuserRestrictMiddleware:
     
     def __init__(self, get_response):
         self.get_response = get_response
-        # URLs exentas del bloqueo de superuser (admin, logout, etc.)
-        self.exempt_urls = [
-            re.compile(r'^admin/.*$'),
-            re.compile(r'^accounts/logout/?$'),
-            re.compile(r'^accounts/login/?$'),  # Permitir acceso al login también
-            re.compile(r'^static/.*$'),
-            re.compile(r'^media/.*$'),
-        ]
+        # URLs exentas del bloqueo de superuser (admin, logout, login, estáticos):
+        # atributo superuser_allowed de core.routing
 
     def __call__(self, request):
+        response = self.process_request(request)
+        if response is not None:
+            return response
+        
+        response = self.get_response(request)
+        return response
+    
+    def process_request(self, request):
+        """Restricciones de superuser; también usada como etapa de apps.orgs.pipeline"""
+        route = classify_request(request)
+        
         # Verificar acceso al admin
-        if request.path.startswith('/admin/'):
+        if route.is_admin:
             if not request.user.is_authenticated:
                 return redirect(settings.LOGIN_URL)
             
@@ -89,26 +99,23 @@ class SuperuserRestrictMiddleware:
                     "Bienvenido al panel administrativo. Desde aquí puedes gestionar todo el sistema."
                 )
                 # Marcar como mostrado para esta sesión específica
+                # (SessionMiddleware guarda la sesión modificada al responder)
                 request.session['admin_welcome_shown'] = True
-                # Forzar guardar la sesión
-                request.session.save()
         
         # IMPORTANTE: Evitar que los superusuarios accedan a la aplicación principal
         # Solo deben usar el admin panel
         elif request.user.is_authenticated and request.user.is_superuser:
             # Permitir acceso a logout y URLs estáticas
-            path = request.path.lstrip('/')
-            if not any(pattern.match(path) for pattern in self.exempt_urls):
+            if not route.superuser_allowed:
                 # Si un superusuario intenta acceder a cualquier parte de la app que no sea admin
                 # redirigirlo al admin sin mostrar mensaje adicional
                 return redirect('/admin/')
         
-        response = self.get_response(request)
-        return response
+        return None
     
     def _is_exempt_url(self, path):
         """Verifica si la URL está exenta del bloqueo de superuser"""
-        return any(pattern.match(path) for pattern in self.exempt_urls)
+        return classify_path('/' + path.lstrip('/')).superuser_allowed
 
 
 class ErrorHandlingMiddleware(MiddlewareMixin):
@@ -121,6 +128,10 @@ class ErrorHandlingMiddleware(MiddlewareMixin):
         """
         Procesar excepciones no capturadas
         """
+        if isinstance(exception, (Http404, PermissionDenied, BadRequest, SuspiciousOperation)):
+            # Errores del cliente: Django responde 404/403/400 con sus handlers
+            return None
+        
         if not settings.DEBUG:
             # En producción, loggear el error y mostrar página amigable
             logger.error(
@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+from core.search import build_search_text, create_search_index, drop_search_index
+
+
+def backfill_search_text(apps, schema_editor):
+    """Calcula search_text de los usuarios existentes"""
+    User = apps.get_model('accounts', 'User')
+    users = list(User.objects.only('pk', 'first_name', 'last_name', 'email', 'username'))
+    for user in users:
+        user.search_text = build_search_text(user.first_name, user.last_name, user.email, user.username)
+    User.objects.bulk_update(users, ['search_text'], batch_size=1000)
+
+
+def create_index(apps, schema_editor):
+    create_search_index(schema_editor, apps.get_model('accounts', 'User')._meta.db_table)
+
+
+def drop_index(apps, schema_editor):
+    drop_search_index(schema_editor, apps.get_model('accounts', 'User')._meta.db_table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_username'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Texto de búsqueda'),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        # PostgreSQL: GIN trigram (pg_trgm); SQLite: tabla FTS5 con triggers
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_search_text'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('orgs', '0004_search_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['organization', '-date_joined', '-id'], name='user_org_joined_idx'),
+        ),
+    ]
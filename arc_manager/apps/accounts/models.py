@@ -1,7 +1,11 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from uuid import uuid4
 
+from core.search import build_search_text
+from apps.orgs.counters import COUNTER_FIELDS, apply_user_counter_delta, user_counter_state
+from apps.orgs.seats import reserve_seat
+
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -47,12 +51,44 @@ class User(AbstractUser):
         null=True, 
         blank=True
     )
+    # Nombre, apellido, email y username normalizados (core.search), con índice trigram/FTS5
+    search_text = models.TextField("Texto de búsqueda", blank=True, default='', editable=False)
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
     
     objects = CustomUserManager()
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Estado guardado, para actualizar los contadores de la organización por diferencia
+        if all(field in field_names for field in COUNTER_FIELDS):
+            instance._counter_state = user_counter_state(instance)
+        return instance
+    
+    def _stored_counter_state(self):
+        """Estado de contadores en la BD antes de este save (None si es nuevo)"""
+        if self._state.adding:
+            return None
+        if hasattr(self, '_counter_state'):
+            return self._counter_state
+        stored = type(self).objects.filter(pk=self.pk).values_list(*COUNTER_FIELDS).first()
+        return (stored[0], bool(stored[1]), bool(stored[2])) if stored else None
+    
+    SEARCH_SOURCE_FIELDS = ('first_name', 'last_name', 'email', 'username')
+    
+    def get_search_text(self):
+        return build_search_text(*(getattr(self, field) for field in self.SEARCH_SOURCE_FIELDS))
+    
+    @staticmethod
+    def _joins_organization(old_state, new_state):
+        """Un usuario activo entra a una organización (alta o cambio de organización)"""
+        organization_id, is_active, _ = new_state
+        if organization_id is None or not is_active:
+            return False
+        return old_state is None or old_state[0] != organization_id
+    
     def save(self, *args, **kwargs):
         if not self.username:
             # Generar un username único y corto basado en el email
@@ -65,7 +101,34 @@ class User(AbstractUser):
                 unique_id = str(uuid4()).split('-')[0][:4]
                 self.username = f"{base_username}_{unique_id}"
 
-        super().save(*args, **kwargs)
+        self.search_text = self.get_search_text()
+        if kwargs.get('update_fields') is not None and set(kwargs['update_fields']) & set(self.SEARCH_SOURCE_FIELDS):
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'search_text'}
+
+        old_state = self._stored_counter_state()
+        if old_state is not None:
+            # Lo lee el post_save (apps.orgs.signals) para invalidar también la organización anterior
+            self._counter_state = old_state
+        new_state = user_counter_state(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and old_state is not None:
+            # Los campos fuera de update_fields no cambian en la BD
+            update_fields = set(update_fields)
+            new_state = tuple(
+                new if field in update_fields or field.replace('_id', '') in update_fields else old
+                for field, old, new in zip(COUNTER_FIELDS, old_state, new_state)
+            )
+
+        # Reserva del asiento, usuario y contadores de la organización en la misma transacción
+        with transaction.atomic(using=kwargs.get('using')):
+            if self._joins_organization(old_state, new_state):
+                reserve_seat(new_state[0], using=kwargs.get('using'))
+            super().save(*args, **kwargs)
+            apply_user_counter_delta(
+                old_state, new_state,
+                organizations=[self._state.fields_cache.get('organization')],
+            )
+        self._counter_state = new_state
 
     def __str__(self):
         """Mostrar nombre completo o email como fallback"""
@@ -108,6 +171,10 @@ class User(AbstractUser):
         return self.is_org_admin and self.organization
     
     class Meta:
+        # Listado de usuarios por organización con paginación por cursor
+        indexes = [
+            models.Index(fields=['organization', '-date_joined', '-id'], name='user_org_joined_idx'),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=models.Q(is_superuser=True) | models.Q(organization__isnull=False) | models.Q(is_active=False),
@@ -1,6 +1,8 @@
-from django.db.models.signals import pre_save, post_save
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError
+from .backends import invalidate_cached_user
 from .models import User
 
 
@@ -15,18 +17,8 @@ def validate_user_organization(sender, instance, **kwargs):
         )
 
 
-@receiver(pre_save, sender=User)
-def validate_organization_limits(sender, instance, **kwargs):
-    """Validar límites de organización al crear/editar usuarios"""
-    if (instance.organization and 
-        instance.is_active and 
-        not instance.pk):  # Solo para nuevos usuarios
-        
-        if not instance.organization.can_add_user():
-            raise ValidationError(
-                f"La organización {instance.organization.name} "
-                f"ha alcanzado su límite de usuarios"
-            )
+# La validación de límites de organización ahora la hace User.save con
+# apps.orgs.seats.reserve_seat (bloqueo de fila, en la misma transacción del alta)
 
 
 # El signal auto_generate_username ya no es necesario porque eliminamos el campo username
@@ -75,4 +67,11 @@ def log_user_creation(sender, instance, created, **kwargs):
         
         logger.info(
             f"Usuario creado: {instance.email} ({role}) en {org_name}"
-        ) 
\ No newline at end of file
+        ) 
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Invalida el usuario cacheado por CachedModelBackend (incluye cambios de contraseña)"""
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
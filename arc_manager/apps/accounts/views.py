@@ -4,12 +4,15 @@ from django.contrib.auth.views import LoginView, PasswordResetView
 from django.contrib.auth import logout, login
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.core.cache import cache
-from .forms import CustomAuthenticationForm
+from core.cache import tiered_cache
+from django.utils.decorators import method_decorator
+from apps.orgs.ratelimit import rate_limit
+from .forms import CustomAuthenticationForm, OutboxPasswordResetForm
 import logging
 
 logger = logging.getLogger('app')
 
+@method_decorator(rate_limit('login'), name='dispatch')
 class CustomLoginView(LoginView):
     template_name = 'auth/login.html'
     authentication_form = CustomAuthenticationForm
@@ -106,7 +109,9 @@ class CustomLogoutView(View):
         logout(request)
         return redirect('accounts:login')
 
+@method_decorator(rate_limit('password_reset'), name='dispatch')
 class SecurePasswordResetView(PasswordResetView):
+    form_class = OutboxPasswordResetForm
     template_name = 'auth/password_reset.html'
     email_template_name = 'auth/password_reset_email.html'
     subject_template_name = 'auth/password_reset_subject.txt'
@@ -116,12 +121,11 @@ class SecurePasswordResetView(PasswordResetView):
         email = form.cleaned_data['email']
         cache_key = f"password_reset_{email}"
         
-        # Verificar si ya hay una solicitud reciente
-        if cache.get(cache_key):
+        # Verificar y registrar la solicitud en una sola operación atómica
+        # (add solo escribe si no existe), válida por 15 minutos. Siempre contra
+        # el cache compartido: una copia en memoria no serviría entre workers
+        if not tiered_cache.add(cache_key, True, timeout=900, namespace='password_reset'):
             messages.info(self.request, "Ya enviamos instrucciones. Revisa tu correo o espera 15 minutos para solicitar otro.", extra_tags='password_reset')
             return self.form_invalid(form)
         
-        # Guardar en cache por 15 minutos
-        cache.set(cache_key, True, timeout=900)
-        
         return super().form_valid(form)
\ No newline at end of file
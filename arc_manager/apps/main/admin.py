@@ -1,3 +1,40 @@
 from django.contrib import admin
+from django.utils import timezone
 
-# Register your models here.
+from core.pagination import ApproximateCountAdminMixin, CursorPaginationAdminMixin
+
+from .models import DailyMetric, EmailOutbox
+
+
+@admin.register(DailyMetric)
+class DailyMetricAdmin(ApproximateCountAdminMixin, admin.ModelAdmin):
+    list_display = ('date', 'new_users', 'new_organizations', 'payments_count', 'payments_total',
+                    'subscriptions_ended', 'grace_periods_ended', 'updated_at')
+    date_hierarchy = 'date'
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(CursorPaginationAdminMixin, admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'category', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    list_filter = ('status', 'category')
+    search_fields = ('subject', 'to')
+    date_hierarchy = 'created_at'
+    exclude = ('body', 'html_body')
+    readonly_fields = ('category', 'to', 'from_email', 'subject', 'sensitive', 'attempts', 'max_attempts',
+                       'locked_by', 'locked_until', 'last_error', 'created_at', 'sent_at')
+    cursor_ordering = ('-created_at', '-id')
+    actions = ['retry_now']
+
+    def recipients(self, obj):
+        return ', '.join(obj.to)
+    recipients.short_description = 'Destinatarios'
+
+    def retry_now(self, request, queryset):
+        """Reencola emails fallidos o pendientes para el próximo ciclo del worker"""
+        updated = queryset.exclude(status=EmailOutbox.STATUS_SENT).update(
+            status=EmailOutbox.STATUS_PENDING, next_attempt_at=timezone.now(), attempts=0,
+            locked_by='', locked_until=None,
+        )
+        self.message_user(request, f'{updated} emails reencolados.')
+    retry_now.short_description = 'Reintentar ahora'
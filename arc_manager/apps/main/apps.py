@@ -1,7 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.main'
     label = 'main'
+
+    def ready(self):
+        from core.search import ensure_search_indexes
+        # SQLite: recrear los triggers FTS5 si una migración reconstruyó la tabla
+        post_migrate.connect(ensure_search_indexes, sender=self)
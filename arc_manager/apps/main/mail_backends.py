@@ -0,0 +1,62 @@
+"""
+Backends de email para desarrollo y pruebas sin conexión.
+
+``ThrottledLocmemBackend`` guarda los mensajes en ``mail.outbox`` como el
+backend locmem, pero rechaza (como SES) los envíos que superan
+``EMAIL_FAKE_SEND_RATE`` destinatarios por segundo y expone
+``get_send_quota()`` con esa misma velocidad. Igual que en SES, el límite es
+un token bucket: admite ráfagas cortas de hasta un segundo de cuota, no una
+velocidad sostenida mayor::
+
+    EMAIL_BACKEND = 'apps.main.mail_backends.ThrottledLocmemBackend'
+    EMAIL_FAKE_SEND_RATE = 5
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+
+from apps.orgs.ratelimit import TOKEN_EPSILON
+
+from .mailer import SendThrottled
+
+
+class ThrottledLocmemBackend(LocmemBackend):
+    """Backend locmem que simula el límite de velocidad del proveedor"""
+
+    # (tokens, actualizado) de la cuota, compartida entre conexiones como la cuenta de SES
+    _bucket = {}
+    _lock = threading.Lock()
+
+    def __init__(self, *args, max_rate=None, clock=time.monotonic, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_rate = max_rate or getattr(settings, 'EMAIL_FAKE_SEND_RATE', 5)
+        self.clock = clock
+        self.rejected = 0
+
+    def get_send_quota(self):
+        return {'Max24HourSend': 200.0, 'MaxSendRate': float(self.max_rate), 'SentLast24Hours': 0.0}
+
+    def send_messages(self, messages):
+        sent = 0
+        for message in messages:
+            recipients = len(message.recipients())
+            with self._lock:
+                now = self.clock()
+                tokens, updated = self._bucket.get('quota', (float(self.max_rate), now))
+                tokens = min(float(self.max_rate), tokens + (now - updated) * self.max_rate)
+                accepted = tokens + TOKEN_EPSILON >= recipients
+                self._bucket['quota'] = (max(0.0, tokens - recipients) if accepted else tokens, now)
+            if not accepted:
+                self.rejected += 1
+                if self.fail_silently:
+                    continue
+                raise SendThrottled("Throttling: Maximum sending rate exceeded.")
+            sent += super().send_messages([message])
+        return sent
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._bucket.clear()
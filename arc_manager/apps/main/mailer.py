@@ -0,0 +1,260 @@
+"""
+Envío de emails en lote respetando la velocidad máxima del proveedor.
+
+SES limita los destinatarios por segundo (``MaxSendRate`` de
+``get_send_quota()``); pasarse devuelve errores de throttling. ``BatchMailer``
+mantiene una sola conexión abierta, dosifica los envíos con un token bucket
+(``apps.orgs.ratelimit.LocalTokenBucket``, un token por destinatario) y agrupa
+en un solo mensaje (destinatarios en BCC) los emails con contenido idéntico.
+
+La velocidad sale de ``EMAIL_SEND_RATE`` o de la cuota de SES cacheada
+(``remember_send_quota``, que también alimentan ``diagnose_ses`` y la vista de
+prueba de SES). Sin ninguna de las dos, no se dosifica.
+
+Uso::
+
+    with BatchMailer() as mailer:
+        for outbox in batch:
+            mailer.add(build_message(outbox), key=outbox.pk)
+    for key, error in mailer.results.items():
+        ...
+"""
+import logging
+import os
+import smtplib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+
+from apps.orgs.ratelimit import LocalTokenBucket
+
+logger = logging.getLogger(__name__)
+
+SEND_QUOTA_CACHE_KEY = 'email:send_quota'
+
+# La cuota de SES cambia poco: se consulta como mucho una vez por hora
+SEND_QUOTA_CACHE_TIMEOUT = getattr(settings, 'EMAIL_SEND_QUOTA_CACHE_TIMEOUT', 60 * 60)
+
+# Destinatarios por mensaje agrupado (SES acepta hasta 50)
+MAX_RECIPIENTS = 50
+
+# Reintentos de un mensaje rechazado por throttling
+MAX_THROTTLE_RETRIES = 3
+
+# Margen bajo la velocidad máxima (los relojes del proveedor y el nuestro no coinciden)
+RATE_SAFETY_FACTOR = 0.9
+
+
+class SendThrottled(Exception):
+    """El proveedor rechazó el envío por exceder la velocidad permitida"""
+
+
+def is_throttling_error(error):
+    """Errores de throttling de SES (botocore / django-ses) o SMTP"""
+    if isinstance(error, SendThrottled):
+        return True
+    response = getattr(error, 'response', None)
+    code = response.get('Error', {}).get('Code') if isinstance(response, dict) else None
+    if code in ('Throttling', 'ThrottlingException'):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException) and error.smtp_code in (421, 454):
+        return True
+    return 'Maximum sending rate exceeded' in str(error)
+
+
+# =============================================================================
+# Cuota de envío
+# =============================================================================
+
+def remember_send_quota(quota):
+    """Cachea la respuesta de get_send_quota() (SES) para dosificar los envíos"""
+    quota = {
+        'Max24HourSend': float(quota.get('Max24HourSend', 0)),
+        'MaxSendRate': float(quota.get('MaxSendRate', 0)),
+        'SentLast24Hours': float(quota.get('SentLast24Hours', 0)),
+    }
+    cache.set(SEND_QUOTA_CACHE_KEY, quota, SEND_QUOTA_CACHE_TIMEOUT)
+    return quota
+
+
+def fetch_send_quota(connection=None):
+    """
+    Consulta la cuota al backend (si la expone) o a SES vía boto3 y la cachea.
+    Retorna None si el backend no es SES o la consulta falla.
+    """
+    try:
+        if connection is not None and hasattr(connection, 'get_send_quota'):
+            return remember_send_quota(connection.get_send_quota())
+
+        if 'django_ses' not in settings.EMAIL_BACKEND:
+            return None
+
+        import boto3
+
+        client = boto3.client(
+            'ses',
+            aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
+            aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
+            region_name=getattr(settings, 'AWS_SES_REGION_NAME', 'us-east-1'),
+        )
+        return remember_send_quota(client.get_send_quota())
+    except Exception as e:
+        logger.warning(f"No se pudo consultar la cuota de envío: {str(e)}")
+        return None
+
+
+def get_send_rate(connection=None):
+    """Destinatarios por segundo permitidos, o None si no hay que dosificar"""
+    configured = getattr(settings, 'EMAIL_SEND_RATE', None)
+    if configured:
+        return float(configured)
+
+    quota = cache.get(SEND_QUOTA_CACHE_KEY) or fetch_send_quota(connection)
+    if quota and quota.get('MaxSendRate'):
+        return quota['MaxSendRate']
+    return None
+
+
+# =============================================================================
+# Mailer
+# =============================================================================
+
+def _content_key(message):
+    """Mensajes con esta misma clave se pueden enviar como uno solo"""
+    alternatives = tuple(
+        (content, mimetype) for content, mimetype in getattr(message, 'alternatives', [])
+    )
+    if message.cc or message.bcc or message.attachments or message.extra_headers or message.reply_to:
+        return None
+    return (message.from_email, message.subject, message.body, message.content_subtype, alternatives)
+
+
+class BatchMailer:
+    """
+    Acumula mensajes y los envía por una conexión, a la velocidad permitida.
+
+    ``add(message, key)`` encola; ``flush()`` envía y deja en ``results`` el
+    error de cada key (None si se envió). Contadores en ``stats``.
+    """
+
+    def __init__(self, connection=None, rate=None, max_recipients=MAX_RECIPIENTS,
+                 max_retries=MAX_THROTTLE_RETRIES, clock=time.monotonic, sleep=time.sleep):
+        self.connection = connection or get_connection(fail_silently=False)
+        self.rate = rate if rate is not None else get_send_rate(self.connection)
+        self.max_recipients = max_recipients
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.bucket = LocalTokenBucket(max_keys=1, clock=clock)
+        self.results = {}
+        self.stats = {'sent': 0, 'queued': 0, 'throttled': 0, 'failed': 0}
+        self._groups = {}
+        self._opened = False
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self.close()
+
+    def open(self):
+        if not self._opened:
+            self.connection.open()
+            self._opened = True
+
+    def close(self):
+        if self._opened:
+            try:
+                self.connection.close()
+            finally:
+                self._opened = False
+
+    def add(self, message, key=None):
+        """Encola un mensaje; `key` identifica su resultado en `results`"""
+        key = key if key is not None else id(message)
+        content_key = _content_key(message)
+        group_key = content_key if content_key is not None else ('unique', key)
+        self._groups.setdefault(group_key, []).append((key, message))
+        self.stats['queued'] += 1
+        return key
+
+    # -- Envío ----------------------------------------------------------------
+
+    def _batches(self):
+        limit = self.max_recipients
+        if self.rate:
+            # Un mensaje no puede pedir más tokens que la capacidad del bucket
+            limit = max(1, min(limit, int(max(self.rate, 1))))
+
+        for group in self._groups.values():
+            if len(group) == 1 or any(len(message.to) != 1 for _, message in group):
+                for item in group:
+                    yield [item]
+                continue
+            for start in range(0, len(group), limit):
+                yield group[start:start + limit]
+
+    def _merge(self, batch):
+        if len(batch) == 1:
+            return batch[0][1]
+        _, first = batch[0]
+        merged = EmailMultiAlternatives(
+            subject=first.subject,
+            body=first.body,
+            from_email=first.from_email,
+            bcc=[message.to[0] for _, message in batch],
+            connection=self.connection,
+            alternatives=getattr(first, 'alternatives', None),
+        )
+        merged.content_subtype = first.content_subtype
+        return merged
+
+    def _pace(self, recipients):
+        if not self.rate:
+            return
+        # Sin ráfagas: la capacidad alcanza justo para el mensaje actual, así los
+        # envíos quedan espaciados a la velocidad permitida (también si es < 1/s)
+        capacity = float(max(recipients, 1))
+        while True:
+            result = self.bucket.hit('send', capacity, capacity / (self.rate * RATE_SAFETY_FACTOR), cost=recipients)
+            if result:
+                return
+            self.sleep(result.wait)
+
+    def _send(self, message):
+        recipients = len(message.recipients())
+        for attempt in range(self.max_retries + 1):
+            self._pace(recipients)
+            try:
+                if not self.connection.send_messages([message]):
+                    raise RuntimeError("El backend no aceptó el mensaje")
+                return None
+            except Exception as e:
+                if not is_throttling_error(e) or attempt == self.max_retries:
+                    return e
+                self.stats['throttled'] += 1
+                # El proveedor va más lento de lo que creemos: bajar la velocidad
+                if self.rate:
+                    self.rate = max(self.rate / 2, 0.1)
+                self.sleep(min(2 ** attempt, 10))
+
+    def flush(self):
+        """Envía todo lo encolado. Retorna `results` {key: error o None}"""
+        self.open()
+        batches = list(self._batches())
+        self._groups = {}
+        for batch in batches:
+            error = self._send(self._merge(batch))
+            for key, _ in batch:
+                self.results[key] = error
+            self.stats['queued'] -= len(batch)
+            self.stats['sent' if error is None else 'failed'] += len(batch)
+            if error is not None:
+                logger.warning(f"Error enviando email a {len(batch)} destinatarios: {str(error)}")
+        return self.results
@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.routing import PathRouter
+import re
+import timeit
+
+# Rutas representativas del tráfico de la aplicación
+SAMPLE_PATHS = [
+    '/main/',
+    '/users/',
+    '/users/42/edit/',
+    '/organizations/my-organization/',
+    '/plans/subscription/',
+    '/accounts/login/',
+    '/accounts/reset/MQ/set-password/',
+    '/admin/accounts/user/',
+    '/static/css/app.css',
+    '/projects/7/',
+    '/health/',
+]
+
+
+class LegacyClassifier:
+    """Las comprobaciones que cada middleware hacía por separado, antes del router compartido"""
+
+    def __init__(self):
+        self.login_exempt = [re.compile(url) for url in getattr(settings, 'LOGIN_EXEMPT_URLS', [])]
+        self.login_url = getattr(settings, 'LOGIN_URL', '/accounts/login/')
+        self.superuser_exempt = [
+            re.compile(r'^admin/.*$'),
+            re.compile(r'^accounts/logout/?$'),
+            re.compile(r'^accounts/login/?$'),
+            re.compile(r'^static/.*$'),
+            re.compile(r'^media/.*$'),
+        ]
+        self.tenant_excluded = ['/admin/', '/accounts/login/', '/accounts/logout/', '/api/', '/static/', '/media/']
+        self.always_allowed = [
+            '/admin/', '/accounts/login/', '/accounts/logout/', '/accounts/password_reset/',
+            '/plans/', '/api/check-limits/', '/static/', '/media/', '/favicon.ico',
+        ]
+        self.warning_paths = ['/dashboard/', '/users/', '/plans/']
+
+    def module(self, path):
+        if path.startswith('/dashboard/'):
+            return 'dashboard'
+        elif path.startswith('/orgs/'):
+            return 'organizations'
+        elif path.startswith('/users/'):
+            return 'users'
+        elif path.startswith('/projects/'):
+            return 'projects'
+        elif path.startswith('/reports/'):
+            return 'reports'
+        elif path.startswith('/plans/') or path.startswith('/subscription/'):
+            return 'plans'
+        elif path.startswith('/billing/'):
+            return 'billing'
+        return 'general'
+
+    def classify(self, path):
+        stripped = path.lstrip('/')
+        return (
+            stripped == self.login_url.lstrip('/') or any(p.match(stripped) for p in self.login_exempt),
+            path.startswith('/admin/'),
+            any(p.match(stripped) for p in self.superuser_exempt),
+            any(path.startswith(p) for p in self.tenant_excluded),
+            any(path.startswith(p) for p in self.always_allowed),
+            self.module(path),
+            any(path.startswith(p) for p in self.warning_paths),
+        )
+
+
+class Command(BaseCommand):
+    help = 'Microbenchmark del costo por request de clasificar rutas (middlewares antes vs router compilado)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20000,
+            help='Cantidad de pasadas sobre las rutas de ejemplo',
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        total = iterations * len(SAMPLE_PATHS)
+
+        legacy = LegacyClassifier()
+        router = PathRouter(
+            rules=getattr(settings, 'ROUTE_RULES', None),
+            login_exempt_urls=getattr(settings, 'LOGIN_EXEMPT_URLS', []),
+            login_url=getattr(settings, 'LOGIN_URL', '/accounts/login/'),
+        )
+
+        def run_legacy():
+            for path in SAMPLE_PATHS:
+                legacy.classify(path)
+
+        def run_router_cold():
+            for path in SAMPLE_PATHS:
+                router._classify(path)
+
+        def run_router():
+            for path in SAMPLE_PATHS:
+                router.classify(path)
+
+        self.stdout.write(self.style.SUCCESS(f'⏱️  Clasificando {len(SAMPLE_PATHS)} rutas x {iterations} iteraciones'))
+
+        results = [
+            ('Middlewares (antes)', timeit.timeit(run_legacy, number=iterations)),
+            ('Router sin memo', timeit.timeit(run_router_cold, number=iterations)),
+            ('Router memoizado', timeit.timeit(run_router, number=iterations)),
+        ]
+
+        baseline = results[0][1]
+        for name, elapsed in results:
+            per_request_ns = elapsed / total * 1e9
+            self.stdout.write(f'  📊 {name:<22} {per_request_ns:8.0f} ns/request  (x{baseline / elapsed:.1f})')
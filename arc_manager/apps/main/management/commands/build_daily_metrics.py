@@ -0,0 +1,74 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.main.rollups import DEFAULT_CHUNK_DAYS, build_daily_metrics, get_history_start, get_rollup_watermark
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Construye el rollup diario de métricas (incremental desde el watermark o backfill) - Para uso en cron jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='Recalcula todo el historial desde el primer día con actividad',
+        )
+        parser.add_argument(
+            '--start',
+            type=date.fromisoformat,
+            help='Primer día a recalcular (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--end',
+            type=date.fromisoformat,
+            help='Último día a recalcular (YYYY-MM-DD, por defecto hoy)',
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=DEFAULT_CHUNK_DAYS,
+            help='Cantidad de días por tramo/transacción',
+        )
+
+    def handle(self, *args, **options):
+        start = options['start']
+        end = options['end']
+        chunk_days = options['chunk_days']
+
+        if chunk_days < 1:
+            raise CommandError('--chunk-days debe ser mayor a 0')
+
+        self.stdout.write(self.style.SUCCESS('📈 Iniciando construcción del rollup diario de métricas'))
+
+        if options['backfill']:
+            start = start or get_history_start()
+            self.stdout.write(f'📋 Backfill completo desde: {start or "sin datos"}')
+        elif start is None:
+            watermark = get_rollup_watermark()
+            if watermark:
+                self.stdout.write(f'📋 Continuando desde el watermark: {watermark}')
+            else:
+                self.stdout.write(self.style.WARNING('⚠️  Rollup vacío: se hará backfill del historial'))
+
+        def report_chunk(chunk_start, chunk_end, metrics):
+            self.stdout.write(f'  📦 {chunk_start} → {chunk_end}: {len(metrics)} días')
+
+        started = time.monotonic()
+        try:
+            stats = build_daily_metrics(start=start, end=end, chunk_days=chunk_days, on_chunk=report_chunk)
+        except Exception as e:
+            logger.error(f"Error construyendo el rollup diario: {str(e)}")
+            raise CommandError(f'Error construyendo el rollup diario: {str(e)}')
+
+        if stats['days'] == 0:
+            self.stdout.write(self.style.WARNING('❌ No hay días para procesar'))
+            return
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Rollup actualizado: {stats["days"]} días en {stats["chunks"]} tramos ({elapsed:.2f}s)'
+        ))
@@ -0,0 +1,98 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+class Command(BaseCommand):
+    help = (
+        'Presupuesto de consultas de los changelists del admin: renderiza cada listado '
+        'con 1 fila por página y con --rows filas, y falla si las filas suman consultas (N+1)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=100,
+            help='Filas por página de la segunda medición',
+        )
+        parser.add_argument(
+            '--model',
+            action='append',
+            default=[],
+            help='Solo estos modelos (app_label.model, repetible)',
+        )
+        parser.add_argument(
+            '--user',
+            help='Email del superusuario con el que se renderiza (por defecto el primero activo)',
+        )
+
+    def handle(self, *args, **options):
+        user = self._get_user(options['user'])
+        models = {label.lower() for label in options['model']}
+        factory = RequestFactory()
+
+        self.stdout.write(self.style.SUCCESS(f'🧮 Presupuesto de consultas del admin ({connection.vendor})'))
+
+        failures = []
+        skipped = []
+        for model, model_admin in sorted(admin.site._registry.items(), key=lambda item: item[0]._meta.label):
+            label = model._meta.label_lower
+            if models and label not in models:
+                continue
+
+            url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+            single, rows_single = self._measure(factory, url, user, model_admin, 1)
+            full, rows_full = self._measure(factory, url, user, model_admin, options['rows'])
+
+            if rows_full < 2:
+                skipped.append(label)
+                self.stdout.write(f'  ⚪ {label}: sin filas suficientes para medir ({rows_full})')
+                continue
+            if full > single:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(
+                    f'  ❌ {label}: {single} consultas con 1 fila, {full} con {rows_full} filas'
+                ))
+            else:
+                self.stdout.write(f'  ✅ {label}: {full} consultas ({rows_full} filas)')
+
+        if failures:
+            raise CommandError(f'Changelists con consultas por fila: {", ".join(failures)}')
+        if skipped:
+            # En una BD vacía no se mide nada: el test de apps.main siembra filas para todos
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  {len(skipped)} changelists sin medir por falta de filas: {", ".join(skipped)}'
+            ))
+        self.stdout.write(self.style.SUCCESS('✅ Ningún changelist agrega consultas por fila'))
+
+    def _get_user(self, email):
+        User = get_user_model()
+        users = User.objects.filter(is_superuser=True, is_active=True)
+        if email:
+            users = users.filter(email=email)
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError('Se necesita un superusuario activo (ver --user)')
+        return user
+
+    def _measure(self, factory, url, user, model_admin, per_page):
+        """(consultas, filas mostradas) al renderizar el changelist con `per_page` filas"""
+        request = factory.get(url)
+        request.user = user
+        original = model_admin.list_per_page
+        model_admin.list_per_page = per_page
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                response = model_admin.changelist_view(request)
+                response.render()
+        finally:
+            model_admin.list_per_page = original
+
+        if response.status_code != 200:
+            raise CommandError(f'{url} respondió {response.status_code}')
+        return len(queries), len(response.context_data['cl'].result_list)
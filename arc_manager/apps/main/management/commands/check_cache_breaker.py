@@ -0,0 +1,101 @@
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cache_backends import CLOSED, OPEN, ResilientRedisCache
+
+
+class StalledServer:
+    """Socket que acepta conexiones y nunca responde (Redis colgado)"""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(64)
+        self.connections = []
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                connection, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections.append(connection)
+
+    def close(self):
+        for connection in self.connections:
+            connection.close()
+        self.sock.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba el circuit breaker del cache: sin --location usa un socket que nunca '
+        'responde; con --location (p.ej. un redis-server local) se puede matar y '
+        'reiniciar Redis mientras corre'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--location', help='URL de Redis (por defecto, un socket colgado local)')
+        parser.add_argument('--calls', type=int, default=20, help='Lecturas a realizar')
+        parser.add_argument('--interval', type=float, default=0, help='Segundos entre lecturas')
+        parser.add_argument('--timeout', type=float, default=0.1, help='socket_timeout / socket_connect_timeout')
+        parser.add_argument('--threshold', type=int, default=3, help='Errores seguidos que abren el circuito')
+        parser.add_argument('--reset', type=float, default=1.0, help='Segundos con el circuito abierto antes de probar')
+
+    def handle(self, *args, **options):
+        server = None
+        location = options['location']
+        if not location:
+            server = StalledServer()
+            location = f'redis://127.0.0.1:{server.port}/0'
+
+        backend = ResilientRedisCache(location, {
+            'KEY_PREFIX': 'breaker_check',
+            'OPTIONS': {
+                'socket_connect_timeout': options['timeout'],
+                'socket_timeout': options['timeout'],
+                'FAILURE_THRESHOLD': options['threshold'],
+                'RESET_TIMEOUT': options['reset'],
+            },
+        })
+
+        self.stdout.write(self.style.SUCCESS(f'🔌 Circuit breaker contra {location}'))
+        slow_while_open = []
+        try:
+            for i in range(options['calls']):
+                state = backend.breaker.state
+                errors = backend.counters['errors']
+                started = time.perf_counter()
+                backend.get('breaker_check:key')
+                elapsed = (time.perf_counter() - started) * 1000
+                # La prueba semi-abierta sí va a Redis (y suma un error si falla)
+                probed = backend.counters['errors'] != errors
+                if state == OPEN and not probed and elapsed > options['timeout'] * 1000 / 2:
+                    slow_while_open.append(i + 1)
+                icon = {'closed': '🟢', 'open': '🔴', 'half_open': '🟡'}[backend.breaker.state]
+                self.stdout.write(f'  {icon} #{i + 1:<3} {elapsed:8.2f} ms  {backend.breaker.state}')
+                if options['interval']:
+                    time.sleep(options['interval'])
+                elif server and backend.breaker.state == OPEN and i == options['calls'] // 2:
+                    # Dejar vencer RESET_TIMEOUT para ver la prueba semi-abierta
+                    time.sleep(options['reset'])
+        finally:
+            if server:
+                server.close()
+
+        stats = backend.stats()
+        self.stdout.write('📊 ' + ', '.join(f'{key}={value}' for key, value in stats.items()))
+
+        if slow_while_open:
+            raise CommandError(f'Lecturas lentas con el circuito abierto: {slow_while_open}')
+        if server and stats['trips'] == 0:
+            raise CommandError('El circuito nunca se abrió contra un Redis colgado')
+        if stats['state'] == CLOSED:
+            self.stdout.write(self.style.SUCCESS('✅ Redis disponible, circuito cerrado'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Con el circuito abierto las lecturas no esperan a Redis'))
@@ -4,6 +4,7 @@ from django.conf import settings
 import boto3
 import os
 from botocore.exceptions import ClientError, NoCredentialsError
+from apps.main.mailer import remember_send_quota
 
 
 class Command(BaseCommand):
@@ -181,12 +182,15 @@ class Command(BaseCommand):
             
             # Obtener cuotas
             quota_response = ses_client.get_send_quota()
+            # BatchMailer dosifica los envíos con esta cuota
+            remember_send_quota(quota_response)
             sent_last_24h = quota_response.get('SentLast24Hours', 0)
             max_24h = quota_response.get('Max24HourSend', 0)
             max_per_second = quota_response.get('MaxSendRate', 0)
             
             self.stdout.write(f'   📈 Emails enviados (últimas 24h): {sent_last_24h}/{max_24h}')
             self.stdout.write(f'   ⚡ Velocidad máxima: {max_per_second} emails/segundo')
+            self.stdout.write('   💾 Cuota guardada en cache para el envío en lote')
             
             # Verificar si estamos en sandbox
             if max_24h == 200:  # Límite típico del sandbox
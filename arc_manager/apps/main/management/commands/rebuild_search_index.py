@@ -0,0 +1,31 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connection
+from core.search import INDEXED_MODELS, create_search_index, reindex_search_text
+import time
+
+
+class Command(BaseCommand):
+    help = 'Recalcula search_text y recrea los índices de búsqueda (trigram en PostgreSQL, FTS5 en SQLite)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Filas por bulk_update',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f'🔎 Reconstruyendo índices de búsqueda ({connection.vendor})'))
+
+        for label in INDEXED_MODELS:
+            model = apps.get_model(label)
+            started = time.monotonic()
+            updated = reindex_search_text(model, batch_size=options['batch_size'])
+            with connection.schema_editor() as schema_editor:
+                create_search_index(schema_editor, model._meta.db_table)
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'  📇 {model._meta.verbose_name_plural}: {updated} filas actualizadas ({elapsed:.1f}s)')
+
+        self.stdout.write(self.style.SUCCESS('✅ Índices de búsqueda listos'))
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.main.outbox import BATCH_SIZE, deliver_batch, worker_id
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Envía los emails pendientes del outbox (una pasada para cron o --loop como worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Quedarse corriendo como worker, consultando la cola cada --interval segundos',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Segundos de espera cuando la cola está vacía (con --loop)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Emails por lote (una conexión al backend por lote)',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            help='Máximo de lotes a procesar antes de salir',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        max_batches = options['max_batches']
+
+        if batch_size < 1:
+            raise CommandError('--batch-size debe ser mayor a 0')
+
+        worker = worker_id()
+        self.stdout.write(self.style.SUCCESS(f'📬 Procesando outbox de emails ({worker})'))
+
+        total_sent = total_failed = batches = 0
+        try:
+            while max_batches is None or batches < max_batches:
+                sent, failed = deliver_batch(worker, batch_size)
+                if sent or failed:
+                    batches += 1
+                    total_sent += sent
+                    total_failed += failed
+                    self.stdout.write(f'  📤 Lote {batches}: {sent} enviados, {failed} fallidos')
+                    continue
+
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('⏹️  Worker detenido'))
+
+        if total_failed:
+            self.stdout.write(self.style.WARNING(f'⚠️  {total_failed} emails fallaron y se reintentarán con backoff'))
+        self.stdout.write(self.style.SUCCESS(f'✅ Outbox procesado: {total_sent} emails enviados en {batches} lotes'))
@@ -0,0 +1,199 @@
+"""
+Métricas agregadas del dashboard.
+
+Los gráficos y porcentajes de crecimiento se leen del rollup ``DailyMetric``
+(costo proporcional a los días mostrados). Los totales salen de un UNION ALL
+de conteos y los planes de un conteo condicional: tres consultas en total.
+
+Si el rollup todavía no se construyó, la serie mensual se agrupa directamente
+sobre las tablas crudas con ``TruncMonth`` (de esa misma consulta salen los
+totales).
+
+El resultado se cachea ``DASHBOARD_METRICS_CACHE_TIMEOUT`` segundos en el
+cache de dos niveles (``core.cache``): un solo worker lo recalcula al vencer.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import CharField, Count, Q, Sum, Value
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from apps.orgs.models import Organization
+from core.cache import tiered_cache
+from apps.plans.models import Plan, UpgradeRequest
+
+from .models import DailyMetric
+
+User = get_user_model()
+
+DASHBOARD_METRICS_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_METRICS_CACHE_TIMEOUT', 60 * 5)
+DASHBOARD_CHART_MONTHS = 6
+
+
+def calculate_growth_percentage(current, previous):
+    """Porcentaje de crecimiento entre dos periodos"""
+    if previous == 0:
+        return 100 if current > 0 else 0
+    return round(((current - previous) / previous) * 100, 1)
+
+
+def _shift_month(month_start, months):
+    """Retorna el primer día del mes desplazado `months` meses"""
+    index = month_start.year * 12 + (month_start.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _monthly_counts(queryset, date_field, kind):
+    """Agrupación por mes de un queryset, etiquetada para el UNION ALL"""
+    return (
+        queryset.order_by()
+        .annotate(kind=Value(kind, output_field=CharField()), month=TruncMonth(date_field))
+        .values('kind', 'month')
+        .annotate(total=Count('pk'))
+    )
+
+
+def _fetch_monthly_series():
+    """Retorna {kind: {date(mes): total}} con UNA consulta"""
+    union = _monthly_counts(User.objects.all(), 'date_joined', 'users').union(
+        _monthly_counts(Organization.objects.all(), 'created_at', 'orgs'),
+        _monthly_counts(UpgradeRequest.objects.filter(status='pending'), 'created_at', 'pending_upgrades'),
+        all=True,
+    )
+
+    series = {'users': {}, 'orgs': {}, 'pending_upgrades': {}}
+    for row in union:
+        month = row['month']
+        if month is None:
+            continue
+        month = month.date() if hasattr(month, 'date') else month
+        series[row['kind']][month] = series[row['kind']].get(month, 0) + row['total']
+    return series
+
+
+def _fetch_totals():
+    """Totales globales con UNA consulta (UNION ALL de conteos)"""
+    def counts(queryset, kind):
+        return (
+            queryset.order_by()
+            .annotate(kind=Value(kind, output_field=CharField()))
+            .values('kind')
+            .annotate(total=Count('pk'))
+        )
+
+    union = counts(User.objects.all(), 'users').union(
+        counts(Organization.objects.all(), 'orgs'),
+        counts(UpgradeRequest.objects.filter(status='pending'), 'pending_upgrades'),
+        all=True,
+    )
+    totals = {'users': 0, 'orgs': 0, 'pending_upgrades': 0}
+    for row in union:
+        totals[row['kind']] = row['total']
+    return totals
+
+
+def _fetch_rollup_series(since):
+    """Serie mensual desde el rollup diario (o None si el rollup está vacío)"""
+    rows = list(
+        DailyMetric.objects.filter(date__gte=since)
+        .annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(
+            users=Sum('new_users'),
+            orgs=Sum('new_organizations'),
+            revenue=Sum('payments_total'),
+        )
+        .order_by('month')
+    )
+    if not rows:
+        return None
+
+    series = {'users': {}, 'orgs': {}, 'revenue': {}}
+    for row in rows:
+        month = row['month']
+        month = month.date() if hasattr(month, 'date') else month
+        series['users'][month] = row['users'] or 0
+        series['orgs'][month] = row['orgs'] or 0
+        series['revenue'][month] = float(row['revenue'] or 0)
+    return series
+
+
+def compute_dashboard_metrics(today=None, months=DASHBOARD_CHART_MONTHS):
+    """Calcula las métricas globales del dashboard (sin cache)"""
+    today = today or timezone.now().date()
+    this_month = today.replace(day=1)
+    last_month = _shift_month(this_month, -1)
+
+    first_month = _shift_month(this_month, -(max(months, 2) - 1))
+
+    series = _fetch_rollup_series(first_month)
+    if series is not None:
+        totals = _fetch_totals()
+    else:
+        # Sin rollup: agrupar sobre las tablas crudas (incluye los totales)
+        series = _fetch_monthly_series()
+        totals = {kind: sum(by_month.values()) for kind, by_month in series.items()}
+        series['revenue'] = None
+    users_by_month = series['users']
+    orgs_by_month = series['orgs']
+    revenue_by_month = series['revenue']
+
+    # Conteo condicional de suscripciones activas por plan
+    plans = list(
+        Plan.objects.annotate(
+            subscription_count=Count(
+                'subscription',
+                filter=Q(subscription__subscription_status__endswith='_active'),
+            )
+        ).order_by('-subscription_count')
+    )
+    plan_stats = [plan for plan in plans if plan.is_active]
+
+    new_users_this_month = users_by_month.get(this_month, 0)
+    new_users_last_month = users_by_month.get(last_month, 0)
+    new_orgs_this_month = orgs_by_month.get(this_month, 0)
+    new_orgs_last_month = orgs_by_month.get(last_month, 0)
+
+    chart_data = {
+        'users_monthly': [],
+        'orgs_monthly': [],
+        'revenue_monthly': [],
+    }
+    for offset in range(months - 1, -1, -1):
+        month_start = _shift_month(this_month, -offset)
+        label = month_start.strftime('%b')
+        chart_data['users_monthly'].append({'month': label, 'value': users_by_month.get(month_start, 0)})
+        chart_data['orgs_monthly'].append({'month': label, 'value': orgs_by_month.get(month_start, 0)})
+        if revenue_by_month is not None:
+            chart_data['revenue_monthly'].append({'month': label, 'value': revenue_by_month.get(month_start, 0.0)})
+
+    return {
+        'total_users': totals['users'],
+        'total_organizations': totals['orgs'],
+        'total_plans': len(plan_stats),
+        'total_subscriptions': sum(plan.subscription_count for plan in plans),
+        'new_users_this_month': new_users_this_month,
+        'new_users_last_month': new_users_last_month,
+        'new_orgs_this_month': new_orgs_this_month,
+        'new_orgs_last_month': new_orgs_last_month,
+        'user_growth': calculate_growth_percentage(new_users_this_month, new_users_last_month),
+        'org_growth': calculate_growth_percentage(new_orgs_this_month, new_orgs_last_month),
+        'plan_stats': plan_stats,
+        'chart_data': chart_data,
+        'pending_upgrades': totals['pending_upgrades'],
+    }
+
+
+def get_dashboard_metrics(months=DASHBOARD_CHART_MONTHS, timeout=DASHBOARD_METRICS_CACHE_TIMEOUT):
+    """Métricas del dashboard desde cache, recalculadas como máximo cada `timeout` segundos"""
+    today = timezone.now().date()
+    cache_key = f"dashboard_metrics:{today.isoformat()}:{months}"
+
+    return tiered_cache.get_or_set(
+        cache_key,
+        lambda: compute_dashboard_metrics(today=today, months=months),
+        timeout,
+        namespace='dashboard_metrics',
+    )
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Fecha')),
+                ('new_users', models.PositiveIntegerField(default=0, verbose_name='Usuarios nuevos')),
+                ('new_organizations', models.PositiveIntegerField(default=0, verbose_name='Organizaciones nuevas')),
+                ('payments_count', models.PositiveIntegerField(default=0, verbose_name='Cantidad de pagos')),
+                ('payments_total', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Total de pagos')),
+                ('subscriptions_ended', models.PositiveIntegerField(default=0, help_text='Suscripciones cuyo periodo activo terminó ese día (pasan a gracia o expiran).', verbose_name='Suscripciones vencidas')),
+                ('grace_periods_ended', models.PositiveIntegerField(default=0, help_text='Suscripciones cuyo periodo de gracia terminó ese día (pasan a expiradas).', verbose_name='Periodos de gracia terminados')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Última actualización')),
+            ],
+            options={
+                'verbose_name': 'Métrica diaria',
+                'verbose_name_plural': 'Métricas diarias',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
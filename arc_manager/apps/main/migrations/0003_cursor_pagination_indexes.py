@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_email_outbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emailoutbox',
+            index=models.Index(fields=['-created_at', '-id'], name='outbox_created_idx'),
+        ),
+    ]
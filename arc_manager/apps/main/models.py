@@ -1,3 +1,95 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class DailyMetric(models.Model):
+    """
+    Rollup diario de actividad del sistema.
+
+    Se construye con el comando ``build_daily_metrics`` y alimenta los gráficos
+    y porcentajes de crecimiento del dashboard sin recorrer las tablas crudas.
+    """
+    date = models.DateField("Fecha", unique=True)
+
+    # Altas
+    new_users = models.PositiveIntegerField("Usuarios nuevos", default=0)
+    new_organizations = models.PositiveIntegerField("Organizaciones nuevas", default=0)
+
+    # Ingresos
+    payments_count = models.PositiveIntegerField("Cantidad de pagos", default=0)
+    payments_total = models.DecimalField("Total de pagos", max_digits=12, decimal_places=2, default=0)
+
+    # Transiciones de estado de suscripción
+    subscriptions_ended = models.PositiveIntegerField(
+        "Suscripciones vencidas", default=0,
+        help_text="Suscripciones cuyo periodo activo terminó ese día (pasan a gracia o expiran).",
+    )
+    grace_periods_ended = models.PositiveIntegerField(
+        "Periodos de gracia terminados", default=0,
+        help_text="Suscripciones cuyo periodo de gracia terminó ese día (pasan a expiradas).",
+    )
+
+    updated_at = models.DateTimeField("Última actualización", auto_now=True)
+
+    class Meta:
+        verbose_name = "Métrica diaria"
+        verbose_name_plural = "Métricas diarias"
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"Métricas {self.date}"
+
+
+class EmailOutbox(models.Model):
+    """
+    Email transaccional pendiente de envío.
+
+    Se escribe en la misma transacción que el cambio que lo origina (alta de
+    usuario, reseteo de contraseña) y lo entrega el comando ``send_outbox``
+    fuera del request, con reintentos y backoff exponencial.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_SENDING, 'Enviando'),
+        (STATUS_SENT, 'Enviado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    category = models.CharField("Categoría", max_length=50, blank=True)
+    to = models.JSONField("Destinatarios", default=list)
+    from_email = models.CharField("Remitente", max_length=254)
+    subject = models.CharField("Asunto", max_length=255)
+    body = models.TextField("Texto", blank=True)
+    html_body = models.TextField("HTML", blank=True)
+    sensitive = models.BooleanField(
+        "Contenido sensible", default=False,
+        help_text="Contiene credenciales o enlaces de acceso: el contenido se borra al enviarse.",
+    )
+
+    status = models.CharField("Estado", max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField("Intentos", default=0)
+    max_attempts = models.PositiveSmallIntegerField("Máximo de intentos", default=5)
+    next_attempt_at = models.DateTimeField("Próximo intento", default=timezone.now)
+    locked_by = models.CharField("Reclamado por", max_length=64, blank=True)
+    locked_until = models.DateTimeField("Reclamado hasta", null=True, blank=True)
+    last_error = models.TextField("Último error", blank=True)
+
+    created_at = models.DateTimeField("Creado", auto_now_add=True)
+    sent_at = models.DateTimeField("Enviado", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Email en cola"
+        verbose_name_plural = "Emails en cola"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+            models.Index(fields=['-created_at', '-id'], name='outbox_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {', '.join(self.to)} ({self.get_status_display()})"
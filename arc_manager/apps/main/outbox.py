@@ -0,0 +1,248 @@
+"""
+Outbox de emails transaccionales.
+
+Las vistas no envían correos: ``enqueue_email`` guarda el mensaje en
+``EmailOutbox`` dentro de la transacción en curso (si el alta se revierte, el
+correo también) y el comando ``send_outbox`` lo entrega después.
+
+El worker reclama lotes con ``SELECT ... FOR UPDATE SKIP LOCKED`` (varios
+workers en PostgreSQL no se pisan), marca las filas con su identificador y un
+plazo de reclamo, y las envía con ``BatchMailer`` (una conexión por lote, a
+la velocidad que permite el proveedor). Cada reclamo cuenta como un intento y
+los fallos se reintentan con backoff exponencial hasta ``max_attempts``.
+
+El plazo de reclamo cubre lo que tarda el lote a la velocidad de envío
+(``lease_seconds_for``); una fila reclamada por un worker que murió vuelve a
+estar disponible cuando vence, o se marca como fallida si ese era su último
+intento (un mensaje que tumba al worker no se reintenta para siempre).
+"""
+import logging
+import math
+import os
+import socket
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .mailer import RATE_SAFETY_FACTOR, BatchMailer
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+# Filas por lote (una conexión al backend por lote)
+BATCH_SIZE = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+
+# Intentos antes de marcar el email como fallido
+MAX_ATTEMPTS = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+
+# Backoff: base * 2^(intentos-1), con tope
+RETRY_BASE_SECONDS = getattr(settings, 'EMAIL_OUTBOX_RETRY_BASE', 60)
+RETRY_MAX_SECONDS = getattr(settings, 'EMAIL_OUTBOX_RETRY_MAX', 60 * 60)
+
+# Margen del plazo de reclamo, además del tiempo de envío del lote a la velocidad permitida
+LEASE_SECONDS = getattr(settings, 'EMAIL_OUTBOX_LEASE', 5 * 60)
+
+
+def _outbox_row(message, category='', sensitive=False, max_attempts=None):
+    html_body = ''
+    for content, mimetype in getattr(message, 'alternatives', []):
+        if mimetype == 'text/html':
+            html_body = content
+            break
+
+    return EmailOutbox(
+        category=category,
+        to=list(message.to),
+        from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+        subject=message.subject[:255],
+        body=message.body,
+        html_body=html_body,
+        sensitive=sensitive,
+        max_attempts=max_attempts or MAX_ATTEMPTS,
+    )
+
+
+def enqueue_email(message, category='', sensitive=False, max_attempts=None):
+    """Encola un EmailMessage/EmailMultiAlternatives ya construido (no lo envía)"""
+    outbox = _outbox_row(message, category, sensitive, max_attempts)
+    outbox.save()
+    return outbox
+
+
+def enqueue_emails(messages, category='', sensitive=False, batch_size=500):
+    """Encola varios mensajes con bulk_create (altas masivas)"""
+    rows = [_outbox_row(message, category, sensitive) for message in messages]
+    return EmailOutbox.objects.bulk_create(rows, batch_size=batch_size)
+
+
+def build_message(outbox, connection=None):
+    """Reconstruye el EmailMultiAlternatives de una fila del outbox"""
+    message = EmailMultiAlternatives(
+        subject=outbox.subject,
+        body=outbox.body,
+        from_email=outbox.from_email,
+        to=outbox.to,
+        connection=connection,
+    )
+    if outbox.html_body:
+        message.attach_alternative(outbox.html_body, 'text/html')
+    return message
+
+
+def backoff_delay(attempts):
+    """Espera antes del siguiente intento (1 min, 2, 4, ... hasta el tope)"""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1), RETRY_MAX_SECONDS))
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"[:64]
+
+
+def lease_seconds_for(batch_size, rate=None):
+    """
+    Plazo de reclamo de un lote: lo que tarda en enviarse a `rate`
+    destinatarios/segundo (un destinatario por fila) más LEASE_SECONDS de margen
+    para reintentos por throttling y latencia del proveedor.
+    """
+    if not rate:
+        return LEASE_SECONDS
+    return LEASE_SECONDS + math.ceil(batch_size / (rate * RATE_SAFETY_FACTOR))
+
+
+def _fail_expired_leases(now):
+    """Filas cuyo plazo venció en el último intento: el worker murió enviándolas"""
+    expired = EmailOutbox.objects.filter(
+        status=EmailOutbox.STATUS_SENDING, locked_until__lt=now, attempts__gte=F('max_attempts'),
+    )
+    # Igual que en _mark_failed: no conservar contraseñas temporales ni enlaces
+    expired.filter(sensitive=True).update(body='', html_body='')
+    return expired.update(
+        status=EmailOutbox.STATUS_FAILED,
+        locked_by='',
+        locked_until=None,
+        last_error='El plazo de reclamo venció en el último intento',
+    )
+
+
+def claim_batch(worker, batch_size=None, lease_seconds=None):
+    """
+    Reclama hasta `batch_size` emails listos para enviar y suma un intento a
+    cada uno. Las filas bloqueadas por otro worker se saltan (SKIP LOCKED); la
+    actualización condicional con el id del worker hace lo mismo en backends
+    sin FOR UPDATE (SQLite).
+    """
+    batch_size = batch_size or BATCH_SIZE
+    now = timezone.now()
+    ready = Q(status=EmailOutbox.STATUS_PENDING, next_attempt_at__lte=now) | Q(
+        status=EmailOutbox.STATUS_SENDING, locked_until__lt=now
+    )
+
+    with transaction.atomic():
+        failed = _fail_expired_leases(now)
+        if failed:
+            logger.error(f"Outbox: {failed} emails descartados, su worker no terminó el último intento")
+        ids = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(ready)
+            .order_by('next_attempt_at', 'pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        EmailOutbox.objects.filter(ready, pk__in=ids).update(
+            status=EmailOutbox.STATUS_SENDING,
+            attempts=F('attempts') + 1,
+            locked_by=worker,
+            locked_until=now + timedelta(seconds=lease_seconds or LEASE_SECONDS),
+        )
+
+    return list(EmailOutbox.objects.filter(pk__in=ids, locked_by=worker, status=EmailOutbox.STATUS_SENDING).order_by('pk'))
+
+
+def _mark_sent(outbox, now):
+    values = {
+        'status': EmailOutbox.STATUS_SENT,
+        'sent_at': now,
+        'locked_by': '',
+        'locked_until': None,
+        'last_error': '',
+    }
+    if outbox.sensitive:
+        # No guardar credenciales ni enlaces de acceso una vez entregados
+        values.update(body='', html_body='')
+    EmailOutbox.objects.filter(pk=outbox.pk, locked_by=outbox.locked_by).update(**values)
+
+
+def _mark_failed(outbox, error, now):
+    # claim_batch ya contó este intento
+    attempts = outbox.attempts
+    exhausted = attempts >= outbox.max_attempts
+    values = {
+        'status': EmailOutbox.STATUS_FAILED if exhausted else EmailOutbox.STATUS_PENDING,
+        'next_attempt_at': now + backoff_delay(attempts),
+        'locked_by': '',
+        'locked_until': None,
+        'last_error': str(error)[:2000],
+    }
+    if exhausted and outbox.sensitive:
+        # Ya no se reintenta: no conservar contraseñas temporales ni enlaces
+        values.update(body='', html_body='')
+    EmailOutbox.objects.filter(pk=outbox.pk, locked_by=outbox.locked_by).update(**values)
+    if exhausted:
+        logger.error(f"Email {outbox.pk} a {', '.join(outbox.to)} descartado tras {attempts} intentos: {error}")
+    else:
+        logger.warning(f"Email {outbox.pk} a {', '.join(outbox.to)} falló (intento {attempts}): {error}")
+
+
+def deliver_batch(worker=None, batch_size=None, connection=None):
+    """
+    Reclama y envía un lote con BatchMailer (una conexión, envío dosificado).
+    Retorna (enviados, fallidos); (0, 0) si no había nada pendiente.
+    """
+    worker = worker or worker_id()
+    batch_size = batch_size or BATCH_SIZE
+    mailer = BatchMailer(connection=connection)
+    batch = claim_batch(worker, batch_size, lease_seconds=lease_seconds_for(batch_size, mailer.rate))
+    if not batch:
+        return 0, 0
+
+    try:
+        mailer.open()
+    except Exception as e:
+        # Sin conexión no se envía nada del lote: todo vuelve a la cola con backoff
+        now = timezone.now()
+        for outbox in batch:
+            _mark_failed(outbox, e, now)
+        return 0, len(batch)
+
+    try:
+        for outbox in batch:
+            mailer.add(build_message(outbox, mailer.connection), key=outbox.pk)
+        results = mailer.flush()
+    finally:
+        try:
+            mailer.close()
+        except Exception:
+            pass
+
+    sent = failed = 0
+    now = timezone.now()
+    for outbox in batch:
+        error = results.get(outbox.pk)
+        if error is None:
+            _mark_sent(outbox, now)
+            sent += 1
+        else:
+            _mark_failed(outbox, error, now)
+            failed += 1
+
+    if mailer.stats['throttled']:
+        logger.warning(f"Outbox: el proveedor limitó {mailer.stats['throttled']} envíos (velocidad {mailer.rate}/s)")
+    logger.info(f"Outbox: {sent} emails enviados, {failed} fallidos ({worker})")
+    return sent, failed
+
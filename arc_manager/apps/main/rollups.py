@@ -0,0 +1,148 @@
+"""
+Construcción del rollup diario ``DailyMetric``.
+
+Cada rango de días se calcula con una agrupación ``TruncDate`` por fuente
+(usuarios, organizaciones, pagos y fechas de fin de suscripción/gracia) y se
+escribe con un único upsert. Los días sin actividad se escriben en cero para
+que el rango quede completo y el watermark avance.
+"""
+import logging
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.orgs.models import Organization
+from apps.plans.models import Payment, Subscription
+
+from .models import DailyMetric
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_DAYS = 90
+
+ROLLUP_FIELDS = [
+    'new_users',
+    'new_organizations',
+    'payments_count',
+    'payments_total',
+    'subscriptions_ended',
+    'grace_periods_ended',
+]
+
+
+def _day_bounds(start, end):
+    """Rango [inicio de `start`, inicio del día siguiente a `end`) en la zona actual"""
+    tz = timezone.get_current_timezone()
+    lower = timezone.make_aware(datetime.combine(start, time.min), tz)
+    upper = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz)
+    return lower, upper
+
+
+def _daily_rows(queryset, date_field, start, end, **aggregates):
+    """Agrupa un queryset por día dentro del rango, retorna {date: {alias: valor}}"""
+    lower, upper = _day_bounds(start, end)
+    rows = (
+        queryset.order_by()
+        .filter(**{f'{date_field}__gte': lower, f'{date_field}__lt': upper})
+        .annotate(day=TruncDate(date_field))
+        .values('day')
+        .annotate(**aggregates)
+    )
+    return {row.pop('day'): row for row in rows}
+
+
+def compute_daily_metrics(start, end):
+    """Calcula las métricas de cada día entre `start` y `end` (inclusive), sin escribir"""
+    users = _daily_rows(User.objects.all(), 'date_joined', start, end, total=Count('pk'))
+    orgs = _daily_rows(Organization.objects.all(), 'created_at', start, end, total=Count('pk'))
+    payments = _daily_rows(
+        Payment.objects.filter(status='completed'), 'created_at', start, end,
+        total=Count('pk'), amount=Sum('amount'),
+    )
+    # Las transiciones ocurren en end_date (activo -> gracia/expirado) y en
+    # grace_end_date (gracia -> expirado). Se cuenta por la fecha guardada hoy,
+    # no un historial: una renovación mueve la suscripción a su nuevo end_date
+    # y en un rango con días futuros entran los vencimientos programados.
+    ended = _daily_rows(Subscription.objects.all(), 'end_date', start, end, total=Count('pk'))
+    grace_ended = _daily_rows(Subscription.objects.all(), 'grace_end_date', start, end, total=Count('pk'))
+
+    metrics = []
+    day = start
+    while day <= end:
+        payment = payments.get(day, {})
+        metrics.append(DailyMetric(
+            date=day,
+            new_users=users.get(day, {}).get('total', 0),
+            new_organizations=orgs.get(day, {}).get('total', 0),
+            payments_count=payment.get('total', 0),
+            payments_total=payment.get('amount') or Decimal('0'),
+            subscriptions_ended=ended.get(day, {}).get('total', 0),
+            grace_periods_ended=grace_ended.get(day, {}).get('total', 0),
+        ))
+        day += timedelta(days=1)
+    return metrics
+
+
+def rollup_range(start, end):
+    """Recalcula y guarda (upsert) el rollup de los días entre `start` y `end`"""
+    metrics = compute_daily_metrics(start, end)
+    with transaction.atomic():
+        DailyMetric.objects.bulk_create(
+            metrics,
+            update_conflicts=True,
+            unique_fields=['date'],
+            update_fields=ROLLUP_FIELDS + ['updated_at'],
+        )
+    return metrics
+
+
+def get_rollup_watermark():
+    """Último día guardado en el rollup (o None si está vacío)"""
+    return DailyMetric.objects.order_by('-date').values_list('date', flat=True).first()
+
+
+def get_history_start():
+    """Primer día con actividad registrada en las tablas fuente"""
+    candidates = [
+        User.objects.aggregate(first=Min('date_joined'))['first'],
+        Organization.objects.aggregate(first=Min('created_at'))['first'],
+        Payment.objects.aggregate(first=Min('created_at'))['first'],
+        Subscription.objects.aggregate(first=Min('end_date'))['first'],
+    ]
+    candidates = [timezone.localtime(value).date() for value in candidates if value]
+    return min(candidates) if candidates else None
+
+
+def build_daily_metrics(start=None, end=None, chunk_days=DEFAULT_CHUNK_DAYS, on_chunk=None):
+    """
+    Construye el rollup por tramos de `chunk_days` días.
+
+    Sin `start` continúa desde el watermark: el último día guardado se vuelve a
+    calcular porque pudo haberse guardado a mitad del día. Si el rollup está
+    vacío se hace backfill desde el primer día con actividad.
+    """
+    end = end or timezone.localdate()
+    if start is None:
+        start = get_rollup_watermark() or get_history_start()
+    if start is None or start > end:
+        return {'days': 0, 'chunks': 0, 'start': start, 'end': end}
+
+    days = chunks = 0
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+        metrics = rollup_range(chunk_start, chunk_end)
+        days += len(metrics)
+        chunks += 1
+        if on_chunk:
+            on_chunk(chunk_start, chunk_end, metrics)
+        chunk_start = chunk_end + timedelta(days=1)
+
+    logger.info(f"Rollup diario construido: {days} días ({start} a {end}) en {chunks} tramos")
+    return {'days': days, 'chunks': chunks, 'start': start, 'end': end}
@@ -1,3 +1,169 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core import mail
+from django.core.mail import EmailMessage, get_connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from apps.main.mail_backends import ThrottledLocmemBackend
+from apps.main.mailer import RATE_SAFETY_FACTOR, BatchMailer
+from apps.main.management.commands.check_admin_queries import Command as CheckAdminQueries
+from apps.main.models import DailyMetric, EmailOutbox
+from apps.main.outbox import LEASE_SECONDS, claim_batch, deliver_batch, enqueue_email, lease_seconds_for
+from apps.orgs.models import Organization, OrganizationAlert
+from apps.plans.models import Plan, Subscription, SubscriptionNotification, UpgradeRequest
+from apps.projects.models import Project, ProjectFile, Task
+from core.cache import tiered_cache
+
+User = get_user_model()
+
+ROWS = 5
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'admin-queries'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'admin-queries-sessions'},
+})
+class AdminChangelistQueryBudgetTest(TestCase):
+    """Cada changelist del admin hace las mismas consultas con 1 fila que con N (sin N+1)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        trial = Plan.objects.create(name='trial', display_name='Trial', max_users=5, trial_days=30, grace_period_days=5)
+        basic = Plan.objects.create(name='basic', display_name='Básico', price=299, max_users=10, grace_period_days=5)
+        now = timezone.now()
+
+        for i in range(ROWS):
+            organization = Organization.objects.create(name=f'Organización {i}')
+            subscription = Subscription.objects.filter(organization=organization).first()
+            if subscription is None:
+                subscription = Subscription.objects.create(organization=organization, plan=trial)
+            user = User.objects.create_user(
+                email=f'usuario{i}@example.com', password='x', first_name='Usuario', last_name=str(i),
+                organization=organization, is_org_admin=i % 2 == 0,
+            )
+
+            subscription.process_payment(amount=basic.price, processed_by='tests')
+            UpgradeRequest.objects.create(organization=organization, current_plan=trial, requested_plan=basic, amount=basic.price)
+            SubscriptionNotification.objects.create(
+                subscription=subscription, kind='expiry', threshold=7, period_end=now + datetime.timedelta(days=i),
+            )
+            OrganizationAlert.objects.create(
+                organization=organization, level='info', reason='expires_soon', message='Vence pronto',
+                days_remaining=3, period_end=now, valid_until=now,
+            )
+            project = Project.objects.create(owner=user, name=f'Proyecto {i}')
+            Task.objects.create(project=project, assigned_to=user, title=f'Tarea {i}')
+            ProjectFile.objects.create(project=project, file=f'archivo{i}.txt')
+            DailyMetric.objects.create(date=datetime.date(2026, 1, 1 + i))
+            EmailOutbox.objects.create(to=[user.email], subject='Asunto', body='Texto')
+            Group.objects.create(name=f'Grupo {i}')
+
+        cls.superuser = User.objects.create_superuser(
+            email='root@example.com', password='x', first_name='Root', last_name='Admin',
+        )
+
+    def setUp(self):
+        tiered_cache.clear_local()
+
+    def test_changelists_do_not_add_queries_per_row(self):
+        command = CheckAdminQueries()
+        factory = RequestFactory()
+
+        for model, model_admin in admin.site._registry.items():
+            label = model._meta.label_lower
+            with self.subTest(model=label):
+                url = f'/admin/{model._meta.app_label}/{model._meta.model_name}/'
+                single, _ = command._measure(factory, url, self.superuser, model_admin, 1)
+                full, rows = command._measure(factory, url, self.superuser, model_admin, ROWS)
+
+                self.assertGreaterEqual(rows, 2, f'{label}: sin filas para medir')
+                self.assertEqual(full, single, f'{label}: {single} consultas con 1 fila, {full} con {rows}')
+
+
+class EmailOutboxClaimTest(TestCase):
+    """Cada reclamo cuenta como intento, también el de un plazo vencido"""
+
+    def expire_lease(self):
+        EmailOutbox.objects.update(locked_until=timezone.now() - datetime.timedelta(seconds=1))
+
+    def test_reclaimed_rows_count_attempts_until_exhausted(self):
+        outbox = enqueue_email(EmailMessage('Acceso', 'Contraseña: x', to=['nuevo@example.com']), sensitive=True, max_attempts=2)
+
+        self.assertEqual([row.attempts for row in claim_batch('worker-1')], [1])
+        self.expire_lease()
+        self.assertEqual([(row.attempts, row.locked_by) for row in claim_batch('worker-2')], [(2, 'worker-2')])
+
+        # El worker murió en el último intento: no se vuelve a reclamar
+        self.expire_lease()
+        self.assertEqual(claim_batch('worker-3'), [])
+        outbox.refresh_from_db()
+        self.assertEqual((outbox.status, outbox.attempts, outbox.body), (EmailOutbox.STATUS_FAILED, 2, ''))
+
+    def test_sent_row_keeps_claim_attempt(self):
+        outbox = enqueue_email(EmailMessage('Hola', 'Texto', to=['nuevo@example.com']))
+        connection = get_connection('django.core.mail.backends.locmem.EmailBackend')
+
+        self.assertEqual(deliver_batch('worker-1', connection=connection), (1, 0))
+        outbox.refresh_from_db()
+        self.assertEqual((outbox.status, outbox.attempts), (EmailOutbox.STATUS_SENT, 1))
+
+    def test_lease_covers_batch_at_send_rate(self):
+        self.assertEqual(lease_seconds_for(50), LEASE_SECONDS)
+        self.assertGreaterEqual(lease_seconds_for(900, rate=1), LEASE_SECONDS + 1000)
+
+
+class FakeClock:
+    """Reloj monotónico de prueba: sleep() avanza el tiempo en lugar de esperar"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class BatchMailerTest(TestCase):
+    """BatchMailer contra un backend que rechaza (como SES) lo que supera su velocidad"""
+
+    def setUp(self):
+        ThrottledLocmemBackend.reset()
+        self.clock = FakeClock()
+        self.connection = ThrottledLocmemBackend(max_rate=5, clock=self.clock)
+
+    def mailer(self, rate):
+        return BatchMailer(connection=self.connection, rate=rate, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_identical_messages_go_out_in_paced_bcc_batches(self):
+        with self.mailer(rate=5) as mailer:
+            for i in range(12):
+                mailer.add(EmailMessage('Aviso', 'Mismo texto', to=[f'usuario{i}@example.com']), key=i)
+            mailer.add(EmailMessage('Otro', 'Texto distinto', to=['otro@example.com']), key='otro')
+
+        # 12 iguales en lotes de hasta `rate` destinatarios (BCC) + el distinto
+        self.assertEqual(sorted(len(message.bcc) for message in mail.outbox), [0, 2, 5, 5])
+        self.assertEqual(mailer.stats, {'sent': 13, 'queued': 0, 'throttled': 0, 'failed': 0})
+        self.assertTrue(all(error is None for error in mailer.results.values()))
+        self.assertEqual(self.connection.rejected, 0)
+        # El primer lote sale con el bucket lleno; el resto espera su recarga a 0.9 * rate
+        self.assertGreaterEqual(sum(self.clock.sleeps), (13 - 5) / (5 * RATE_SAFETY_FACTOR) - 0.01)
+
+    def test_throttled_sends_slow_down_and_retry(self):
+        # El mailer cree que puede enviar 20/s, el backend acepta 5/s
+        with self.mailer(rate=20) as mailer:
+            for i in range(8):
+                mailer.add(EmailMessage(f'Mensaje {i}', 'Texto', to=[f'usuario{i}@example.com']), key=i)
+
+        self.assertGreater(mailer.stats['throttled'], 0)
+        self.assertEqual(mailer.stats['throttled'], self.connection.rejected)
+        self.assertEqual(mailer.stats['sent'] + mailer.stats['failed'], 8)
+        self.assertEqual(mailer.stats['sent'], len(mail.outbox))
+        self.assertLess(mailer.rate, 20)
@@ -1,11 +1,10 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Q
-from django.utils import timezone
-from datetime import datetime, timedelta
-from apps.plans.models import Plan, Subscription, UpgradeRequest
+from apps.plans.models import UpgradeRequest
 from apps.orgs.models import Organization
+from .mailer import remember_send_quota
+from .metrics import get_dashboard_metrics
 from django.http import JsonResponse
 from django.core.mail import send_mail
 from django.conf import settings
@@ -34,47 +33,14 @@ def dashboard(request):
     if subscription and subscription.is_expired:
         return redirect(reverse('plans:subscription_dashboard'))
 
-    # Obtener fechas para filtros
-    today = timezone.now().date()
-    this_month = today.replace(day=1)
-    last_month = (this_month - timedelta(days=1)).replace(day=1)
-    
-    # Métricas generales del sistema
-    total_users = User.objects.count()
-    total_organizations = Organization.objects.count()
-    total_plans = Plan.objects.filter(is_active=True).count()
-    total_subscriptions = Subscription.objects.filter(subscription_status__endswith='_active').count()
-    
-    # Métricas de crecimiento
-    new_users_this_month = User.objects.filter(date_joined__gte=this_month).count()
-    new_users_last_month = User.objects.filter(
-        date_joined__gte=last_month,
-        date_joined__lt=this_month
-    ).count()
-    
-    new_orgs_this_month = Organization.objects.filter(created_at__gte=this_month).count()
-    new_orgs_last_month = Organization.objects.filter(
-        created_at__gte=last_month,
-        created_at__lt=this_month
-    ).count()
-    
-    # Calcular porcentajes de crecimiento
-    def calculate_growth_percentage(current, previous):
-        if previous == 0:
-            return 100 if current > 0 else 0
-        return round(((current - previous) / previous) * 100, 1)
-    
-    user_growth = calculate_growth_percentage(new_users_this_month, new_users_last_month)
-    org_growth = calculate_growth_percentage(new_orgs_this_month, new_orgs_last_month)
+    # Métricas globales agregadas (cacheadas, 3 consultas al recalcular)
+    metrics = get_dashboard_metrics()
+    total_users = metrics['total_users']
+    total_subscriptions = metrics['total_subscriptions']
     
     # Obtener la organización del usuario actual
     user_organization = current_user.organization if hasattr(current_user, 'organization') else None
     
-    # Métricas de planes
-    plan_stats = Plan.objects.filter(is_active=True).annotate(
-                    subscription_count=Count('subscription', filter=Q(subscription__subscription_status__endswith='_active'))
-    ).order_by('-subscription_count')
-    
     # Actividad reciente
     recent_activities = []
     
@@ -132,53 +98,6 @@ def dashboard(request):
     recent_activities.sort(key=lambda x: x['time'], reverse=True)
     recent_activities = recent_activities[:10]
     
-    # Datos para gráficos
-    chart_data = {
-        'users_monthly': [],
-        'orgs_monthly': [],
-        'revenue_monthly': []
-    }
-    
-    # Datos de los últimos 6 meses
-    try:
-        for i in range(6):
-            month_date = today.replace(day=1) - timedelta(days=i*30)
-            month_start = month_date.replace(day=1)
-            month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-            
-            users_count = User.objects.filter(
-                date_joined__gte=month_start,
-                date_joined__lte=month_end
-            ).count()
-            
-            orgs_count = Organization.objects.filter(
-                created_at__gte=month_start,
-                created_at__lte=month_end
-            ).count()
-            
-            chart_data['users_monthly'].insert(0, {
-                'month': month_start.strftime('%b'),
-                'value': users_count
-            })
-            
-            chart_data['orgs_monthly'].insert(0, {
-                'month': month_start.strftime('%b'),
-                'value': orgs_count
-            })
-    except Exception as e:
-        # Si hay error en los datos del gráfico, usar datos vacíos
-        chart_data = {
-            'users_monthly': [],
-            'orgs_monthly': [],
-            'revenue_monthly': []
-        }
-    
-    # Contar solicitudes pendientes
-    try:
-        pending_upgrades = UpgradeRequest.objects.filter(status='pending').count()
-    except Exception as e:
-        pending_upgrades = 0
-    
     # Determinar nombre a mostrar
     greeting_name = current_user.get_full_name().strip() if hasattr(current_user, 'get_full_name') else ''
     if not greeting_name:
@@ -191,29 +110,29 @@ def dashboard(request):
         
         # Métricas principales
         'total_users': total_users,
-        'total_organizations': total_organizations,
-        'total_plans': total_plans,
+        'total_organizations': metrics['total_organizations'],
+        'total_plans': metrics['total_plans'],
         'total_subscriptions': total_subscriptions,
         
         # Métricas de crecimiento
-        'new_users_this_month': new_users_this_month,
-        'new_orgs_this_month': new_orgs_this_month,
-        'user_growth': user_growth,
-        'org_growth': org_growth,
+        'new_users_this_month': metrics['new_users_this_month'],
+        'new_orgs_this_month': metrics['new_orgs_this_month'],
+        'user_growth': metrics['user_growth'],
+        'org_growth': metrics['org_growth'],
         
         # Estadísticas de planes
-        'plan_stats': plan_stats,
+        'plan_stats': metrics['plan_stats'],
         
         # Actividades recientes
         'recent_activities': recent_activities,
         
         # Datos para gráficos
-        'chart_data': chart_data,
+        'chart_data': metrics['chart_data'],
         
         # Métricas adicionales
         'active_subscriptions': total_subscriptions,
         'subscription_rate': round((total_subscriptions / total_users * 100), 1) if total_users > 0 else 0,
-        'pending_upgrades': pending_upgrades,
+        'pending_upgrades': metrics['pending_upgrades'],
         'tasks': [],  # Placeholder hasta que se implemente módulo de tareas
     }
     
@@ -266,6 +185,7 @@ def test_ses_view(request):
             
             # Verificar cuotas
             quota_response = ses_client.get_send_quota()
+            remember_send_quota(quota_response)
             
             results['ses_test'] = {
                 'success': True,
@@ -2,14 +2,19 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.contrib import messages
-from .models import Organization
+from core.pagination import ApproximateCountAdminMixin
+from core.search import IndexedSearchMixin
+from .cache_utils import bump_organization_cache_versions
+from .models import Organization, OrganizationAlert
 
 @admin.register(Organization)
-class OrganizationAdmin(admin.ModelAdmin):
+class OrganizationAdmin(ApproximateCountAdminMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = ['name', 'is_active', 'get_user_count', 'get_subscription_status', 'get_subscription_link', 'created_at']
     list_filter = ['is_active', 'created_at', 'subscription__plan', 'subscription__subscription_status']
-    search_fields = ['name', 'description']
+    search_fields = ['name', 'description']  # Búsqueda sobre search_text indexado (core.search)
     readonly_fields = ['created_at', 'updated_at', 'get_user_count', 'get_subscription_status', 'get_subscription_link']
+    # Suscripción y plan en la misma consulta: las columnas los leen por fila
+    list_select_related = ['subscription__plan']
     
     # Solo 2 acciones esenciales
     actions = ['activate_organizations', 'deactivate_organizations']
@@ -34,9 +39,10 @@ class OrganizationAdmin(admin.ModelAdmin):
     )
     
     def get_user_count(self, obj):
-        """Muestra el total de usuarios"""
+        """Muestra el total de usuarios (contador desnormalizado, sin COUNT por fila)"""
         return f"{obj.get_user_count()} usuarios"
     get_user_count.short_description = 'Usuarios'
+    get_user_count.admin_order_field = 'user_count'
     
     def get_subscription_status(self, obj):
         """Muestra el estado de la suscripción de forma simple y visual."""
@@ -81,10 +87,21 @@ class OrganizationAdmin(admin.ModelAdmin):
             return format_html('<a href="{}" class="button">➕ Crear suscripción</a>', add_subscription_url)
     get_subscription_link.short_description = 'Gestión'
     
+    def _update_organizations(self, queryset, **values):
+        """
+        QuerySet.update sin señales: invalidar el cache de las organizaciones.
+        Los pks se fijan ANTES del update (el queryset conserva los filtros del
+        changelist, p.ej. is_active, y después ya no coincidiría).
+        """
+        pks = list(queryset.values_list('pk', flat=True))
+        updated = Organization.objects.filter(pk__in=pks).update(**values)
+        bump_organization_cache_versions(pks)
+        return updated
+
     # Solo acciones esenciales para activar/desactivar
     def activate_organizations(self, request, queryset):
         """Activar organizaciones seleccionadas"""
-        updated = queryset.update(is_active=True)
+        updated = self._update_organizations(queryset, is_active=True)
         self.message_user(
             request,
             f"✅ Se activaron {updated} organizaciones correctamente.",
@@ -94,10 +111,26 @@ class OrganizationAdmin(admin.ModelAdmin):
     
     def deactivate_organizations(self, request, queryset):
         """Desactivar organizaciones seleccionadas"""
-        updated = queryset.update(is_active=False)
+        updated = self._update_organizations(queryset, is_active=False)
         self.message_user(
             request,
             f"❌ Se desactivaron {updated} organizaciones correctamente.",
             messages.SUCCESS
         )
     deactivate_organizations.short_description = "❌ Desactivar organizaciones"
+
+
+@admin.register(OrganizationAlert)
+class OrganizationAlertAdmin(ApproximateCountAdminMixin, admin.ModelAdmin):
+    """Banners precalculados por send_expiry_reminders (solo lectura)"""
+    list_display = ['organization', 'level', 'reason', 'days_remaining', 'period_end', 'valid_until', 'updated_at']
+    list_filter = ['level', 'reason']
+    search_fields = ['organization__name', 'message']
+    list_select_related = ['organization']
+    readonly_fields = ['organization', 'level', 'reason', 'message', 'days_remaining', 'period_end', 'valid_until', 'updated_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
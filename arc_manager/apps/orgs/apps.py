@@ -5,3 +5,6 @@ class OrgsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.orgs'
     label = 'orgs'
+    
+    def ready(self):
+        import apps.orgs.signals
@@ -2,14 +2,203 @@
 Utilidades de cache específicas para organizaciones
 Ejemplos prácticos de cómo usar Redis en el proyecto
 """
-from django.core.cache import cache
 from django.conf import settings
+from core.cache import tiered_cache
+from django.db import DEFAULT_DB_ALIAS
 from functools import wraps
 import hashlib
 
 # Timeout por defecto para cache de organización
 ORG_CACHE_TIMEOUT = 60 * 15  # 15 minutos
 
+# Timeout del snapshot de tenant (organización + suscripción + plan + conteos)
+ORG_SNAPSHOT_TIMEOUT = getattr(settings, 'ORG_SNAPSHOT_CACHE_TIMEOUT', ORG_CACHE_TIMEOUT)
+
+# Vigencia de la copia en memoria de cada worker (core.cache). Las versiones
+# deciden la invalidación entre workers: otro worker puede ver la anterior
+# hasta ORG_VERSION_LOCAL_TIMEOUT segundos. Las claves versionadas no cambian
+# de contenido y pueden vivir más en memoria.
+ORG_VERSION_LOCAL_TIMEOUT = getattr(settings, 'ORG_VERSION_LOCAL_TIMEOUT', 1)
+ORG_SNAPSHOT_LOCAL_TIMEOUT = getattr(settings, 'ORG_SNAPSHOT_LOCAL_TIMEOUT', 60)
+
+# Versión global: invalida los snapshots de TODAS las organizaciones (p.ej. cambios de Plan)
+GLOBAL_ORG_VERSION_KEY = "org_version:global"
+
+
+# =============================================================================
+# Claves versionadas
+# =============================================================================
+# En lugar de borrar por patrón (RedisCache de Django no tiene delete_pattern)
+# cada organización tiene un contador de versión. Las claves incluyen la
+# versión, así que invalidar es un simple INCR: las claves viejas dejan de
+# leerse y expiran solas por TTL.
+
+def _org_version_key(organization_id):
+    return f"org_version:{organization_id}"
+
+
+def get_organization_cache_version(organization_id):
+    """Retorna la versión actual (global + organización): memoria o un solo round-trip"""
+    org_key = _org_version_key(organization_id)
+    versions = tiered_cache.get_many(
+        [GLOBAL_ORG_VERSION_KEY, org_key],
+        namespace='org_version',
+        local_timeout=ORG_VERSION_LOCAL_TIMEOUT,
+    )
+    return f"{versions.get(GLOBAL_ORG_VERSION_KEY, 1)}.{versions.get(org_key, 1)}"
+
+
+def organization_cache_key(organization_id, name, version=None):
+    """Construye una clave versionada para datos de una organización"""
+    if version is None:
+        version = get_organization_cache_version(organization_id)
+    return f"org:{organization_id}:v{version}:{name}"
+
+
+def bump_organization_cache_version(organization_id=None):
+    """
+    Invalida todo el cache de una organización incrementando su versión.
+    Sin organization_id invalida el cache de todas las organizaciones.
+    """
+    key = _org_version_key(organization_id) if organization_id else GLOBAL_ORG_VERSION_KEY
+    # La versión implícita es 1: si la clave no existe la creamos ya en 2
+    # (add/incr descartan también la copia en memoria de este worker)
+    if tiered_cache.add(key, 2, None, namespace='org_version'):
+        return
+    try:
+        tiered_cache.incr(key, namespace='org_version')
+    except ValueError:
+        # La clave expiró/se desalojó entre add() e incr(); también pisa la copia local
+        tiered_cache.set(key, 2, None, namespace='org_version', local_timeout=ORG_VERSION_LOCAL_TIMEOUT)
+
+
+def bump_organization_cache_versions(organization_ids):
+    """Invalida varias organizaciones (p.ej. tras un queryset.update() sin señales)"""
+    for organization_id in set(organization_ids):
+        if organization_id:
+            bump_organization_cache_version(organization_id)
+
+
+# =============================================================================
+# Snapshot de organización
+# =============================================================================
+
+def _model_to_dict(instance):
+    """Serializa los campos concretos de un modelo a un dict de primitivas"""
+    return {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+
+
+def _model_from_dict(model, data):
+    """Reconstruye una instancia 'cargada de BD' desde un dict de _model_to_dict"""
+    return model.from_db(DEFAULT_DB_ALIAS, list(data), list(data.values()))
+
+
+def build_organization_snapshot(organization_id):
+    """
+    Construye el snapshot de una organización con UNA consulta (los conteos
+    de usuarios son columnas desnormalizadas y la alerta viene precalculada).
+    Retorna (snapshot, organization) o (None, None) si no existe.
+    """
+    from .models import Organization
+
+    organization = (
+        Organization.objects
+        .select_related('subscription__plan', 'alert')
+        .filter(pk=organization_id)
+        .first()
+    )
+    if organization is None:
+        return None, None
+    return snapshot_from_organization(organization), organization
+
+
+def snapshot_from_organization(organization):
+    """
+    Snapshot de una organización ya cargada con
+    select_related('subscription__plan', 'alert') (sin consultas)
+    """
+    subscription = getattr(organization, 'subscription', None)
+    alert = getattr(organization, 'alert', None)
+    return {
+        'organization': _model_to_dict(organization),
+        'subscription': _model_to_dict(subscription) if subscription else None,
+        'plan': _model_to_dict(subscription.plan) if subscription else None,
+        'alert': _model_to_dict(alert) if alert else None,
+        'counts': {
+            'total': organization.user_count,
+            'active': organization.active_user_count,
+            'admins': organization.admin_user_count,
+        },
+    }
+
+
+def get_organization_snapshot(organization_id):
+    """
+    Retorna el snapshot de la organización desde cache o lo construye.
+    Retorna (snapshot, organization): organization solo viene poblada cuando
+    hubo que ir a la BD (para reutilizar la instancia sin otra consulta).
+    """
+    built = {}
+
+    def build():
+        snapshot, built['organization'] = build_organization_snapshot(organization_id)
+        return snapshot
+
+    snapshot = tiered_cache.get_or_set(
+        organization_cache_key(organization_id, 'snapshot'),
+        build,
+        ORG_SNAPSHOT_TIMEOUT,
+        namespace='org_snapshot',
+        local_timeout=ORG_SNAPSHOT_LOCAL_TIMEOUT,
+    )
+    return snapshot, built.get('organization')
+
+
+def prime_organization_snapshot(organization):
+    """Cachea el snapshot de una organización ya cargada (p.ej. junto con el usuario)"""
+    snapshot = snapshot_from_organization(organization)
+    tiered_cache.set(
+        organization_cache_key(organization.pk, 'snapshot'),
+        snapshot,
+        ORG_SNAPSHOT_TIMEOUT,
+        namespace='org_snapshot',
+        local_timeout=ORG_SNAPSHOT_LOCAL_TIMEOUT,
+    )
+    return snapshot
+
+
+def organization_from_snapshot(snapshot):
+    """
+    Reconstruye Organization -> Subscription -> Plan (y su alerta) desde un
+    snapshot, con las relaciones ya cacheadas para que acceder a ellas no
+    consulte la BD.
+    """
+    from apps.plans.models import Plan, Subscription
+    from .models import Organization, OrganizationAlert
+
+    organization = _model_from_dict(Organization, snapshot['organization'])
+    counts = snapshot['counts']
+    organization.total_users = counts['total']
+    organization.active_users = counts['active']
+    organization.admin_users = counts['admins']
+
+    if snapshot['subscription'] is not None:
+        subscription = _model_from_dict(Subscription, snapshot['subscription'])
+        Subscription.plan.field.set_cached_value(subscription, _model_from_dict(Plan, snapshot['plan']))
+        Subscription.organization.field.set_cached_value(subscription, organization)
+        Organization.subscription.related.set_cached_value(organization, subscription)
+    else:
+        # Cachear la ausencia para que hasattr(org, 'subscription') no consulte
+        Organization.subscription.related.set_cached_value(organization, None)
+
+    alert = snapshot.get('alert')
+    if alert is not None:
+        alert = _model_from_dict(OrganizationAlert, alert)
+        OrganizationAlert.organization.field.set_cached_value(alert, organization)
+    Organization.alert.related.set_cached_value(organization, alert)
+
+    return organization
+
 def cache_organization_data(timeout=ORG_CACHE_TIMEOUT):
     """
     Decorator para cachear datos de organización
@@ -18,18 +207,16 @@ def cache_organization_data(timeout=ORG_CACHE_TIMEOUT):
     def decorator(func):
         @wraps(func)
         def wrapper(organization_id, *args, **kwargs):
-            # Crear clave única para esta organización y función
-            cache_key = f"org_data:{organization_id}:{func.__name__}"
-            
-            # Intentar obtener del cache
-            cached_result = cache.get(cache_key)
-            if cached_result is not None:
-                return cached_result
+            # Crear clave única (y versionada) para esta organización y función
+            cache_key = organization_cache_key(organization_id, f"data:{func.__name__}")
             
-            # Si no está en cache, ejecutar función y guardar resultado
-            result = func(organization_id, *args, **kwargs)
-            cache.set(cache_key, result, timeout)
-            return result
+            # Memoria -> Redis -> función (un solo worker la recalcula a la vez)
+            return tiered_cache.get_or_set(
+                cache_key,
+                lambda: func(organization_id, *args, **kwargs),
+                timeout,
+                namespace='org_data',
+            )
         return wrapper
     return decorator
 
@@ -41,15 +228,14 @@ def cache_user_permissions(timeout=60*30):  # 30 minutos
     def decorator(func):
         @wraps(func)
         def wrapper(user_id, organization_id, *args, **kwargs):
-            cache_key = f"user_perms:{user_id}:{organization_id}:{func.__name__}"
-            
-            cached_result = cache.get(cache_key)
-            if cached_result is not None:
-                return cached_result
+            cache_key = organization_cache_key(organization_id, f"perms:{user_id}:{func.__name__}")
             
-            result = func(user_id, organization_id, *args, **kwargs)
-            cache.set(cache_key, result, timeout)
-            return result
+            return tiered_cache.get_or_set(
+                cache_key,
+                lambda: func(user_id, organization_id, *args, **kwargs),
+                timeout,
+                namespace='org_perms',
+            )
         return wrapper
     return decorator
 
@@ -64,32 +250,27 @@ class OrganizationCacheMixin:
         Obtiene estadísticas de organización desde cache
         Ejemplo: número de usuarios, planes activos, etc.
         """
-        cache_key = f"org_stats:{organization_id}"
-        stats = cache.get(cache_key)
-        
-        if stats is None:
-            # Calcular estadísticas (esto sería costoso sin cache)
-            stats = self._calculate_organization_stats(organization_id)
-            cache.set(cache_key, stats, 60 * 10)  # Cache por 10 minutos
-        
-        return stats
+        # Cache por 10 minutos; al vencer se refresca antes de tiempo (sin estampida)
+        return tiered_cache.get_or_set(
+            organization_cache_key(organization_id, 'stats'),
+            lambda: self._calculate_organization_stats(organization_id),
+            60 * 10,
+            namespace='org_stats',
+        )
     
     def _calculate_organization_stats(self, organization_id):
         """
-        Cálculo real de estadísticas (sin cache)
-        Esta función sería lenta sin Redis
+        Cálculo de estadísticas a partir del snapshot de la organización
         """
-        from apps.users.models import User
-        from apps.plans.models import Plan
+        snapshot, _ = get_organization_snapshot(organization_id)
+        if snapshot is None:
+            return None
         
+        plan = snapshot['plan']
         return {
-            'total_users': User.objects.filter(organization_id=organization_id).count(),
-            'active_users': User.objects.filter(
-                organization_id=organization_id, 
-                is_active=True
-            ).count(),
-            'current_plan': 'Pro',  # Esto vendría de la BD
-            'last_updated': 'now'
+            'total_users': snapshot['counts']['total'],
+            'active_users': snapshot['counts']['active'],
+            'current_plan': plan['display_name'] if plan else None,
         }
     
     def invalidate_organization_cache(self, organization_id):
@@ -97,86 +278,70 @@ class OrganizationCacheMixin:
         Invalida todo el cache relacionado con una organización
         Útil cuando se actualizan datos importantes
         """
-        cache_patterns = [
-            f"org_data:{organization_id}:*",
-            f"org_stats:{organization_id}",
-            f"user_perms:*:{organization_id}:*"
-        ]
-        
-        # Django-redis permite eliminar por patrón
-        for pattern in cache_patterns:
-            cache.delete_pattern(pattern)
+        bump_organization_cache_version(organization_id)
 
 # Funciones de utilidad específicas para el proyecto
-def cache_plans_list(timeout=60*60):  # 1 hora
+def cache_plans_list():
     """
-    Cachea la lista de planes disponibles
-    Los planes no cambian frecuentemente
+    Lista de planes activos desde el catálogo en memoria (apps.plans.catalog),
+    sin consultas ni round-trips al cache
     """
-    cache_key = "available_plans"
-    plans = cache.get(cache_key)
-    
-    if plans is None:
-        from apps.plans.models import Plan
-        plans = list(Plan.objects.filter(is_active=True).values(
-            'id', 'name', 'price', 'max_users', 'features'
-        ))
-        cache.set(cache_key, plans, timeout)
-    
-    return plans
+    from apps.plans.catalog import get_catalog
+
+    return [
+        {
+            'id': entry.pk,
+            'name': entry.name,
+            'price': entry.price,
+            'max_users': entry.max_users,
+            'features': list(entry.feature_list),
+        }
+        for entry in get_catalog().active_entries()
+    ]
 
 def cache_user_organization_context(user_id, timeout=60*15):
     """
     Cachea el contexto de organización del usuario
     Evita consultas repetidas en cada request
     """
-    cache_key = f"user_org_context:{user_id}"
-    context = cache.get(cache_key)
-    
-    if context is None:
+    def build():
         from apps.accounts.models import User
         try:
             user = User.objects.select_related('organization').get(id=user_id)
-            context = {
-                'organization_id': user.organization.id if user.organization else None,
-                'organization_name': user.organization.name if user.organization else None,
-                'user_role': 'admin',  # Esto vendría del modelo
-                'permissions': ['read', 'write', 'delete']  # Ejemplo
-            }
         except User.DoesNotExist:
-            context = None
-        
-        cache.set(cache_key, context, timeout)
-    
-    return context
+            return None
+        return {
+            'organization_id': user.organization.id if user.organization else None,
+            'organization_name': user.organization.name if user.organization else None,
+            'user_role': 'admin',  # Esto vendría del modelo
+            'permissions': ['read', 'write', 'delete']  # Ejemplo
+        }
+
+    return tiered_cache.get_or_set(f"user_org_context:{user_id}", build, timeout)
 
 # Rate limiting con Redis
 def rate_limit_user_actions(max_actions=100, window_seconds=3600):
     """
     Limita acciones por usuario usando Redis
     Útil para API endpoints o acciones sensibles
+
+    Delegado a apps.orgs.ratelimit (ventana deslizante atómica con fallback
+    local); responde 429 con Retry-After.
     """
+    from .ratelimit import RateLimitPolicy, hit, too_many_requests
+
     def decorator(func):
+        policy = RateLimitPolicy(func.__name__, max_actions, window_seconds, scope='user', methods=None)
+
         @wraps(func)
         def wrapper(request, *args, **kwargs):
             if not hasattr(request, 'user') or not request.user.is_authenticated:
                 return func(request, *args, **kwargs)
-            
-            user_id = request.user.id
-            cache_key = f"rate_limit:{user_id}:{func.__name__}"
-            
-            # Obtener contador actual
-            current_count = cache.get(cache_key, 0)
-            
-            if current_count >= max_actions:
-                from django.http import HttpResponseTooManyRequests
-                return HttpResponseTooManyRequests(
-                    "Too many requests. Try again later."
-                )
-            
-            # Incrementar contador
-            cache.set(cache_key, current_count + 1, window_seconds)
-            
+
+            result = hit(policy, request)
+            if not result:
+                return too_many_requests(result)
+
             return func(request, *args, **kwargs)
         return wrapper
-    return decorator 
\ No newline at end of file
+    return decorator
@@ -0,0 +1,139 @@
+"""
+Contexto de tenant por request.
+
+Agrupa organización, suscripción, plan y conteos de usuarios en un único
+objeto que se evalúa de forma perezosa la primera vez que se consulta.
+"""
+from django.utils.functional import cached_property
+
+from .cache_utils import get_organization_snapshot, organization_from_snapshot
+
+
+class TenantContext:
+    """
+    Contexto perezoso de la organización del usuario actual.
+
+    La primera vez que se accede a cualquier atributo se lee el snapshot de la
+    organización desde cache (o se construye con UNA consulta agregada:
+    organización + suscripción + plan + conteos de usuarios). El resto de
+    atributos se sirven desde memoria.
+
+    Con ``read_only=True`` las transiciones de estado vencidas se aplican solo
+    en memoria (sin escribir en la base de datos).
+    """
+
+    def __init__(self, user, read_only=False):
+        self.user = user
+        self.read_only = read_only
+        if user is not None and user.is_authenticated:
+            self.organization_id = getattr(user, 'organization_id', None)
+        else:
+            self.organization_id = None
+
+    def __bool__(self):
+        return self.organization_id is not None
+
+    @cached_property
+    def _loaded(self):
+        if self.organization_id is None:
+            return None, None
+        # El backend de autenticación (apps.accounts.backends) ya adjuntó la organización
+        snapshot = getattr(self.user, '_tenant_snapshot', None)
+        if snapshot is not None and snapshot['organization']['id'] == self.organization_id:
+            return snapshot, self.user.organization
+        return get_organization_snapshot(self.organization_id)
+
+    @property
+    def snapshot(self):
+        return self._loaded[0]
+
+    @cached_property
+    def organization(self):
+        """Organización con suscripción/plan ya cacheados y conteos anotados"""
+        snapshot, organization = self._loaded
+        if organization is None and snapshot is not None:
+            organization = organization_from_snapshot(snapshot)
+        if organization is not None and self.user is not None:
+            # request.user.organization reutiliza la misma instancia (sin otra consulta)
+            self.user._meta.get_field('organization').set_cached_value(self.user, organization)
+        return organization
+
+    @cached_property
+    def subscription(self):
+        organization = self.organization
+        if organization is None:
+            return None
+        # La relación ya está cacheada; si no existe no hay consulta extra
+        subscription = getattr(organization, 'subscription', None)
+        if subscription is not None:
+            # Solo escribe si la transición precalculada ya venció
+            subscription.refresh_status_if_due(persist=not self.read_only)
+        return subscription
+
+    @cached_property
+    def alert(self):
+        """Banner precalculado por el pipeline nocturno, o None si no aplica"""
+        organization = self.organization
+        if organization is None:
+            return None
+        alert = getattr(organization, 'alert', None)
+        if alert is None or not alert.is_current(self.subscription):
+            return None
+        return alert
+
+    @property
+    def plan(self):
+        subscription = self.subscription
+        return subscription.plan if subscription else None
+
+    # Conteos de usuarios
+    def _count(self, name):
+        snapshot = self.snapshot
+        return snapshot['counts'][name] if snapshot else 0
+
+    @property
+    def user_count(self):
+        return self._count('total')
+
+    @property
+    def active_user_count(self):
+        return self._count('active')
+
+    @property
+    def inactive_user_count(self):
+        return self.user_count - self.active_user_count
+
+    @property
+    def admin_user_count(self):
+        return self._count('admins')
+
+    # Límites derivados
+    @property
+    def max_users(self):
+        plan = self.plan
+        return plan.max_users if plan else 1
+
+    @property
+    def can_add_user(self):
+        if self.organization is None:
+            return False
+        return self.organization.can_add_user(context=self)
+
+    @property
+    def limits(self):
+        if self.organization is None:
+            return None
+        return self.organization.get_subscription_limits(context=self)
+
+    @property
+    def is_org_admin(self):
+        return bool(self.user is not None and getattr(self.user, 'is_org_admin', False))
+
+
+def get_request_tenant(request):
+    """Contexto de tenant del request; lo crea si ningún middleware lo adjuntó"""
+    tenant = getattr(request, 'tenant', None)
+    if tenant is None:
+        tenant = TenantContext(getattr(request, 'user', None))
+        request.tenant = tenant
+    return tenant
@@ -0,0 +1,121 @@
+"""
+Contadores desnormalizados de usuarios por organización.
+
+``Organization.user_count``, ``active_user_count`` y ``admin_user_count`` se
+mantienen con expresiones ``F()`` en el mismo camino (y transacción) que guarda
+o elimina al usuario, así que las verificaciones de límites leen una fila en
+lugar de contar usuarios. ``recount_organization_counters`` los recalcula desde
+la tabla de usuarios (comando ``recount_org_counters`` y acciones masivas que
+usan ``QuerySet.update``).
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# Campos del usuario que afectan a los contadores
+COUNTER_FIELDS = ('organization_id', 'is_active', 'is_org_admin')
+
+
+def user_counter_state(user):
+    """(organization_id, is_active, is_org_admin) actual de la instancia"""
+    return (user.organization_id, bool(user.is_active), bool(user.is_org_admin))
+
+
+def _deltas(state, sign):
+    organization_id, is_active, is_org_admin = state
+    return organization_id, {
+        'user_count': sign,
+        'active_user_count': sign if is_active else 0,
+        'admin_user_count': sign if is_org_admin else 0,
+    }
+
+
+def apply_user_counter_delta(old_state, new_state, organizations=()):
+    """
+    Aplica a las organizaciones afectadas la diferencia entre dos estados de un
+    usuario (None = el usuario no existía / ya no existe). Un UPDATE por
+    organización afectada, ninguno si no cambió nada relevante.
+
+    `organizations` son instancias ya cargadas que se ajustan también en memoria.
+    """
+    apply_user_counter_deltas([(old_state, new_state)], organizations=organizations)
+
+
+def apply_user_counter_deltas(transitions, organizations=()):
+    """
+    Igual que apply_user_counter_delta para varios usuarios a la vez
+    [(old_state, new_state), ...]: las diferencias se acumulan y se aplica un
+    UPDATE por organización (altas masivas con bulk_create).
+    """
+    from .models import Organization
+
+    changes = {}
+    for old_state, new_state in transitions:
+        if old_state == new_state:
+            continue
+        for state, sign in ((old_state, -1), (new_state, 1)):
+            if state is None or state[0] is None:
+                continue
+            organization_id, deltas = _deltas(state, sign)
+            totals = changes.setdefault(organization_id, {})
+            for field, delta in deltas.items():
+                totals[field] = totals.get(field, 0) + delta
+
+    for organization_id, totals in changes.items():
+        values = {field: F(field) + delta for field, delta in totals.items() if delta}
+        if values:
+            Organization.objects.filter(pk=organization_id).update(**values)
+
+        for organization in organizations:
+            if organization is not None and organization.pk == organization_id:
+                for field, delta in totals.items():
+                    setattr(organization, field, getattr(organization, field) + delta)
+
+
+def recount_organization_counters(organization_ids=None):
+    """
+    Recalcula los contadores desde la tabla de usuarios con un único UPDATE
+    (subconsultas correlacionadas). Retorna la cantidad de organizaciones tocadas.
+    """
+    from .models import Organization
+
+    User = get_user_model()
+
+    def count_subquery(**filters):
+        users = (
+            User.objects.filter(organization=OuterRef('pk'), **filters)
+            .order_by()
+            .values('organization')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return Coalesce(Subquery(users, output_field=IntegerField()), Value(0))
+
+    organizations = Organization.objects.all()
+    if organization_ids is not None:
+        organizations = organizations.filter(pk__in=list(organization_ids))
+
+    return organizations.update(
+        user_count=count_subquery(),
+        active_user_count=count_subquery(is_active=True),
+        admin_user_count=count_subquery(is_org_admin=True),
+    )
+
+
+def find_counter_drift(organization_ids=None):
+    """Organizaciones cuyos contadores no coinciden con la tabla de usuarios"""
+    from .models import Organization
+
+    organizations = Organization.objects.annotate(
+        real_total=Count('users', distinct=True),
+        real_active=Count('users', filter=Q(users__is_active=True), distinct=True),
+        real_admins=Count('users', filter=Q(users__is_org_admin=True), distinct=True),
+    )
+    if organization_ids is not None:
+        organizations = organizations.filter(pk__in=list(organization_ids))
+
+    return [
+        org for org in organizations
+        if (org.user_count, org.active_user_count, org.admin_user_count)
+        != (org.real_total, org.real_active, org.real_admins)
+    ]
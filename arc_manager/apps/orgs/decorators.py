@@ -4,39 +4,59 @@ from django.contrib import messages
 from django.shortcuts import redirect
 from django.core.exceptions import PermissionDenied
 
+from apps.plans.catalog import attach_plan
+from .seats import SeatLimitExceeded
+
+
+def _user_limit_response(request, org):
+    """Respuesta de límite de usuarios alcanzado (AJAX o redirect con mensaje)"""
+    limit_info = org.can_add_user_detailed()
+    
+    error_message = (
+        f"No se puede crear el usuario. Tu organización ha alcanzado "
+        f"el límite de {org.get_max_users()} usuarios. "
+        f"Actualmente tienes {limit_info['total_users']} usuarios "
+        f"({limit_info['active_users']} activos, {limit_info['inactive_users']} inactivos)."
+    )
+    
+    if limit_info['has_inactive_users']:
+        error_message += " Considera reactivar usuarios inactivos o contacta con soporte."
+    else:
+        error_message += " Contacta con soporte para incrementar tu límite."
+    
+    # Para requests AJAX
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({
+            'success': False,
+            'error': error_message,
+            'limit_info': limit_info
+        }, status=400)
+    
+    # Para requests normales
+    messages.error(request, error_message)
+    return redirect('users:user_list')
+
 
 def check_user_limit(view_func):
-    """Decorador para verificar límite de usuarios antes de crear"""
+    """
+    Decorador para verificar límite de usuarios antes de crear.
+    
+    La verificación previa (una fila, contadores desnormalizados) solo evita
+    trabajo inútil; la garantía la da reserve_seat() al guardar el usuario, cuyo
+    SeatLimitExceeded se convierte aquí en la misma respuesta.
+    """
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if request.method == 'POST' and request.user.organization:
             org = request.user.organization
             if not org.can_add_user():
-                limit_info = org.can_add_user_detailed()
-                
-                error_message = (
-                    f"No se puede crear el usuario. Tu organización ha alcanzado "
-                    f"el límite de {org.get_max_users()} usuarios. "
-                    f"Actualmente tienes {limit_info['total_users']} usuarios "
-                    f"({limit_info['active_users']} activos, {limit_info['inactive_users']} inactivos)."
-                )
-                
-                if limit_info['has_inactive_users']:
-                    error_message += " Considera reactivar usuarios inactivos o contacta con soporte."
-                else:
-                    error_message += " Contacta con soporte para incrementar tu límite."
-                
-                # Para requests AJAX
-                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    return JsonResponse({
-                        'success': False,
-                        'error': error_message,
-                        'limit_info': limit_info
-                    }, status=400)
-                
-                # Para requests normales
-                messages.error(request, error_message)
-                return redirect('users:user_list')
+                return _user_limit_response(request, org)
+            
+            try:
+                return view_func(request, *args, **kwargs)
+            except SeatLimitExceeded:
+                org.refresh_from_db(fields=['user_count', 'active_user_count', 'admin_user_count'])
+                return _user_limit_response(request, org)
         
         return view_func(request, *args, **kwargs)
     return wrapper
@@ -134,7 +154,8 @@ def require_plan_feature(feature_name):
                 
                 raise PermissionDenied("No tienes una organización asignada.")
             
-            subscription = request.user.organization.get_subscription()
+            # El plan sale del catálogo en memoria, sin consulta
+            subscription = attach_plan(request.user.organization.get_subscription())
             if not subscription:
                 # Para requests AJAX
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
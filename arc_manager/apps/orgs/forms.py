@@ -1,15 +1,23 @@
 from django import forms
 from .models import Organization
-from apps.plans.models import Plan
+from apps.plans.catalog import active_plans, get_plan, get_plan_by_name
+
+
+class PlanChoiceField(forms.TypedChoiceField):
+    """Selector de planes activos servido por el catálogo en memoria (sin consultas)"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('choices', lambda: [(plan.pk, str(plan)) for plan in active_plans()])
+        kwargs.setdefault('coerce', lambda pk: get_plan(pk, active_only=True))
+        super().__init__(**kwargs)
+
 
 class OrganizationForm(forms.ModelForm):
     """Formulario para crear y editar organizaciones"""
     
     # Campo adicional para seleccionar el plan inicial
-    initial_plan = forms.ModelChoiceField(
-        queryset=Plan.objects.filter(is_active=True).order_by('price', 'max_users'),
+    initial_plan = PlanChoiceField(
         required=True,
-        empty_label=None,
         widget=forms.Select(attrs={
             'class': 'form-control',
             'data-toggle': 'tooltip',
@@ -41,16 +49,14 @@ class OrganizationForm(forms.ModelForm):
         
         # Si es una nueva organización, establecer plan de prueba por defecto
         if not self.instance.pk:
-            try:
-                trial_plan = Plan.objects.get(name='trial', is_active=True)
+            trial_plan = get_plan_by_name('trial')
+            if trial_plan:
                 self.fields['initial_plan'].initial = trial_plan.pk
                 self.fields['initial_plan'].help_text = "Se creará automáticamente una suscripción de prueba gratuita de 30 días."
-            except Plan.DoesNotExist:
-                try:
-                    basic_plan = Plan.objects.get(name='basic', is_active=True)
+            else:
+                basic_plan = get_plan_by_name('basic')
+                if basic_plan:
                     self.fields['initial_plan'].initial = basic_plan.pk
-                except Plan.DoesNotExist:
-                    pass
         else:
             # Si es edición, no mostrar el campo de plan inicial
             if 'initial_plan' in self.fields:
@@ -69,20 +75,14 @@ class OrganizationForm(forms.ModelForm):
     
     def save(self, commit=True):
         """Sobrescribir save para crear la suscripción automáticamente"""
-        from apps.plans.models import Subscription
-        
         instance = super().save(commit=False)
         
+        # Si es una nueva organización, la señal post_save provisiona la
+        # suscripción con el plan elegido (de forma idempotente)
+        if not instance.pk:
+            instance._initial_plan = self.cleaned_data.get('initial_plan')
+        
         if commit:
             instance.save()
-            
-            # Si es una nueva organización, crear la suscripción
-            if not hasattr(instance, 'subscription'):
-                initial_plan = self.cleaned_data.get('initial_plan')
-                if initial_plan:
-                    Subscription.objects.create(
-                        organization=instance,
-                        plan=initial_plan
-                    )
         
         return instance 
\ No newline at end of file
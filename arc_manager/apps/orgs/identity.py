@@ -0,0 +1,154 @@
+"""
+Mapa de identidad por request.
+
+Una vista que valida permisos en ``dispatch`` y vuelve a cargar el mismo
+objeto en ``get``/``post`` paga dos consultas por la misma fila. El mapa
+guarda las instancias ya materializadas por (modelo, pk): la segunda
+búsqueda retorna la misma instancia sin ir a la BD.
+
+``get_identity_map(request)`` lo crea la primera vez y lo deja en
+``request.identity_map``. Se siembra con la organización (y su suscripción)
+que ``request.user`` ya tiene cacheada por el backend de autenticación o el
+``TenantContext``, sin consultas.
+
+Al registrar una instancia, sus FKs hacia filas que ya están en el mapa
+quedan cacheadas (``user.organization`` no consulta si la organización del
+request ya está registrada).
+
+``organization_users(organization)`` trae los usuarios de la organización
+en UNA consulta (perezosa) y los particiona en Python: ``all``, ``active`` y
+``admins``.
+
+El mapa no aplica filtros: la vista sigue siendo responsable de verificar
+que el objeto pertenece a la organización del usuario. ``request.user`` no se
+registra, para que un formulario inválido sobre el propio perfil no altere
+al usuario del request.
+"""
+from django.contrib.auth import get_user_model
+from django.http import Http404
+from django.utils.functional import cached_property
+
+
+class OrganizationUsers:
+    """Usuarios de una organización, cargados una vez y particionados en memoria"""
+
+    def __init__(self, identity_map, organization):
+        self.identity_map = identity_map
+        self.organization = organization
+
+    @cached_property
+    def all(self):
+        users = self.organization.users.order_by('first_name', 'last_name', 'pk')
+        return [self.identity_map.add(user) for user in users]
+
+    @cached_property
+    def active(self):
+        return [user for user in self.all if user.is_active]
+
+    @cached_property
+    def admins(self):
+        # Mismo criterio que Organization.get_admins
+        return [user for user in self.all if user.is_org_admin]
+
+    @cached_property
+    def inactive(self):
+        return [user for user in self.all if not user.is_active]
+
+
+class IdentityMap:
+    """Instancias del request por (modelo, pk)"""
+
+    def __init__(self):
+        self._instances = {}
+        self._organization_users = {}
+
+    @staticmethod
+    def _key(model, pk):
+        model = model._meta.concrete_model
+        return model, model._meta.pk.to_python(pk)
+
+    def __contains__(self, instance):
+        return instance.pk is not None and self._key(type(instance), instance.pk) in self._instances
+
+    def __len__(self):
+        return len(self._instances)
+
+    def add(self, instance):
+        """Registra una instancia; si ya había una para esa fila, retorna la existente"""
+        if instance is None or instance.pk is None:
+            return instance
+        key = self._key(type(instance), instance.pk)
+        existing = self._instances.get(key)
+        if existing is not None:
+            return existing
+        self._instances[key] = instance
+        self._link(instance)
+        return instance
+
+    def _link(self, instance):
+        """Las FKs que apuntan a filas del mapa usan esas instancias (sin consulta al accederlas)"""
+        for field in instance._meta.concrete_fields:
+            if not (field.many_to_one or field.one_to_one) or not field.target_field.primary_key:
+                continue
+            value = getattr(instance, field.attname)
+            if value is None or field.is_cached(instance):
+                continue
+            related = self._instances.get(self._key(field.related_model, value))
+            if related is not None:
+                field.set_cached_value(instance, related)
+
+    def discard(self, instance):
+        if instance is not None and instance.pk is not None:
+            self._instances.pop(self._key(type(instance), instance.pk), None)
+
+    def get(self, model, pk, queryset=None):
+        """
+        Instancia de `model` con ese pk, desde el mapa o con una consulta
+        (`queryset` permite select_related). Lanza model.DoesNotExist.
+        """
+        try:
+            key = self._key(model, pk)
+        except Exception:
+            raise model.DoesNotExist(f"{model._meta.object_name} {pk!r} no existe")
+        instance = self._instances.get(key)
+        if instance is None:
+            queryset = queryset if queryset is not None else model._default_manager.all()
+            instance = self.add(queryset.get(pk=key[1]))
+        return instance
+
+    def get_or_404(self, model, pk, queryset=None):
+        try:
+            return self.get(model, pk, queryset)
+        except model.DoesNotExist:
+            raise Http404(f"No existe {model._meta.verbose_name} con id {pk}")
+
+    def organization_users(self, organization):
+        """Usuarios de la organización particionados (una consulta, al primer acceso)"""
+        organization = self.add(organization)
+        if organization.pk not in self._organization_users:
+            self._organization_users[organization.pk] = OrganizationUsers(self, organization)
+        return self._organization_users[organization.pk]
+
+
+def _seed(identity_map, user):
+    """Registra la organización/suscripción ya cacheadas en el usuario (sin consultas)"""
+    if user is None or not user.is_authenticated:
+        return
+    organization_field = get_user_model()._meta.get_field('organization')
+    if not organization_field.is_cached(user):
+        return
+    organization = identity_map.add(organization_field.get_cached_value(user))
+    if organization is not None:
+        subscription_related = type(organization).subscription.related
+        if subscription_related.is_cached(organization):
+            identity_map.add(subscription_related.get_cached_value(organization))
+
+
+def get_identity_map(request):
+    """Mapa de identidad del request; lo crea (y siembra) la primera vez"""
+    identity_map = getattr(request, 'identity_map', None)
+    if identity_map is None:
+        identity_map = IdentityMap()
+        _seed(identity_map, getattr(request, 'user', None))
+        request.identity_map = identity_map
+    return identity_map
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from apps.users.importers import RESULT_FILE_TTL_HOURS, delete_expired_result_files
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Borra los CSV de resultado de importaciones de usuarios (contienen emails) '
+        f'con más de USER_IMPORT_RESULT_TTL_HOURS ({RESULT_FILE_TTL_HOURS}) horas'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🧹 Limpiando resultados de importaciones vencidos'))
+
+        deleted = delete_expired_result_files()
+        if deleted:
+            logger.info(f"{deleted} resultados de importación vencidos borrados")
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {deleted} archivos borrados'))
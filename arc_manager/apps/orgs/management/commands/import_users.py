@@ -0,0 +1,100 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.orgs.models import Organization
+from apps.users.importers import HASH_WORKERS, UserImporter, UserImportError, detect_format
+import time
+
+
+class Command(BaseCommand):
+    help = 'Importar usuarios en lote (CSV o JSONL) a una organización'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', type=str, help='Ruta del archivo CSV o JSONL')
+        parser.add_argument(
+            '--org-slug',
+            type=str,
+            help='Slug de la organización destino'
+        )
+        parser.add_argument(
+            '--org-id',
+            type=int,
+            help='ID de la organización destino'
+        )
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'jsonl'],
+            help='Formato del archivo (por defecto se detecta por la extensión)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo validar el archivo, sin crear usuarios'
+        )
+        parser.add_argument(
+            '--no-email',
+            action='store_true',
+            help='No enviar los correos con credenciales'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Procesos para hashear contraseñas (por defecto USER_IMPORT_HASH_WORKERS)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Tamaño de lote de bulk_create (por defecto USER_IMPORT_CHUNK_SIZE)'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Archivo donde guardar el resultado por fila (CSV)'
+        )
+
+    def handle(self, *args, **options):
+        if options['org_id']:
+            organization = Organization.objects.filter(pk=options['org_id']).first()
+        elif options['org_slug']:
+            organization = Organization.objects.filter(slug=options['org_slug']).first()
+        else:
+            raise CommandError('Debes especificar --org-id o --org-slug')
+
+        if organization is None:
+            raise CommandError('Organización no encontrada')
+
+        importer = UserImporter(
+            organization,
+            send_emails=not options['no_email'],
+            chunk_size=options['chunk_size'],
+            hash_workers=options['workers'] if options['workers'] is not None else HASH_WORKERS,
+        )
+
+        self.stdout.write(f'📥 Importando usuarios en {organization.name}...')
+        started = time.monotonic()
+        try:
+            file_format = options['format'] or detect_format(options['file'])
+            with open(options['file'], 'rb') as source:
+                result = importer.run(source, file_format=file_format, dry_run=options['dry_run'])
+        except (OSError, UserImportError) as e:
+            raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+
+        for row in result.error_rows[:20]:
+            self.stdout.write(self.style.WARNING(f'  ⚠️  Línea {row.line} ({row.email or "sin email"}): {"; ".join(row.errors)}'))
+        if result.error_count > 20:
+            self.stdout.write(self.style.WARNING(f'  ... y {result.error_count - 20} filas más con errores'))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.write(result.as_csv())
+            self.stdout.write(f'📄 Resultado por fila guardado en {options["output"]}')
+
+        if result.dry_run:
+            self.stdout.write(self.style.SUCCESS(
+                f'🔍 Validación: {result.valid_count} filas válidas, {result.error_count} con errores ({elapsed:.1f}s)'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {result.created_count} usuarios creados, {result.error_count} con errores ({elapsed:.1f}s)'
+            ))
+            if result.created_count and not options['no_email']:
+                self.stdout.write('📬 Credenciales encoladas: se entregan con el comando send_outbox')
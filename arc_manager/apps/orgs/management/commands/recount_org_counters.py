@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from apps.orgs.cache_utils import bump_organization_cache_versions
+from apps.orgs.counters import find_counter_drift, recount_organization_counters
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de usuarios de las organizaciones (total, activos, administradores)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--org-id',
+            type=int,
+            action='append',
+            dest='org_ids',
+            help='Recalcular solo esta organización (se puede repetir)',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Solo reporta las organizaciones con contadores desfasados, sin corregir',
+        )
+
+    def handle(self, *args, **options):
+        org_ids = options['org_ids']
+        check_only = options['check']
+
+        self.stdout.write(self.style.SUCCESS('🔢 Verificando contadores de usuarios por organización'))
+
+        drifted = find_counter_drift(org_ids)
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('✅ Todos los contadores están al día'))
+            return
+
+        self.stdout.write(self.style.WARNING(f'⚠️  {len(drifted)} organizaciones con contadores desfasados'))
+        for org in drifted:
+            self.stdout.write(
+                f'  - {org.name} (ID {org.pk}): '
+                f'total {org.user_count}→{org.real_total}, '
+                f'activos {org.active_user_count}→{org.real_active}, '
+                f'admins {org.admin_user_count}→{org.real_admins}'
+            )
+
+        if check_only:
+            return
+
+        drifted_ids = [org.pk for org in drifted]
+        updated = recount_organization_counters(drifted_ids)
+        bump_organization_cache_versions(drifted_ids)
+        logger.info(f"Contadores de usuarios recalculados para {updated} organizaciones")
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Contadores recalculados en {updated} organizaciones'))
@@ -4,6 +4,11 @@ from django.contrib import messages
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.http import JsonResponse
+from django.utils.functional import SimpleLazyObject
+
+from core.routing import classify_path, classify_request
+
+from .context import get_request_tenant
 
 
 logger = logging.getLogger('arc_manager.multitenant')
@@ -12,19 +17,9 @@ logger = logging.getLogger('arc_manager.multitenant')
 class TenantValidationMiddleware(MiddlewareMixin):
     """Middleware para validar límites de tenant en tiempo real"""
     
-    # URLs que no requieren validación de tenant
-    EXCLUDED_PATHS = [
-        '/admin/',
-        '/accounts/login/',
-        '/accounts/logout/',
-        '/api/',
-        '/static/',
-        '/media/',
-    ]
-    
     def process_request(self, request):
-        # Saltar validación para paths excluidos
-        if any(request.path.startswith(path) for path in self.EXCLUDED_PATHS):
+        # Saltar validación para paths excluidos (admin, login, api, estáticos)
+        if classify_request(request).tenant_exempt:
             return None
         
         # Solo validar usuarios autenticados
@@ -35,8 +30,12 @@ class TenantValidationMiddleware(MiddlewareMixin):
         if request.user.is_superuser:
             return None
         
+        # Organización, suscripción y conteos desde el contexto compartido
+        tenant = get_request_tenant(request)
+        organization = tenant.organization
+        
         # Validar organización del usuario
-        if not request.user.organization:
+        if not organization:
             logger.warning(f"Usuario {request.user.email} sin organización intentó acceder a {request.path}")
             
             # Para requests AJAX, devolver JSON
@@ -52,11 +51,11 @@ class TenantValidationMiddleware(MiddlewareMixin):
             return redirect('main:home')
         
         # Validar estado de la suscripción
-        subscription_status = self.validate_subscription(request.user.organization)
+        subscription_status = self.validate_subscription(organization, context=tenant)
         
         if not subscription_status['is_valid']:
             logger.warning(
-                f"Organización {request.user.organization.name} con suscripción inválida: {subscription_status['reason']}"
+                f"Organización {organization.name} con suscripción inválida: {subscription_status['reason']}"
             )
             
             # Para requests AJAX
@@ -77,10 +76,10 @@ class TenantValidationMiddleware(MiddlewareMixin):
         
         return None
     
-    def validate_subscription(self, organization):
+    def validate_subscription(self, organization, context=None):
         """Validar estado de suscripción de la organización"""
         try:
-            subscription = organization.get_subscription()
+            subscription = organization.get_subscription(context=context)
             
             if not subscription:
                 return {
@@ -89,24 +88,24 @@ class TenantValidationMiddleware(MiddlewareMixin):
                     'message': 'Tu organización no tiene una suscripción activa. Contacta con soporte.'
                 }
             
-            if not subscription.is_active:
-                days_remaining = subscription.days_remaining
-                
-                if days_remaining <= 0:
-                    return {
-                        'is_valid': False,
-                        'reason': 'expired',
-                        'message': 'Tu suscripción ha expirado. Contacta con soporte para renovar.'
-                    }
-                elif days_remaining <= 3:
-                    return {
-                        'is_valid': True,  # Aún válida pero con advertencia
-                        'reason': 'expires_soon',
-                        'message': f'Tu suscripción expira en {days_remaining} días. Renueva pronto para evitar interrupciones.'
-                    }
+            if subscription.is_expired:
+                return {
+                    'is_valid': False,
+                    'reason': 'expired',
+                    'message': 'Tu suscripción ha expirado. Contacta con soporte para renovar.'
+                }
+            
+            # Banner precalculado por el pipeline nocturno (send_expiry_reminders)
+            alert = organization.get_alert(context=context)
+            if alert is not None and alert.level == 'critical':
+                return {
+                    'is_valid': True,  # Aún válida pero con advertencia
+                    'reason': 'expires_soon',
+                    'message': alert.message
+                }
             
             # Validar límites de usuarios
-            current_users = organization.users.filter(is_active=True).count()
+            current_users = organization.get_active_user_count(context=context)
             max_users = subscription.plan.max_users
             
             if current_users > max_users:
@@ -132,38 +131,42 @@ class TenantValidationMiddleware(MiddlewareMixin):
     
     def should_show_subscription_warning(self, path):
         """Determinar si se debe mostrar advertencia de suscripción en esta ruta"""
-        warning_paths = [
-            '/dashboard/',
-            '/users/',
-            '/plans/',
-        ]
-        return any(path.startswith(warn_path) for warn_path in warning_paths)
+        return classify_path(path).subscription_warning
 
 
 class OrganizationContextMiddleware(MiddlewareMixin):
-    """Middleware para agregar contexto de organización a todas las requests"""
+    """
+    Middleware para agregar contexto de organización a todas las requests.
+
+    Adjunta un ``TenantContext`` perezoso en ``request.tenant``: la organización,
+    suscripción, plan y conteos se resuelven en una sola consulta agregada y
+    solo si algún consumidor los lee.
+    """
     
     def process_request(self, request):
-        # Agregar información de organización al request
-        if request.user.is_authenticated and request.user.organization:
-            organization = request.user.organization
-            
-            request.organization = organization
-            request.subscription = organization.get_subscription()
-            request.organization_limits = organization.get_subscription_limits()
-            
-            # Información útil para templates
-            request.can_add_user = organization.can_add_user()
-            request.is_org_admin = request.user.is_org_admin
-            request.org_user_count = organization.users.filter(is_active=True).count()
-            request.org_max_users = organization.get_max_users()
-        else:
-            request.organization = None
-            request.subscription = None
-            request.organization_limits = None
-            request.can_add_user = False
-            request.is_org_admin = False
-            request.org_user_count = 0
-            request.org_max_users = 0
+        tenant = get_request_tenant(request)
+        attach_tenant_attributes(request, tenant)
+        return None
+
+
+def attach_tenant_attributes(request, tenant):
+    """Atributos heredados del request (organization, subscription, límites) sobre el TenantContext"""
+    # Agregar información de organización al request
+    if tenant:
+        request.organization = SimpleLazyObject(lambda: tenant.organization)
+        request.subscription = SimpleLazyObject(lambda: tenant.subscription)
+        request.organization_limits = SimpleLazyObject(lambda: tenant.limits)
         
-        return None 
\ No newline at end of file
+        # Información útil para templates
+        request.can_add_user = SimpleLazyObject(lambda: tenant.can_add_user)
+        request.is_org_admin = request.user.is_org_admin
+        request.org_user_count = SimpleLazyObject(lambda: tenant.active_user_count)
+        request.org_max_users = SimpleLazyObject(lambda: tenant.max_users)
+    else:
+        request.organization = None
+        request.subscription = None
+        request.organization_limits = None
+        request.can_add_user = False
+        request.is_org_admin = False
+        request.org_user_count = 0
+        request.org_max_users = 0
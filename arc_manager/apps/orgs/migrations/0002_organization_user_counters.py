@@ -0,0 +1,54 @@
+# Generated by Django 5.2 on 2026-10-18 12:54
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_user_counters(apps, schema_editor):
+    """Inicializa los contadores desde la tabla de usuarios"""
+    Organization = apps.get_model('orgs', 'Organization')
+    User = apps.get_model('accounts', 'User')
+
+    def count_subquery(**filters):
+        users = (
+            User.objects.filter(organization=OuterRef('pk'), **filters)
+            .order_by()
+            .values('organization')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return Coalesce(Subquery(users, output_field=IntegerField()), Value(0))
+
+    Organization.objects.update(
+        user_count=count_subquery(),
+        active_user_count=count_subquery(is_active=True),
+        admin_user_count=count_subquery(is_org_admin=True),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orgs', '0001_initial'),
+        ('accounts', '0002_alter_user_username'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='active_user_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Usuarios activos'),
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='admin_user_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Administradores'),
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='user_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Usuarios'),
+        ),
+        migrations.RunPython(backfill_user_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 13:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orgs', '0002_organization_user_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganizationAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('info', 'Información'), ('warning', 'Advertencia'), ('critical', 'Crítico')], default='info', max_length=20, verbose_name='Nivel')),
+                ('reason', models.CharField(max_length=30, verbose_name='Motivo')),
+                ('message', models.CharField(max_length=500, verbose_name='Mensaje')),
+                ('days_remaining', models.PositiveIntegerField(default=0, verbose_name='Días restantes al calcular')),
+                ('period_end', models.DateTimeField(verbose_name='Fin del período')),
+                ('valid_until', models.DateTimeField(verbose_name='Válido hasta')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Última actualización')),
+                ('organization', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='alert', to='orgs.organization')),
+            ],
+            options={
+                'verbose_name': 'Alerta de organización',
+                'verbose_name_plural': 'Alertas de organización',
+            },
+        ),
+    ]
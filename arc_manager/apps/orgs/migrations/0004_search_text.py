@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+from core.search import build_search_text, create_search_index, drop_search_index
+
+
+def backfill_search_text(apps, schema_editor):
+    """Calcula search_text de las organizaciones existentes"""
+    Organization = apps.get_model('orgs', 'Organization')
+    organizations = list(Organization.objects.only('pk', 'name', 'description'))
+    for organization in organizations:
+        organization.search_text = build_search_text(organization.name, organization.description)
+    Organization.objects.bulk_update(organizations, ['search_text'], batch_size=1000)
+
+
+def create_index(apps, schema_editor):
+    create_search_index(schema_editor, apps.get_model('orgs', 'Organization')._meta.db_table)
+
+
+def drop_index(apps, schema_editor):
+    drop_search_index(schema_editor, apps.get_model('orgs', 'Organization')._meta.db_table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orgs', '0003_organization_alert'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Texto de búsqueda'),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        # PostgreSQL: GIN trigram (pg_trgm); SQLite: tabla FTS5 con triggers
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,8 +1,21 @@
 from django.core.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
+from .identity import get_identity_map
 from .models import Organization
 
-class OrganizationMixin:
+class IdentityMapMixin:
+    """
+    Acceso al mapa de identidad del request: las filas ya cargadas (en
+    dispatch, middleware o el backend de autenticación) no se vuelven a consultar
+    """
+    @property
+    def identity_map(self):
+        return get_identity_map(self.request)
+
+    def get_instance_or_404(self, model, pk, queryset=None):
+        return self.identity_map.get_or_404(model, pk, queryset)
+
+class OrganizationMixin(IdentityMapMixin):
     """
     Mixin para vistas que necesitan filtrar por organización del usuario
     """
@@ -20,7 +33,7 @@ class OrganizationMixin:
             form.instance.organization = self.request.user.organization
         return super().form_valid(form)
 
-class OrganizationRequiredMixin:
+class OrganizationRequiredMixin(IdentityMapMixin):
     """
     Mixin que requiere que el usuario tenga una organización asignada
     """
@@ -33,7 +46,7 @@ class OrganizationRequiredMixin:
         
         return super().dispatch(request, *args, **kwargs)
 
-class OrganizationAdminMixin:
+class OrganizationAdminMixin(IdentityMapMixin):
     """
     Mixin que requiere permisos de administrador de organización
     """
@@ -1,13 +1,24 @@
 # apps/orgs/models.py - Versión simplificada
+from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
 from django.utils import timezone
 
+from core.search import build_search_text
+
 class Organization(models.Model):
     """Modelo simplificado de organización"""
     
     name = models.CharField("Nombre de la organización", max_length=200)
     description = models.TextField("Descripción", blank=True, null=True)
     is_active = models.BooleanField("Activa", default=True)
+    # Nombre y descripción normalizados (core.search), con índice trigram/FTS5
+    search_text = models.TextField("Texto de búsqueda", blank=True, default='', editable=False)
+    
+    # Contadores desnormalizados (apps.orgs.counters), mantenidos al guardar/eliminar usuarios
+    user_count = models.PositiveIntegerField("Usuarios", default=0, editable=False)
+    active_user_count = models.PositiveIntegerField("Usuarios activos", default=0, editable=False)
+    admin_user_count = models.PositiveIntegerField("Administradores", default=0, editable=False)
+    
     created_at = models.DateTimeField("Fecha de creación", auto_now_add=True)
     updated_at = models.DateTimeField("Última actualización", auto_now=True)
     
@@ -19,44 +30,76 @@ class Organization(models.Model):
     def __str__(self):
         return self.name
     
-    def get_subscription(self):
-        """Retorna la suscripción actual de la organización"""
+    def get_search_text(self):
+        return build_search_text(self.name, self.description)
+    
+    # Solo los escriben los UPDATE con F() de apps.orgs.counters
+    COUNTER_FIELDS = ('user_count', 'active_user_count', 'admin_user_count')
+    
+    def save(self, *args, **kwargs):
+        self.search_text = self.get_search_text()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            # Un save completo (admin, OrganizationForm) no debe pisar los contadores
+            # con los valores que cargó la instancia (incrementos concurrentes)
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        elif update_fields is not None and {'name', 'description'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'search_text'}
+        super().save(*args, **kwargs)
+    
+    def get_subscription(self, context=None):
+        """Retorna la suscripción actual de la organización (solo lectura, None si no tiene)"""
+        if context is not None:
+            return context.subscription
         try:
             return self.subscription
-        except:
-            # Si no tiene suscripción, crear trial por defecto
-            return self._create_default_subscription()
+        except ObjectDoesNotExist:
+            # La provisión ocurre al crear la organización (o vía provision_missing_subscriptions)
+            return None
+    
+    def get_alert(self, context=None):
+        """Alerta vigente de la organización (precalculada, sin aritmética de fechas)"""
+        if context is not None:
+            return context.alert
+        alert = getattr(self, 'alert', None)
+        if alert is None or not alert.is_current(self.get_subscription()):
+            return None
+        return alert
     
     def _create_default_subscription(self):
         """Crea suscripción trial por defecto para nuevas organizaciones"""
-        from apps.plans.models import Plan, Subscription
+        from apps.plans.services import SubscriptionService
         
-        try:
-            trial_plan = Plan.objects.get(name='trial', is_active=True)
-            subscription = Subscription.objects.create(
-                organization=self,
-                plan=trial_plan
-            )
-            return subscription
-        except Plan.DoesNotExist:
-            return None
+        subscription, _ = SubscriptionService.provision_subscription(self)
+        return subscription
     
-    def get_max_users(self):
+    def get_max_users(self, context=None):
         """Retorna el límite de usuarios basado en el plan"""
+        if context is not None:
+            return context.max_users
         subscription = self.get_subscription()
         return subscription.plan.max_users if subscription else 1
     
-    def get_user_count(self):
+    def get_user_count(self, context=None):
         """Retorna el total de usuarios"""
-        return self.users.count()
+        if context is not None:
+            return context.user_count
+        return self.user_count
     
-    def get_active_user_count(self):
+    def get_active_user_count(self, context=None):
         """Retorna solo usuarios activos"""
-        return self.users.filter(is_active=True).count()
+        if context is not None:
+            return context.active_user_count
+        return self.active_user_count
     
-    def get_inactive_user_count(self):
+    def get_inactive_user_count(self, context=None):
         """Retorna usuarios inactivos"""
-        return self.users.filter(is_active=False).count()
+        if context is not None:
+            return context.inactive_user_count
+        return self.user_count - self.active_user_count
     
     def can_add_user(self):
         """Verifica si se puede agregar un usuario"""
@@ -115,28 +158,32 @@ class Organization(models.Model):
             return self.subscription.status
         return 'no_subscription'
     
-    def is_subscription_active(self):
+    def is_subscription_active(self, context=None):
         """Verifica si la suscripción está activa"""
+        if context is not None:
+            return bool(context.subscription and context.subscription.is_active)
         if hasattr(self, 'subscription'):
             return self.subscription.is_active
         return False
     
-    def get_current_plan(self):
+    def get_current_plan(self, context=None):
         """Retorna el plan actual de la organización"""
+        if context is not None:
+            return context.plan
         if hasattr(self, 'subscription'):
             return self.subscription.plan
         return None
     
-    def can_create_user_with_subscription(self):
+    def can_create_user_with_subscription(self, context=None):
         """Verifica si puede crear usuarios considerando la suscripción"""
-        if not self.is_subscription_active():
+        if not self.is_subscription_active(context=context):
             return {
                 'can_create': False,
                 'reason': 'Suscripción inactiva o expirada',
                 'subscription_required': True
             }
         
-        current_plan = self.get_current_plan()
+        current_plan = self.get_current_plan(context=context)
         if not current_plan:
             return {
                 'can_create': False,
@@ -144,7 +191,7 @@ class Organization(models.Model):
                 'subscription_required': True
             }
         
-        current_count = self.get_user_count()
+        current_count = self.get_user_count(context=context)
         can_create = current_count < current_plan.max_users
         
         return {
@@ -155,9 +202,9 @@ class Organization(models.Model):
             'subscription_required': False
         }
     
-    def get_subscription_limits(self):
+    def get_subscription_limits(self, context=None):
         """Retorna todos los límites de la suscripción actual"""
-        if not hasattr(self, 'subscription') or not self.subscription.is_active:
+        if not self.is_subscription_active(context=context):
             return {
                 'users': {'current': 0, 'limit': 0, 'available': 0},
                 'projects': {'current': 0, 'limit': 0, 'available': 0},
@@ -165,8 +212,8 @@ class Organization(models.Model):
                 'subscription_active': False
             }
         
-        plan = self.subscription.plan
-        user_count = self.get_user_count()
+        plan = self.get_current_plan(context=context)
+        user_count = self.get_user_count(context=context)
         
         # TODO: Implementar cuando tengas los módulos de proyectos y almacenamiento
         project_count = 0  # self.projects.count() when implemented
@@ -204,16 +251,9 @@ class Organization(models.Model):
         if not subscription.is_active:
             return 'error'  # Inactive subscription
         
-        days_remaining = subscription.days_remaining
-        
-        if days_remaining <= 3:
-            return 'critical'  # Critical - expires in 3 days or less
-        elif days_remaining <= 7:
-            return 'warning'   # Warning - expires in 7 days or less
-        elif days_remaining <= 14:
-            return 'info'      # Info - expires in 14 days or less
-        else:
-            return 'success'   # All good
+        # critical (<= 3 días), warning (<= 7) o info (<= 14), según la alerta precalculada
+        alert = self.get_alert()
+        return alert.level if alert else 'success'
     
     def get_next_billing_info(self):
         """Retorna información de la próxima facturación"""
@@ -259,10 +299,10 @@ class Organization(models.Model):
         }
     
     # Método actualizado para compatibilidad con el sistema anterior
-    def can_add_user(self):
+    def can_add_user(self, context=None):
         """Método de compatibilidad que considera suscripciones"""
         # Primero verificar límites de suscripción
-        subscription_check = self.can_create_user_with_subscription()
+        subscription_check = self.can_create_user_with_subscription(context=context)
         if subscription_check['subscription_required']:
             return False
         
@@ -272,24 +312,25 @@ class Organization(models.Model):
         # Si la suscripción permite, verificar límites legacy
         return super().can_add_user() if hasattr(super(), 'can_add_user') else True
     
-    def can_add_user_detailed(self):
+    def can_add_user_detailed(self, context=None):
         """Método detallado que considera suscripciones"""
         # Verificar suscripción primero
-        subscription_check = self.can_create_user_with_subscription()
+        subscription_check = self.can_create_user_with_subscription(context=context)
         
         if subscription_check['subscription_required']:
             return {
                 'can_add': False,
                 'reason': subscription_check['reason'],
                 'subscription_issue': True,
-                'current_users': self.get_user_count(),
+                'current_users': self.get_user_count(context=context),
                 'max_users': 0,
                 'available_slots': 0
             }
         
         # Si la suscripción está bien, usar los límites del plan
-        plan = self.get_current_plan()
-        current_users = self.get_user_count()
+        plan = self.get_current_plan(context=context)
+        current_users = self.get_user_count(context=context)
+        inactive_users = self.get_inactive_user_count(context=context)
         max_users = plan.max_users if plan else 0
         available_slots = max(0, max_users - current_users)
         
@@ -300,9 +341,50 @@ class Organization(models.Model):
             'current_users': current_users,
             'max_users': max_users,
             'available_slots': available_slots,
-            'active_users': self.get_active_user_count(),
-            'inactive_users': self.get_inactive_user_count(),
+            'active_users': self.get_active_user_count(context=context),
+            'inactive_users': inactive_users,
             'total_users': current_users,
-            'has_inactive_users': self.get_inactive_user_count() > 0,
+            'has_inactive_users': inactive_users > 0,
             'is_at_limit': current_users >= max_users
-        }    
\ No newline at end of file
+        }
+
+
+class OrganizationAlert(models.Model):
+    """
+    Banner precalculado de la organización (p.ej. suscripción por vencer).
+    Lo escribe el pipeline nocturno (apps.plans.reminders) y viaja en el
+    snapshot de la organización: el request solo lo lee, sin aritmética de fechas.
+    """
+    LEVEL_CHOICES = [
+        ('info', 'Información'),
+        ('warning', 'Advertencia'),
+        ('critical', 'Crítico'),
+    ]
+    
+    organization = models.OneToOneField(Organization, on_delete=models.CASCADE, related_name='alert')
+    level = models.CharField("Nivel", max_length=20, choices=LEVEL_CHOICES, default='info')
+    reason = models.CharField("Motivo", max_length=30)
+    message = models.CharField("Mensaje", max_length=500)
+    days_remaining = models.PositiveIntegerField("Días restantes al calcular", default=0)
+    
+    # Fecha de referencia de la suscripción (end_date o grace_end_date) al calcular
+    period_end = models.DateTimeField("Fin del período")
+    # Sin una nueva corrida del pipeline el banner deja de mostrarse
+    valid_until = models.DateTimeField("Válido hasta")
+    
+    updated_at = models.DateTimeField("Última actualización", auto_now=True)
+    
+    class Meta:
+        verbose_name = "Alerta de organización"
+        verbose_name_plural = "Alertas de organización"
+    
+    def __str__(self):
+        return f"{self.organization_id} - {self.reason} ({self.level})"
+    
+    def is_current(self, subscription, now=None):
+        """El banner sigue vigente y corresponde al período actual de la suscripción"""
+        if subscription is None or (now or timezone.now()) >= self.valid_until:
+            return False
+        # Una renovación cambia end_date/grace_end_date: el banner viejo deja de aplicar
+        reference = subscription.grace_end_date if subscription.is_in_grace_period else subscription.end_date
+        return reference == self.period_end
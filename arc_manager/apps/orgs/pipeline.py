@@ -0,0 +1,141 @@
+"""
+Pipeline de tenant: un único middleware con etapas ordenadas y enchufables.
+
+Reemplaza a LoginRequired, SuperuserRestrict, OrganizationContext,
+TenantValidation, SubscriptionAccess y SubscriptionInfo como middlewares
+independientes. Todas las etapas comparten el mismo ``TenantContext`` en
+``request.tenant`` (organización + suscripción + plan + conteos resueltos una
+sola vez), solo se ejecutan si la ruta clasificada las necesita y la primera
+que devuelve una respuesta corta el pipeline.
+
+Configuración::
+
+    TENANT_PIPELINE_STAGES = ['login_required', 'superuser_restrict', 'organization_context']
+    TENANT_PIPELINE_STRICT_READS = True   # GET/HEAD/OPTIONS: las etapas no pueden escribir
+
+Cada etapa es un nombre registrado en ``STAGES`` o la ruta a una clase con
+``process_request(request)``.
+"""
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from core.routing import classify_request
+
+from .context import TenantContext
+
+logger = logging.getLogger('arc_manager.multitenant')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+# nombre -> (clase de la etapa, condición sobre la ruta clasificada)
+STAGES = {
+    'login_required': (
+        'apps.accounts.middleware.LoginRequiredMiddleware',
+        lambda route: not route.login_exempt,
+    ),
+    'superuser_restrict': (
+        'apps.accounts.middleware.SuperuserRestrictMiddleware',
+        None,
+    ),
+    'organization_context': (
+        'apps.orgs.middleware.OrganizationContextMiddleware',
+        None,
+    ),
+    'tenant_validation': (
+        'apps.orgs.middleware.TenantValidationMiddleware',
+        lambda route: not route.tenant_exempt,
+    ),
+    'subscription_access': (
+        'apps.plans.middleware.SubscriptionAccessMiddleware',
+        lambda route: not route.subscription_exempt,
+    ),
+    'subscription_info': (
+        'apps.plans.middleware.SubscriptionInfoMiddleware',
+        None,
+    ),
+}
+
+DEFAULT_STAGES = ['login_required', 'superuser_restrict', 'organization_context']
+
+
+class ReadOnlyRequestError(RuntimeError):
+    """Una etapa intentó escribir en la base de datos durante un request de solo lectura"""
+
+
+def _block_writes(execute, sql, params, many, context):
+    if sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+        raise ReadOnlyRequestError(f"Escritura bloqueada en el pipeline de tenant (modo estricto): {sql[:80]}")
+    return execute(sql, params, many, context)
+
+
+class PipelineStage:
+    """Etapa del pipeline: handler con process_request + condición sobre la ruta"""
+
+    def __init__(self, name, handler, applies=None):
+        self.name = name
+        self.handler = handler
+        self.applies = applies
+
+    def __call__(self, request, route):
+        if self.applies is not None and not self.applies(route):
+            return None
+        return self.handler.process_request(request)
+
+    def __repr__(self):
+        return f"PipelineStage({self.name})"
+
+
+class TenantPipelineMiddleware:
+    """Middleware único que ejecuta las etapas de tenant en orden y con cortocircuito"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.strict_reads = getattr(settings, 'TENANT_PIPELINE_STRICT_READS', False)
+        self.stages = [
+            self._build_stage(stage, get_response)
+            for stage in getattr(settings, 'TENANT_PIPELINE_STAGES', DEFAULT_STAGES)
+        ]
+
+    @staticmethod
+    def _build_stage(stage, get_response):
+        if stage in STAGES:
+            path, applies = STAGES[stage]
+        else:
+            path, applies = stage, None
+
+        try:
+            handler_class = import_string(path)
+        except ImportError as e:
+            raise ImproperlyConfigured(f"Etapa de pipeline de tenant inválida '{stage}': {e}")
+        return PipelineStage(stage, handler_class(get_response), applies)
+
+    def __call__(self, request):
+        route = classify_request(request)
+        read_only = self.strict_reads and request.method in SAFE_METHODS
+
+        # Un único contexto perezoso compartido por todas las etapas y las vistas
+        request.tenant = TenantContext(getattr(request, 'user', None), read_only=read_only)
+
+        if read_only:
+            with connection.execute_wrapper(_block_writes):
+                response = self.run_stages(request, route)
+        else:
+            response = self.run_stages(request, route)
+
+        if response is not None:
+            return response
+        return self.get_response(request)
+
+    def run_stages(self, request, route):
+        for stage in self.stages:
+            response = stage(request, route)
+            if response is not None:
+                logger.debug(f"Pipeline de tenant cortado por '{stage.name}' en {request.path}")
+                return response
+        return None
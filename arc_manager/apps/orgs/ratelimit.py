@@ -0,0 +1,282 @@
+"""
+Rate limiting por ruta, usuario, IP u organización.
+
+Con Redis se usa una ventana deslizante (log en un sorted set) evaluada en un
+script Lua, así que contar y registrar la petición es una sola operación
+atómica. Si el cache no es Redis, o Redis no responde, se usa un token bucket
+en memoria del proceso: menos preciso entre workers, pero nunca bloquea la
+petición ni escribe en la base de datos. Con ``ResilientRedisCache``
+(``core.cache_backends``) el script respeta el mismo circuit breaker que el
+resto del cache: con el circuito abierto no se intenta Redis.
+
+Las políticas se definen en ``RATE_LIMIT_POLICIES`` (settings), por ejemplo::
+
+    RATE_LIMIT_POLICIES = {
+        'login': {'limit': 10, 'window': 300, 'scope': 'ip'},
+        'user_create': {'limit': 30, 'window': 3600, 'scope': 'tenant',
+                        'tenant_limits': {42: 200}},
+    }
+"""
+import logging
+import threading
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLICIES = {
+    'login': {'limit': 10, 'window': 300, 'scope': 'ip'},
+    'password_reset': {'limit': 5, 'window': 900, 'scope': 'ip'},
+    'user_create': {'limit': 30, 'window': 3600, 'scope': 'tenant'},
+}
+
+# Margen de redondeo del token bucket local (la recarga en float puede quedar apenas corta)
+TOKEN_EPSILON = 1e-9
+
+# Segundos sin intentar Redis después de un error de conexión (backends sin circuit breaker)
+REDIS_RETRY_AFTER_ERROR = 30
+
+# KEYS[1] = clave del log; ARGV = ahora (ms), ventana (ms), límite, id único
+SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+local count = redis.call('ZCARD', key)
+if count < limit then
+    redis.call('ZADD', key, now, ARGV[4])
+    redis.call('PEXPIRE', key, window)
+    return {1, limit - count - 1, 0}
+end
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+local retry = window
+if oldest[2] then
+    retry = tonumber(oldest[2]) + window - now
+end
+return {0, 0, retry}
+"""
+
+
+class RateLimitPolicy:
+    """Política de rate limit: `limit` peticiones cada `window` segundos por `scope`"""
+
+    SCOPES = ('ip', 'user', 'tenant')
+
+    def __init__(self, name, limit, window, scope='user', methods=('POST',), tenant_limits=None):
+        if scope not in self.SCOPES:
+            raise ValueError(f"Scope de rate limit inválido: {scope}")
+        self.name = name
+        self.limit = int(limit)
+        self.window = int(window)
+        self.scope = scope
+        self.methods = tuple(method.upper() for method in methods) if methods else None
+        self.tenant_limits = tenant_limits or {}
+
+    @classmethod
+    def from_settings(cls, name):
+        """Construye la política `name` combinando los defaults con RATE_LIMIT_POLICIES"""
+        config = dict(DEFAULT_POLICIES.get(name, {}))
+        config.update(getattr(settings, 'RATE_LIMIT_POLICIES', {}).get(name, {}))
+        if 'limit' not in config or 'window' not in config:
+            raise KeyError(f"Política de rate limit no definida: {name}")
+        return cls(name, **config)
+
+    def applies_to(self, request):
+        return self.methods is None or request.method in self.methods
+
+    def limit_for(self, request):
+        """Límite efectivo; permite sobreescribirlo por organización"""
+        if self.tenant_limits:
+            organization_id = getattr(getattr(request, 'user', None), 'organization_id', None)
+            if organization_id in self.tenant_limits:
+                return int(self.tenant_limits[organization_id])
+        return self.limit
+
+    def identity(self, request):
+        """Identificador del cliente según el scope (None = no limitar)"""
+        user = getattr(request, 'user', None)
+        authenticated = user is not None and user.is_authenticated
+
+        if self.scope == 'tenant' and authenticated and getattr(user, 'organization_id', None):
+            return f"org:{user.organization_id}"
+        if self.scope in ('user', 'tenant') and authenticated:
+            return f"user:{user.pk}"
+        return f"ip:{get_client_ip(request)}"
+
+
+class RateLimitResult:
+    def __init__(self, allowed, limit, remaining, retry_after):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        # Espera exacta en segundos (para quien necesita dosificar, no solo rechazar)
+        self.wait = retry_after if not allowed else 0
+        # Segundos enteros, como exige la cabecera Retry-After
+        self.retry_after = max(int(retry_after + 0.999), 1) if not allowed else 0
+
+    def __bool__(self):
+        return self.allowed
+
+
+def get_client_ip(request):
+    """
+    IP del cliente. Con RATELIMIT_TRUSTED_PROXIES = N se toma la entrada N
+    contando desde la DERECHA de X-Forwarded-For (la que agregó nuestro
+    balanceador); lo que está más a la izquierda lo escribe el cliente.
+    """
+    trusted_proxies = getattr(settings, 'RATELIMIT_TRUSTED_PROXIES', 0)
+    if trusted_proxies > 0:
+        forwarded_for = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded_for) >= trusted_proxies:
+            return forwarded_for[-trusted_proxies]
+    return request.META.get('REMOTE_ADDR', 'unknown')
+
+
+# =============================================================================
+# Fallback local: token bucket por proceso
+# =============================================================================
+
+class LocalTokenBucket:
+    """Token bucket en memoria; capacidad `limit`, recarga `limit / window` por segundo"""
+
+    def __init__(self, max_keys=10000, clock=time.monotonic):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.max_keys = max_keys
+        self.clock = clock
+
+    def hit(self, key, limit, window, cost=1):
+        rate = limit / float(window)
+        now = self.clock()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(limit), now))
+            tokens = min(float(limit), tokens + (now - updated) * rate)
+
+            # Tolerancia de redondeo: esperar exactamente retry_after debe alcanzar
+            if tokens + TOKEN_EPSILON >= cost:
+                tokens = max(0.0, tokens - cost)
+                allowed, retry_after = True, 0
+            else:
+                allowed, retry_after = False, (cost - tokens) / rate
+
+            if len(self._buckets) >= self.max_keys and key not in self._buckets:
+                # Evita crecer sin límite con IPs únicas: descarta el bucket más viejo
+                self._buckets.pop(next(iter(self._buckets)))
+            self._buckets[key] = (tokens, now)
+
+        return RateLimitResult(allowed, limit, int(tokens), retry_after)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+local_bucket = LocalTokenBucket()
+
+
+# =============================================================================
+# Redis: ventana deslizante atómica
+# =============================================================================
+
+_redis_state = {'script': None, 'client_id': None, 'disabled_until': 0.0}
+
+
+def _get_redis_client():
+    """Cliente redis-py del cache por defecto, o None si el backend no es Redis o no está disponible"""
+    breaker = getattr(cache, 'breaker', None)
+    if breaker is not None:
+        # ResilientRedisCache: con el circuito abierto ni se intenta
+        if not breaker.allow():
+            return None
+    elif time.monotonic() < _redis_state['disabled_until']:
+        return None
+
+    # RedisCache de Django
+    backend_client = getattr(cache, '_cache', None)
+    if backend_client is not None and hasattr(backend_client, 'get_client'):
+        return backend_client.get_client(write=True)
+
+    # django-redis
+    backend_client = getattr(cache, 'client', None)
+    if backend_client is not None and hasattr(backend_client, 'get_client'):
+        return backend_client.get_client(write=True)
+
+    return None
+
+
+def _redis_hit(client, key, limit, window):
+    if _redis_state['client_id'] != id(client):
+        _redis_state['script'] = client.register_script(SLIDING_WINDOW_SCRIPT)
+        _redis_state['client_id'] = id(client)
+
+    now_ms = int(time.time() * 1000)
+    allowed, remaining, retry_ms = _redis_state['script'](
+        keys=[key],
+        args=[now_ms, window * 1000, limit, f"{now_ms}:{uuid.uuid4().hex[:8]}"],
+        client=client,
+    )
+    return RateLimitResult(bool(allowed), limit, int(remaining), int(retry_ms) / 1000.0)
+
+
+def hit(policy, request):
+    """Registra una petición contra la política y retorna el RateLimitResult"""
+    limit = policy.limit_for(request)
+    key = cache.make_key(f"ratelimit:{policy.name}:{policy.identity(request)}")
+
+    client = _get_redis_client()
+    if client is not None:
+        resilient = hasattr(cache, 'breaker')
+        try:
+            result = _redis_hit(client, key, limit, policy.window)
+        except Exception as e:
+            if resilient:
+                cache.record_failure('ratelimit', e)
+            else:
+                _redis_state['disabled_until'] = time.monotonic() + REDIS_RETRY_AFTER_ERROR
+            logger.warning(f"Rate limit: Redis no disponible, usando token bucket local ({e})")
+        else:
+            if resilient:
+                cache.record_success()
+            return result
+
+    return local_bucket.hit(key, limit, policy.window)
+
+
+def too_many_requests(result, message="Demasiadas solicitudes. Intenta nuevamente más tarde."):
+    """Respuesta 429 con Retry-After (Django no trae HttpResponseTooManyRequests)"""
+    response = HttpResponse(message, status=429, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(result.retry_after)
+    response['X-RateLimit-Limit'] = str(result.limit)
+    response['X-RateLimit-Remaining'] = '0'
+    return response
+
+
+def rate_limit(policy):
+    """
+    Decorador para vistas (o ``method_decorator`` en ``dispatch``).
+
+    `policy` es el nombre de una política configurada o un RateLimitPolicy.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            current = policy if isinstance(policy, RateLimitPolicy) else RateLimitPolicy.from_settings(policy)
+            if not current.applies_to(request):
+                return view_func(request, *args, **kwargs)
+
+            result = hit(current, request)
+            if not result:
+                logger.warning(
+                    f"Rate limit '{current.name}' excedido por {current.identity(request)} en {request.path}"
+                )
+                return too_many_requests(result)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
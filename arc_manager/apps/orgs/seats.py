@@ -0,0 +1,67 @@
+"""
+Reserva de asientos (usuarios) contra el límite del plan.
+
+Verificar ``can_add_user()`` y luego insertar deja una carrera: dos altas
+concurrentes pueden pasar la verificación y superar ``Plan.max_users``.
+``reserve_seat`` bloquea la fila de la organización con ``SELECT ... FOR UPDATE``
+y valida contra ``user_count`` (contador desnormalizado) dentro de la misma
+transacción que inserta al usuario y lo incrementa, así que la segunda alta
+espera a que la primera confirme y ve el contador ya actualizado.
+
+En PostgreSQL el bloqueo es por fila. SQLite no soporta ``FOR UPDATE``: ahí
+se toma primero el bloqueo de escritura de la base con un UPDATE sin efecto,
+para que las altas concurrentes esperen en lugar de fallar con
+"database is locked" al pasar de lectura a escritura.
+"""
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
+from django.db.models import F
+
+
+class SeatLimitExceeded(ValidationError):
+    """La organización no tiene asientos disponibles (o su suscripción no lo permite)"""
+
+    def __init__(self, organization, reason, limit=None):
+        self.organization = organization
+        self.reason = reason
+        self.limit = limit
+        super().__init__(
+            f"La organización {organization.name} ha alcanzado su límite de usuarios"
+            if limit is not None else f"La organización {organization.name} no puede agregar usuarios: {reason}"
+        )
+
+
+def lock_organization(organization_id, using=None):
+    """Organización con su fila bloqueada hasta el fin de la transacción (suscripción y plan incluidos)"""
+    from .models import Organization
+
+    using = using or router.db_for_write(Organization)
+    if not transaction.get_connection(using).features.has_select_for_update:
+        Organization.objects.using(using).filter(pk=organization_id).update(user_count=F('user_count'))
+
+    return (
+        Organization.objects.using(using)
+        .select_for_update(of=('self',))
+        .select_related('subscription__plan')
+        .get(pk=organization_id)
+    )
+
+
+def reserve_seat(organization_id, using=None):
+    """
+    Bloquea la organización y verifica que quede un asiento libre. Debe llamarse
+    dentro de ``transaction.atomic``, en la misma transacción que guarda al
+    usuario (el incremento de ``user_count`` lo hace ``User.save``).
+
+    Retorna la organización bloqueada; lanza ``SeatLimitExceeded`` si no hay lugar.
+    """
+    if not transaction.get_connection(using).in_atomic_block:
+        raise transaction.TransactionManagementError(
+            "reserve_seat() debe ejecutarse dentro de transaction.atomic()"
+        )
+
+    organization = lock_organization(organization_id, using=using)
+    check = organization.can_create_user_with_subscription()
+    if not check['can_create']:
+        raise SeatLimitExceeded(organization, check['reason'], limit=check.get('limit'))
+    return organization
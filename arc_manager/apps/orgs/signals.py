@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+import logging
+
+from apps.plans.models import Plan, Subscription, Payment
+from .cache_utils import bump_organization_cache_version
+from .counters import apply_user_counter_delta, user_counter_state
+from .models import Organization, OrganizationAlert
+
+logger = logging.getLogger(__name__)
+
+
+def invalidate_organization_snapshot(organization_id):
+    """Invalida el snapshot de la organización cuando la transacción se confirme"""
+    if organization_id:
+        transaction.on_commit(lambda: bump_organization_cache_version(organization_id))
+
+
+@receiver([post_save, post_delete], sender=Organization)
+def organization_changed(sender, instance, **kwargs):
+    invalidate_organization_snapshot(instance.pk)
+
+
+@receiver(post_save, sender=Organization)
+def provision_organization_subscription(sender, instance, created, raw=False, **kwargs):
+    """
+    Provisiona la suscripción inicial al crear la organización (trial, o el plan
+    indicado en ``instance._initial_plan``). Es idempotente; si falla, el comando
+    provision_missing_subscriptions la completa después.
+    """
+    if not created or raw:
+        return
+    from apps.plans.services import SubscriptionService
+    
+    try:
+        SubscriptionService.provision_subscription(instance, plan=getattr(instance, '_initial_plan', None))
+    except Exception as e:
+        logger.error(f"Error provisionando la suscripción de {instance.name}: {str(e)}", exc_info=True)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleted_counters(sender, instance, **kwargs):
+    """Descontar al usuario de los contadores (cubre delete() y QuerySet.delete())"""
+    old_state = getattr(instance, '_counter_state', None) or user_counter_state(instance)
+    apply_user_counter_delta(old_state, None)
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    # _counter_state es el estado guardado antes de este save: si el usuario
+    # cambió de organización, la anterior también cambia de conteos
+    old_state = getattr(instance, '_counter_state', None)
+    previous_organization_id = old_state[0] if old_state else None
+    invalidate_organization_snapshot(instance.organization_id)
+    if previous_organization_id != instance.organization_id:
+        invalidate_organization_snapshot(previous_organization_id)
+
+
+@receiver([post_save, post_delete], sender=Subscription)
+def subscription_changed(sender, instance, **kwargs):
+    invalidate_organization_snapshot(instance.organization_id)
+
+
+@receiver([post_save, post_delete], sender=OrganizationAlert)
+def alert_changed(sender, instance, **kwargs):
+    invalidate_organization_snapshot(instance.organization_id)
+
+
+@receiver([post_save, post_delete], sender=Payment)
+def payment_changed(sender, instance, **kwargs):
+    organization_id = (
+        Subscription.objects
+        .filter(pk=instance.subscription_id)
+        .values_list('organization_id', flat=True)
+        .first()
+    )
+    invalidate_organization_snapshot(organization_id)
+
+
+@receiver([post_save, post_delete], sender=Plan)
+def plan_changed(sender, instance, **kwargs):
+    # Los límites del plan forman parte de todos los snapshots
+    transaction.on_commit(lambda: bump_organization_cache_version())
@@ -1,3 +1,205 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.plans.models import Plan
+from core.cache import tiered_cache
+from core.cache_backends import OPEN
+
+from . import ratelimit
+from .cache_utils import (
+    _org_version_key, bump_organization_cache_version, get_organization_cache_version, get_organization_snapshot,
+)
+from .counters import find_counter_drift
+from .models import Organization
+from .ratelimit import RateLimitPolicy, local_bucket
+from .seats import SeatLimitExceeded, reserve_seat
+
+User = get_user_model()
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'org-counters'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'org-counters-sessions'},
+})
+class OrganizationCounterTest(TestCase):
+    """Los contadores desnormalizados y el snapshot cacheado siguen a la tabla de usuarios"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Plan.objects.create(name='trial', display_name='Trial', max_users=5, trial_days=30, grace_period_days=5)
+        cls.acme = Organization.objects.create(name='Acme')
+        cls.beta = Organization.objects.create(name='Beta')
+
+    def setUp(self):
+        tiered_cache.clear_local()
+
+    def assertCounts(self, organization, total, active, admins):
+        organization.refresh_from_db()
+        counts = (organization.user_count, organization.active_user_count, organization.admin_user_count)
+        self.assertEqual(counts, (total, active, admins))
+        snapshot, _ = get_organization_snapshot(organization.pk)
+        self.assertEqual(snapshot['counts'], {'total': total, 'active': active, 'admins': admins})
+
+    def test_counters_follow_create_deactivate_move_and_delete(self):
+        # Cachear los snapshots antes de cada cambio: deben invalidarse al confirmar
+        self.assertCounts(self.acme, 0, 0, 0)
+        self.assertCounts(self.beta, 0, 0, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            admin = User.objects.create_user(
+                email='admin@acme.com', password='x', first_name='A', last_name='B',
+                organization=self.acme, is_org_admin=True,
+            )
+            user = User.objects.create_user(
+                email='user@acme.com', password='x', first_name='U', last_name='C', organization=self.acme,
+            )
+        self.assertCounts(self.acme, 2, 2, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.is_active = False
+            user.save(update_fields=['is_active'])
+        self.assertCounts(self.acme, 2, 1, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            admin = User.objects.get(pk=admin.pk)
+            admin.organization = self.beta
+            admin.save()
+        self.assertCounts(self.acme, 1, 0, 0)
+        self.assertCounts(self.beta, 1, 1, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(pk=user.pk).delete()
+            admin.delete()
+        self.assertCounts(self.acme, 0, 0, 0)
+        self.assertCounts(self.beta, 0, 0, 0)
+
+        self.assertEqual(find_counter_drift([self.acme.pk, self.beta.pk]), [])
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'org-seats'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'org-seats-sessions'},
+})
+class SeatLimitTest(TestCase):
+    """reserve_seat rechaza el alta que supera Plan.max_users sin tocar los contadores"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Plan.objects.create(name='trial', display_name='Trial', max_users=2, trial_days=30, grace_period_days=5)
+        cls.acme = Organization.objects.create(name='Acme')
+        cls.beta = Organization.objects.create(name='Beta')
+        for i in range(2):
+            User.objects.create_user(
+                email=f'usuario{i}@acme.com', password='x', first_name='U', last_name=str(i), organization=cls.acme,
+            )
+
+    def setUp(self):
+        tiered_cache.clear_local()
+
+    def assertUnchanged(self):
+        self.acme.refresh_from_db()
+        self.assertEqual((self.acme.user_count, self.acme.active_user_count), (2, 2))
+        self.assertEqual(self.acme.users.count(), 2)
+        self.assertEqual(find_counter_drift([self.acme.pk, self.beta.pk]), [])
+
+    def test_insert_over_limit_raises(self):
+        with self.assertRaises(SeatLimitExceeded) as raised:
+            User.objects.create_user(
+                email='extra@acme.com', password='x', first_name='E', last_name='X', organization=self.acme,
+            )
+        self.assertEqual(raised.exception.limit, 2)
+        self.assertFalse(User.objects.filter(email='extra@acme.com').exists())
+        self.assertUnchanged()
+
+    def test_move_into_full_organization_raises(self):
+        user = User.objects.create_user(
+            email='user@beta.com', password='x', first_name='U', last_name='B', organization=self.beta,
+        )
+        user = User.objects.get(pk=user.pk)
+        user.organization = self.acme
+        with self.assertRaises(SeatLimitExceeded):
+            user.save()
+        self.assertEqual(User.objects.get(pk=user.pk).organization_id, self.beta.pk)
+        self.beta.refresh_from_db()
+        self.assertEqual(self.beta.user_count, 1)
+        self.assertUnchanged()
+
+    def test_sqlite_lock_path_keeps_counters_after_rejected_insert(self):
+        if connection.features.has_select_for_update:
+            self.skipTest('El UPDATE sin efecto solo se usa sin SELECT ... FOR UPDATE')
+
+        with CaptureQueriesContext(connection) as queries:
+            with self.assertRaises(SeatLimitExceeded):
+                with transaction.atomic():
+                    reserve_seat(self.acme.pk)
+        # El UPDATE sin efecto toma el bloqueo de escritura antes de leer
+        statements = [query['sql'].split()[0] for query in queries.captured_queries if 'orgs_organization' in query['sql']]
+        self.assertEqual(statements[:2], ['UPDATE', 'SELECT'])
+        self.assertUnchanged()
+
+        # La organización sigue aceptando altas al liberar un asiento
+        User.objects.filter(email='usuario0@acme.com').first().delete()
+        User.objects.create_user(
+            email='nuevo@acme.com', password='x', first_name='N', last_name='U', organization=self.acme,
+        )
+        self.assertUnchanged()
+
+
+# Nada escucha en el puerto 1: la conexión se rechaza en el acto
+UNREACHABLE_REDIS = {
+    'BACKEND': 'core.cache_backends.ResilientRedisCache',
+    'LOCATION': 'redis://127.0.0.1:1/0',
+    'OPTIONS': {'socket_connect_timeout': 0.1, 'socket_timeout': 0.1, 'FAILURE_THRESHOLD': 2, 'RESET_TIMEOUT': 60},
+}
+
+
+@override_settings(CACHES={'default': UNREACHABLE_REDIS, 'sessions': UNREACHABLE_REDIS})
+class RateLimitCircuitBreakerTest(TestCase):
+    """El rate limit comparte el circuit breaker del cache y usa el token bucket local"""
+
+    def setUp(self):
+        local_bucket.clear()
+        self.addCleanup(local_bucket.clear)
+
+    def test_open_circuit_skips_redis(self):
+        policy = RateLimitPolicy('test', limit=3, window=60, scope='ip')
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1')
+
+        with self.assertLogs('core.cache_backends', 'WARNING'):
+            results = [ratelimit.hit(policy, request) for _ in range(4)]
+
+        self.assertEqual([bool(result) for result in results], [True, True, True, False])
+        self.assertEqual(cache.breaker.state, OPEN)
+        # Dos errores abren el circuito; las siguientes peticiones no tocan Redis
+        self.assertEqual(cache.stats()['errors'], 2)
+        with mock.patch.object(ratelimit, '_redis_hit') as redis_hit:
+            ratelimit.hit(policy, request)
+        redis_hit.assert_not_called()
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'org-versions'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'org-versions-sessions'},
+})
+class OrganizationCacheVersionTest(TestCase):
+
+    def setUp(self):
+        tiered_cache.clear_local()
+        self.addCleanup(tiered_cache.clear_local)
+
+    def test_bump_fallback_updates_local_copy(self):
+        key = _org_version_key(7)
+        self.assertEqual(get_organization_cache_version(7), '1.1')
+
+        # La clave se desaloja entre add() (que ve la anterior) e incr()
+        with mock.patch.object(tiered_cache, 'add', return_value=False):
+            bump_organization_cache_version(7)
+
+        self.assertEqual(tiered_cache.local.get(key), 2)
+        self.assertEqual(cache.get(key), 2)
+        self.assertEqual(get_organization_cache_version(7), '1.2')
@@ -4,8 +4,9 @@ from django.contrib import messages
 from django.views.generic import ListView, CreateView, UpdateView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
+from .identity import get_identity_map
 from .models import Organization
-from .mixins import OrganizationAdminMixin
+from .mixins import IdentityMapMixin, OrganizationAdminMixin
 from .forms import OrganizationForm
 
 # =============================================================================
@@ -48,28 +49,35 @@ def my_organization(request):
         return redirect('main:dashboard')
     
     organization = request.user.organization
+    # Una sola consulta (y solo si la plantilla usa las listas), particionada en memoria
+    members = get_identity_map(request).organization_users(organization)
     
     return render(request, 'orgs/my_organization.html', {
         'organization': organization,
-        'users': organization.users.all(),
-        'admins': organization.get_admins(),
-        'active_users': organization.users.filter(is_active=True),
+        'users': members.all,
+        'admins': members.admins,
+        'active_users': members.active,
     })
 
-class OrganizationDetailView(LoginRequiredMixin, DetailView):
+class OrganizationDetailView(LoginRequiredMixin, IdentityMapMixin, DetailView):
     """Vista para ver los detalles de una organización"""
     model = Organization
     template_name = 'orgs/my_organization.html'
     context_object_name = 'organization'
     
+    def get_object(self, queryset=None):
+        # dispatch, get y get_context_data comparten la misma instancia
+        return self.get_instance_or_404(Organization, self.kwargs['pk'], queryset)
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        organization = self.get_object()
+        organization = self.object
         
-        # Obtener usuarios de la organización
-        context['users'] = organization.users.all()
-        context['admins'] = organization.users.filter(is_org_admin=True)
-        context['active_users'] = organization.users.filter(is_active=True)
+        # Usuarios de la organización: una consulta particionada en memoria
+        members = self.identity_map.organization_users(organization)
+        context['users'] = members.all
+        context['admins'] = members.admins
+        context['active_users'] = members.active
         
         # Calcular porcentaje de capacidad usando get_max_users()
         max_users = organization.get_max_users()
@@ -3,13 +3,14 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.contrib import messages
-from .models import Plan, Subscription, UpgradeRequest, Payment
+from .models import Plan, Subscription, UpgradeRequest, Payment, SubscriptionNotification
+from core.pagination import ApproximateCountAdminMixin, CursorPaginationAdminMixin
 import logging
 
 logger = logging.getLogger(__name__)
 
 @admin.register(Plan)
-class PlanAdmin(admin.ModelAdmin):
+class PlanAdmin(ApproximateCountAdminMixin, admin.ModelAdmin):
     list_display = ('display_name', 'name', 'price', 'max_users', 'trial_days', 'billing_cycle_days', 'grace_period_days', 'is_active')
     list_filter = ('is_active', 'name')
     search_fields = ('name', 'display_name')
@@ -42,7 +43,7 @@ class PaymentInline(admin.TabularInline):
         return False
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(ApproximateCountAdminMixin, admin.ModelAdmin):
     list_display = ('organization', 'plan', 'subscription_status', 'end_date_formatted', 'days_remaining_display', 'is_active')
     list_filter = ('subscription_status', 'plan__name')
     search_fields = ('organization__name', 'plan__display_name')
@@ -105,9 +106,6 @@ class SubscriptionAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
         obj.update_status()
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).prefetch_related('plan', 'organization')
-
     @admin.display(description="Estado", ordering='subscription_status')
     def is_active(self, obj):
         if obj.is_active:
@@ -157,7 +155,7 @@ class SubscriptionAdmin(admin.ModelAdmin):
             self.message_user(request, f"{processed_count} suscripciones han sido extendidas exitosamente.", messages.SUCCESS)
 
 @admin.register(UpgradeRequest)
-class UpgradeRequestAdmin(admin.ModelAdmin):
+class UpgradeRequestAdmin(CursorPaginationAdminMixin, admin.ModelAdmin):
     list_display = [
         'organization', 'current_plan', 'requested_plan', 
         'amount', 'status_display', 'created_at', 'approved_by'
@@ -169,6 +167,7 @@ class UpgradeRequestAdmin(admin.ModelAdmin):
         'created_at', 'updated_at', 'approved_by'
     ]
     ordering = ['-created_at']
+    cursor_ordering = ('-created_at', '-id')
     actions = ['approve_selected_requests']
 
     def status_display(self, obj):
@@ -191,7 +190,7 @@ class UpgradeRequestAdmin(admin.ModelAdmin):
     approve_selected_requests.short_description = "Aprobar solicitudes seleccionadas"
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(CursorPaginationAdminMixin, admin.ModelAdmin):
     list_display = [
         'subscription', 'amount', 'payment_method', 'payment_type', 'status', 
         'processed_by', 'created_at'
@@ -204,6 +203,7 @@ class PaymentAdmin(admin.ModelAdmin):
         'new_end_date', 'created_at'
     ]
     ordering = ['-created_at']
+    cursor_ordering = ('-created_at', '-id')
 
     def has_add_permission(self, request):
         return False
@@ -212,7 +212,27 @@ class PaymentAdmin(admin.ModelAdmin):
         return False
         
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('subscription__organization')
+        # __str__ de la suscripción usa organización y plan
+        return super().get_queryset(request).select_related('subscription__organization', 'subscription__plan')
+
+@admin.register(SubscriptionNotification)
+class SubscriptionNotificationAdmin(CursorPaginationAdminMixin, admin.ModelAdmin):
+    """Registro de recordatorios de vencimiento enviados (solo lectura)"""
+    list_display = ['subscription', 'kind', 'threshold', 'period_end', 'sent_at']
+    list_filter = ['kind', 'threshold']
+    search_fields = ['subscription__organization__name']
+    readonly_fields = ['subscription', 'kind', 'threshold', 'period_end', 'recipients', 'sent_at']
+    ordering = ['-sent_at']
+    cursor_ordering = ('-sent_at', '-id')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('subscription__organization', 'subscription__plan')
 
 admin.site.site_header = "ARC Manager - Administración"
 admin.site.site_title = "ARC Manager Admin"
@@ -5,3 +5,6 @@ class PlansConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.plans'
     label = 'plans'
+
+    def ready(self):
+        import apps.plans.signals
@@ -0,0 +1,237 @@
+"""
+Catálogo de planes en memoria del proceso.
+
+La tabla ``Plan`` tiene un par de filas y cambia unas pocas veces al año, pero
+se consultaba en formularios, vistas de upgrade y provisión de suscripciones.
+``get_catalog()`` la carga una vez por worker (``warm_plan_catalog`` desde
+``core.wsgi``) en una estructura inmutable: búsqueda por id y por nombre,
+planes activos ordenados por precio y una máscara de características
+precalculada por plan.
+
+Invalidación entre workers: un contador de versión en el cache compartido
+(Redis). Cada worker lo compara como mucho una vez cada
+``PLAN_CATALOG_CHECK_INTERVAL`` segundos y recarga si cambió. El ``post_save``
+/ ``post_delete`` de ``Plan`` incrementa la versión al confirmar la
+transacción (``apps.plans.signals``).
+
+Las funciones retornan instancias nuevas de ``Plan`` en cada llamada:
+modificarlas no altera el catálogo.
+
+Uso::
+
+    trial = get_plan_by_name('trial')
+    plans = upgrade_options(subscription.plan)
+    if has_feature(plan.pk, FEATURE_PAID): ...
+"""
+import logging
+import threading
+import time
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = 'plans:catalog_version'
+
+# Segundos entre comprobaciones de la versión compartida
+CHECK_INTERVAL = getattr(settings, 'PLAN_CATALOG_CHECK_INTERVAL', 30)
+
+# Máscara de características / límites por plan
+FEATURE_TRIAL = 1 << 0          # Plan de prueba gratuita
+FEATURE_PAID = 1 << 1           # Tiene precio
+FEATURE_GRACE_PERIOD = 1 << 2   # Período de gracia al vencer
+FEATURE_MULTI_USER = 1 << 3     # Más de un usuario
+
+
+def plan_features(plan):
+    """Máscara de características de una instancia de Plan"""
+    features = 0
+    if plan.is_trial:
+        features |= FEATURE_TRIAL
+    if plan.price > 0:
+        features |= FEATURE_PAID
+    if plan.grace_period_days > 0:
+        features |= FEATURE_GRACE_PERIOD
+    if plan.max_users > 1:
+        features |= FEATURE_MULTI_USER
+    return features
+
+
+class PlanEntry:
+    """Fila de Plan congelada: valores de sus campos y datos precalculados"""
+
+    __slots__ = ('pk', 'name', 'is_active', 'price', 'max_users', 'fields', 'features', 'feature_list')
+
+    def __init__(self, plan):
+        self.pk = plan.pk
+        self.name = plan.name
+        self.is_active = plan.is_active
+        self.price = plan.price
+        self.max_users = plan.max_users
+        self.fields = MappingProxyType({field.attname: getattr(plan, field.attname) for field in plan._meta.concrete_fields})
+        self.features = plan_features(plan)
+        self.feature_list = tuple(plan.get_feature_list())
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError(f'PlanEntry es inmutable ({name})')
+        super().__setattr__(name, value)
+
+    def to_plan(self):
+        """Instancia de Plan 'cargada de BD' (nueva en cada llamada)"""
+        from .models import Plan
+
+        return Plan.from_db(DEFAULT_DB_ALIAS, list(self.fields), list(self.fields.values()))
+
+
+class PlanCatalog:
+    """Snapshot inmutable de la tabla Plan en una versión dada"""
+
+    def __init__(self, plans, version):
+        entries = [PlanEntry(plan) for plan in plans]
+        self.version = version
+        self._by_id = MappingProxyType({entry.pk: entry for entry in entries})
+        self._by_name = MappingProxyType({entry.name: entry for entry in entries})
+        self._active = tuple(sorted(
+            (entry for entry in entries if entry.is_active),
+            key=lambda entry: (entry.price, entry.max_users),
+        ))
+
+    @classmethod
+    def load(cls, version):
+        from .models import Plan
+
+        return cls(Plan.objects.all(), version)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def entry(self, plan_id):
+        try:
+            return self._by_id.get(int(plan_id))
+        except (TypeError, ValueError):
+            return None
+
+    def entry_by_name(self, name):
+        return self._by_name.get(name)
+
+    def active_entries(self):
+        return self._active
+
+
+# =============================================================================
+# Catálogo del proceso
+# =============================================================================
+
+_catalog = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _shared_version(current=None):
+    """Versión compartida; si el cache no responde se conserva la actual"""
+    try:
+        return cache.get(CATALOG_VERSION_KEY, 1)
+    except Exception as e:
+        logger.warning(f"No se pudo leer la versión del catálogo de planes: {e}")
+        return current
+
+
+def get_catalog():
+    """
+    Catálogo vigente del proceso. Sin consultas a la BD mientras la versión
+    compartida no cambie; como mucho un GET al cache cada CHECK_INTERVAL.
+    """
+    global _catalog, _checked_at
+
+    catalog = _catalog
+    now = time.monotonic()
+    if catalog is not None and now - _checked_at < CHECK_INTERVAL:
+        return catalog
+
+    with _lock:
+        catalog = _catalog
+        if catalog is not None and now - _checked_at < CHECK_INTERVAL:
+            return catalog
+        version = _shared_version(catalog.version if catalog is not None else None)
+        if catalog is None or catalog.version != version:
+            catalog = PlanCatalog.load(version)
+            _catalog = catalog
+            logger.debug(f"Catálogo de planes cargado: {len(catalog)} planes (versión {version})")
+        _checked_at = now
+    return catalog
+
+
+def invalidate_plan_catalog():
+    """Descarta el catálogo de este proceso e incrementa la versión compartida"""
+    global _catalog
+
+    _catalog = None
+    # La versión implícita es 1: si la clave no existe la creamos ya en 2
+    if cache.add(CATALOG_VERSION_KEY, 2, None):
+        return
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # La clave se desalojó entre add() e incr()
+        cache.set(CATALOG_VERSION_KEY, 2, None)
+
+
+def warm_plan_catalog():
+    """Carga el catálogo al iniciar el worker (sin fallar si la BD no está lista)"""
+    try:
+        get_catalog()
+    except DatabaseError as e:
+        logger.warning(f"No se pudo precargar el catálogo de planes: {e}")
+
+
+# =============================================================================
+# Consultas
+# =============================================================================
+
+def get_plan(plan_id, active_only=False):
+    """Plan por id, o None"""
+    entry = get_catalog().entry(plan_id)
+    if entry is None or (active_only and not entry.is_active):
+        return None
+    return entry.to_plan()
+
+
+def get_plan_by_name(name, active_only=True):
+    """Plan por nombre ('trial', 'basic'), o None"""
+    entry = get_catalog().entry_by_name(name)
+    if entry is None or (active_only and not entry.is_active):
+        return None
+    return entry.to_plan()
+
+
+def active_plans():
+    """Planes activos ordenados por precio"""
+    return [entry.to_plan() for entry in get_catalog().active_entries()]
+
+
+def upgrade_options(plan):
+    """Planes activos de mayor precio que `plan`"""
+    return [entry.to_plan() for entry in get_catalog().active_entries() if entry.price > plan.price]
+
+
+def has_feature(plan_id, feature):
+    entry = get_catalog().entry(plan_id)
+    return entry is not None and bool(entry.features & feature)
+
+
+def attach_plan(subscription):
+    """
+    Cachea en la suscripción su plan desde el catálogo, así
+    ``subscription.plan`` no consulta la BD. Retorna la suscripción.
+    """
+    from .models import Subscription
+
+    if subscription is not None and not Subscription.plan.is_cached(subscription):
+        plan = get_plan(subscription.plan_id)
+        if plan is not None:
+            Subscription.plan.field.set_cached_value(subscription, plan)
+    return subscription
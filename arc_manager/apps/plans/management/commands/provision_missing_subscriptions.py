@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand
+from apps.orgs.models import Organization
+from apps.plans.services import SubscriptionService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Provisiona la suscripción trial de las organizaciones que no tienen una - Para uso en cron jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo muestra qué organizaciones se provisionarían',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Cantidad de organizaciones leídas por lote',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+
+        self.stdout.write(self.style.SUCCESS('🔄 Buscando organizaciones sin suscripción'))
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('⚠️  MODO DRY-RUN: No se realizarán cambios reales'))
+
+        pending = Organization.objects.filter(subscription__isnull=True).order_by('pk')
+        total = pending.count()
+
+        if total == 0:
+            self.stdout.write(self.style.SUCCESS('✅ Todas las organizaciones tienen suscripción'))
+            return
+
+        self.stdout.write(f'📊 Organizaciones sin suscripción: {total}')
+
+        provisioned = skipped = errors = 0
+        last_pk = 0
+        while True:
+            batch = list(pending.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            for organization in batch:
+                if dry_run:
+                    self.stdout.write(f'  - [DRY-RUN] Provisionaría trial para: {organization.name} (ID {organization.pk})')
+                    provisioned += 1
+                    continue
+
+                try:
+                    subscription, created = SubscriptionService.provision_subscription(organization)
+                except Exception as e:
+                    errors += 1
+                    logger.error(f"Error provisionando suscripción para {organization.name}: {str(e)}", exc_info=True)
+                    self.stdout.write(self.style.ERROR(f'  ❌ {organization.name}: {str(e)}'))
+                    continue
+
+                if subscription is None:
+                    # Sin plan trial no tiene sentido seguir intentando
+                    self.stdout.write(self.style.ERROR('❌ No hay plan trial activo configurado'))
+                    return
+                if created:
+                    provisioned += 1
+                    self.stdout.write(f'  ✅ {organization.name}: {subscription.plan.display_name}')
+                else:
+                    # Otro proceso la creó mientras tanto
+                    skipped += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Provisionadas: {provisioned} | Ya existentes: {skipped} | Errores: {errors}'
+        ))
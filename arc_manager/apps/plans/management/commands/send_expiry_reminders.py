@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from apps.plans.reminders import REMINDER_DAYS, run_expiry_reminders
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Avisa a los admins de las suscripciones por vencer (14/7/3/1 días) y precalcula los banners - Para cron nocturno'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo muestra qué avisos se enviarían, sin encolar ni guardar nada',
+        )
+        parser.add_argument(
+            '--verbose',
+            action='store_true',
+            help='Muestra cada suscripción avisada',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        thresholds = '/'.join(str(days) for days in REMINDER_DAYS)
+
+        self.stdout.write(self.style.SUCCESS(f'⏰ Buscando suscripciones por vencer (umbrales: {thresholds} días)'))
+        if dry_run:
+            self.stdout.write(self.style.WARNING('⚠️  MODO DRY-RUN: No se realizarán cambios reales'))
+
+        try:
+            result = run_expiry_reminders(dry_run=dry_run)
+        except IntegrityError:
+            raise CommandError('Otra ejecución registró los mismos avisos; no se encoló nada')
+
+        if options['verbose'] or dry_run:
+            for reminder in result.notified:
+                self.stdout.write(
+                    f'  📧 {reminder.organization.name} - {reminder.when} '
+                    f'(umbral {reminder.threshold}, {len(reminder.admins)} admins)'
+                )
+
+        self.stdout.write(f'  📋 {len(result.reminders)} suscripciones dentro de los umbrales')
+        if result.already_sent:
+            self.stdout.write(f'  ⏭️  {result.already_sent} ya avisadas en este umbral')
+        if result.without_admins:
+            self.stdout.write(self.style.WARNING(f'  ⚠️  {result.without_admins} organizaciones sin administradores activos'))
+        if result.alerts_cleared:
+            self.stdout.write(f'  🧹 {result.alerts_cleared} alertas que ya no aplican eliminadas')
+
+        verb = 'se encolarían' if dry_run else 'encolados'
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {len(result.notified)} organizaciones avisadas, {result.emails} emails {verb}'
+        ))
+        if result.emails and not dry_run:
+            self.stdout.write('📬 Los avisos se entregan con el comando send_outbox')
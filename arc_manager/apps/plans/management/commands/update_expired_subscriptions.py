@@ -1,6 +1,5 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from apps.plans.models import Subscription
+from apps.plans.services import SubscriptionTransitionEngine
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,31 +28,14 @@ class Command(BaseCommand):
         
         self.stdout.write('🔄 Actualizando estado de suscripciones...')
         
-        # Obtener todas las suscripciones que no están expiradas
-        subscriptions = Subscription.objects.exclude(
-            subscription_status__in=['trial_expired', 'basic_expired']
-        )
-        
-        total_subscriptions = subscriptions.count()
-        updated_count = 0
+        engine = SubscriptionTransitionEngine(dry_run=dry_run)
+        total_subscriptions = engine.due_subscriptions().count()
         
-        self.stdout.write(f'📊 Verificando {total_subscriptions} suscripciones...')
+        self.stdout.write(f'📊 Verificando {total_subscriptions} suscripciones con transición vencida...')
         
-        for subscription in subscriptions:
-            old_status = subscription.subscription_status
-            
-            if verbose:
-                self.stdout.write(f'   • {subscription.organization.name} ({old_status})')
-
-            # Simular la actualización de estado si es dry-run
-            if dry_run:
-                new_status = subscription.calculate_current_status()
-            else:
-                subscription.update_status()
-                new_status = subscription.subscription_status
-            
-            if old_status != new_status:
-                updated_count += 1
+        def report_batch(batch_number, batch_stats):
+            for change, count in batch_stats['status_changes'].items():
+                new_status = change.split(' → ')[-1]
                 
                 if 'expired' in new_status:
                     status_color = self.style.ERROR
@@ -65,13 +47,13 @@ class Command(BaseCommand):
                     status_color = self.style.SUCCESS
                     status_icon = '✅'
                 
-                self.stdout.write(
-                    f'   {status_icon} {subscription.organization.name}: {old_status} → {status_color(new_status)}'
-                )
-                
-                if verbose:
-                    end_date_str = subscription.end_date.strftime("%d/%m/%Y") if subscription.end_date else "N/A"
-                    self.stdout.write(f'      Fecha de vencimiento: {end_date_str}')
+                self.stdout.write(f'   {status_icon} {status_color(change)}: {count} suscripciones')
+            
+            if verbose:
+                self.stdout.write(f'      Lote {batch_number}: {batch_stats["processed"]} vencidas, {batch_stats["changed"]} cambios')
+        
+        stats = engine.run(on_batch=report_batch)
+        updated_count = stats['changed']
         
         # Resumen
         self.stdout.write('')
@@ -79,6 +61,7 @@ class Command(BaseCommand):
         self.stdout.write(f'   • Total verificadas: {total_subscriptions}')
         self.stdout.write(f'   • Actualizadas: {updated_count}')
         self.stdout.write(f'   • Sin cambios: {total_subscriptions - updated_count}')
+        self.stdout.write(f'   • Throughput: {stats["rows_per_second"]:,.0f} filas/s ({stats["elapsed"]:.2f}s)')
         
         if updated_count > 0:
             if dry_run:
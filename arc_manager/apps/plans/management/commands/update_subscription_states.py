@@ -1,8 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from django.db import transaction
 from apps.plans.models import Subscription
-from apps.plans.services import SubscriptionService
+from apps.plans.services import SubscriptionTransitionEngine
 import logging
 
 logger = logging.getLogger(__name__)
@@ -31,12 +30,19 @@ class Command(BaseCommand):
             type=int,
             help='Procesar solo una organización específica por ID',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SubscriptionTransitionEngine.DEFAULT_BATCH_SIZE,
+            help='Cantidad de suscripciones por lote/transacción',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
         verbose = options['verbose']
         filter_status = options['filter_status']
         org_id = options['org_id']
+        batch_size = options['batch_size']
         
         self.stdout.write(self.style.SUCCESS('🔄 Iniciando actualización de estados de suscripción'))
         
@@ -44,90 +50,41 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING('⚠️  MODO DRY-RUN: No se realizarán cambios reales'))
         
         try:
-            # Obtener suscripciones a procesar
-            subscriptions = Subscription.objects.select_related('organization', 'plan')
+            engine = SubscriptionTransitionEngine(
+                batch_size=batch_size,
+                org_id=org_id,
+                filter_status=filter_status,
+                dry_run=dry_run,
+            )
             
             if org_id:
-                subscriptions = subscriptions.filter(organization__id=org_id)
                 self.stdout.write(f'📋 Procesando solo organización ID: {org_id}')
             
             if filter_status:
-                subscriptions = subscriptions.filter(subscription_status=filter_status)
                 self.stdout.write(f'📋 Procesando solo estado: {filter_status}')
             
-            total_subscriptions = subscriptions.count()
+            # Conteo por índice de las suscripciones con transición vencida
+            total_subscriptions = engine.due_subscriptions().count()
             
             if total_subscriptions == 0:
                 self.stdout.write(self.style.WARNING('❌ No hay suscripciones para procesar'))
                 return
             
-            self.stdout.write(f'📊 Total de suscripciones a procesar: {total_subscriptions}')
-            
-            # Contadores para estadísticas
-            stats = {
-                'processed': 0,
-                'changed': 0,
-                'errors': 0,
-                'expired': 0,
-                'grace_period': 0,
-                'reactivated': 0,
-                'status_changes': {}
-            }
-            
-            # Procesar cada suscripción
-            for subscription in subscriptions:
-                try:
-                    stats['processed'] += 1
-                    
-                    if verbose:
-                        self.stdout.write(f'  📋 Procesando: {subscription.organization.name} ({subscription.subscription_status})')
-                    
-                    # Obtener estado actual y nuevo
-                    old_status = subscription.subscription_status
-                    new_status = subscription.calculate_current_status()
-                    
-                    if old_status != new_status:
-                        stats['changed'] += 1
-                        
-                        # Registrar cambio de estado
-                        change_key = f"{old_status} → {new_status}"
-                        stats['status_changes'][change_key] = stats['status_changes'].get(change_key, 0) + 1
-                        
-                        # Clasificar el tipo de cambio
-                        if new_status.endswith('_expired'):
-                            stats['expired'] += 1
-                        elif new_status.endswith('_grace'):
-                            stats['grace_period'] += 1
-                        elif new_status.endswith('_active') and old_status.endswith('_expired'):
-                            stats['reactivated'] += 1
-                        
-                        if not dry_run:
-                            # Usar el servicio para actualizar el estado
-                            result = SubscriptionService.update_subscription_status(subscription)
-                            
-                            if result['success']:
-                                self.stdout.write(
-                                    self.style.SUCCESS(f'  ✅ {subscription.organization.name}: {old_status} → {new_status}')
-                                )
-                            else:
-                                self.stdout.write(
-                                    self.style.ERROR(f'  ❌ Error actualizando {subscription.organization.name}: {result["error"]}')
-                                )
-                                stats['errors'] += 1
-                        else:
-                            self.stdout.write(
-                                self.style.WARNING(f'  🔄 [DRY-RUN] {subscription.organization.name}: {old_status} → {new_status}')
-                            )
-                    else:
-                        if verbose:
-                            self.stdout.write(f'  ✅ {subscription.organization.name}: Sin cambios ({old_status})')
-                
-                except Exception as e:
-                    stats['errors'] += 1
-                    self.stdout.write(
-                        self.style.ERROR(f'  ❌ Error procesando {subscription.organization.name}: {str(e)}')
-                    )
-                    logger.error(f'Error procesando suscripción {subscription.id}: {str(e)}', exc_info=True)
+            self.stdout.write(f'📊 Total de suscripciones a procesar: {total_subscriptions} (lotes de {batch_size})')
+            
+            def report_batch(batch_number, batch_stats):
+                if not verbose:
+                    return
+                prefix = '[DRY-RUN] ' if dry_run else ''
+                self.stdout.write(
+                    f'  📦 {prefix}Lote {batch_number}: {batch_stats["processed"]} vencidas, '
+                    f'{batch_stats["changed"]} cambios'
+                )
+                for change, count in batch_stats['status_changes'].items():
+                    self.stdout.write(f'     🔄 {change}: {count}')
+            
+            # Aplicar las transiciones con UPDATEs set-based por lote y plan
+            stats = engine.run(on_batch=report_batch)
             
             # Mostrar estadísticas finales
             self.stdout.write(self.style.SUCCESS('\n📊 ESTADÍSTICAS FINALES:'))
@@ -137,6 +94,11 @@ class Command(BaseCommand):
             self.stdout.write(f'  ⏰ Nuevas expiraciones: {stats["expired"]}')
             self.stdout.write(f'  🕐 Entradas en gracia: {stats["grace_period"]}')
             self.stdout.write(f'  ✅ Reactivaciones: {stats["reactivated"]}')
+            self.stdout.write(f'  📦 Lotes: {stats["batches"]}')
+            self.stdout.write(
+                f'  ⚡ Throughput: {stats["rows_per_second"]:,.0f} filas/s '
+                f'({stats["processed"]} filas en {stats["elapsed"]:.2f}s)'
+            )
             
             # Detalles de cambios de estado
             if stats['status_changes']:
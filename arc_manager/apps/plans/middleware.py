@@ -7,6 +7,9 @@ from django.core.exceptions import PermissionDenied
 from django.conf import settings
 import logging
 
+from apps.orgs.context import get_request_tenant
+from core.routing import classify_path, classify_request
+
 from .services import SubscriptionService
 
 logger = logging.getLogger(__name__)
@@ -22,34 +25,7 @@ class SubscriptionAccessMiddleware(MiddlewareMixin):
     def __init__(self, get_response):
         self.get_response = get_response
         
-        # Rutas que siempre están permitidas (sin verificación de suscripción)
-        self.always_allowed_paths = [
-            '/admin/',
-            '/accounts/login/',
-            '/accounts/logout/',
-            '/accounts/password_reset/',
-            '/plans/',
-            '/api/check-limits/',
-            '/static/',
-            '/media/',
-            '/favicon.ico',
-        ]
-        
-        # Rutas que requieren acceso completo
-        self.full_access_required_paths = [
-            '/dashboard/',
-            '/orgs/',
-            '/users/',
-            '/projects/',  # Para el futuro
-            '/reports/',   # Para el futuro
-        ]
-        
-        # Rutas que pueden funcionar con acceso limitado
-        self.limited_access_paths = [
-            '/plans/',
-            '/subscription/',
-            '/billing/',
-        ]
+        # Rutas siempre permitidas, módulos y nivel de acceso por ruta: core.routing
         
         # Configuración desde settings
         self.enabled = getattr(settings, 'SUBSCRIPTION_ACCESS_MIDDLEWARE_ENABLED', True)
@@ -74,11 +50,16 @@ class SubscriptionAccessMiddleware(MiddlewareMixin):
             return None
         
         # Verificar si la ruta está en las permitidas siempre
-        if self._is_always_allowed(request.path):
+        route = classify_request(request)
+        if route.subscription_exempt:
             return None
         
+        # Organización y suscripción desde el contexto compartido (la transición
+        # vencida ya se aplicó al resolverla; sin escrituras si no hay suscripción)
+        tenant = get_request_tenant(request)
+        
         # Verificar si el usuario tiene organización
-        if not hasattr(request.user, 'organization') or not request.user.organization:
+        if not tenant.organization:
             # Usuario sin organización - redirigir a configuración
             if not request.path.startswith('/accounts/'):
                 messages.warning(request, 'Necesitas estar asociado a una organización para acceder a esta sección.')
@@ -86,17 +67,17 @@ class SubscriptionAccessMiddleware(MiddlewareMixin):
             return None
         
         # Obtener suscripción
-        subscription = SubscriptionService.get_subscription_or_create(request.user.organization)
+        subscription = tenant.subscription
         if not subscription:
             # Error obteniendo suscripción
             messages.error(request, 'Error verificando tu suscripción. Por favor contacta al soporte.')
             return redirect(self.redirect_url)
         
         # Determinar el módulo actual
-        current_module = self._get_current_module(request.path)
+        current_module = route.module
         
         # Verificar permisos de acceso
-        access_result = SubscriptionService.check_access_permissions(subscription, current_module)
+        access_result = SubscriptionService.check_access_permissions(subscription, current_module, route.access_level)
         
         if not access_result.get('has_access', False):
             return self._handle_access_denied(request, access_result)
@@ -109,29 +90,11 @@ class SubscriptionAccessMiddleware(MiddlewareMixin):
     
     def _is_always_allowed(self, path):
         """Verifica si la ruta está siempre permitida"""
-        for allowed_path in self.always_allowed_paths:
-            if path.startswith(allowed_path):
-                return True
-        return False
+        return classify_path(path).subscription_exempt
     
     def _get_current_module(self, path):
         """Determina el módulo actual basado en la ruta"""
-        if path.startswith('/dashboard/'):
-            return 'dashboard'
-        elif path.startswith('/orgs/'):
-            return 'organizations'
-        elif path.startswith('/users/'):
-            return 'users'
-        elif path.startswith('/projects/'):
-            return 'projects'
-        elif path.startswith('/reports/'):
-            return 'reports'
-        elif path.startswith('/plans/') or path.startswith('/subscription/'):
-            return 'plans'
-        elif path.startswith('/billing/'):
-            return 'billing'
-        else:
-            return 'general'
+        return classify_path(path).module
     
     def _handle_access_denied(self, request, access_result):
         """Maneja el acceso denegado según el tipo de request"""
@@ -172,12 +135,13 @@ class SubscriptionInfoMiddleware(MiddlewareMixin):
         """Agrega información de suscripción al request"""
         
         # Solo para usuarios autenticados con organización
-        if (request.user.is_authenticated and 
-            hasattr(request.user, 'organization') and 
-            request.user.organization):
+        if request.user.is_authenticated and getattr(request.user, 'organization_id', None):
             
-            subscription = SubscriptionService.get_subscription_or_create(request.user.organization)
+            tenant = get_request_tenant(request)
+            subscription = tenant.subscription
             if subscription:
+                # Días restantes y "vence pronto" vienen de la alerta precalculada
+                alert = tenant.alert
                 # Agregar información útil al request
                 request.subscription_info = {
                     'status': subscription.subscription_status,
@@ -185,9 +149,10 @@ class SubscriptionInfoMiddleware(MiddlewareMixin):
                     'is_active': subscription.is_active,
                     'is_expired': subscription.is_expired,
                     'is_in_grace': subscription.is_in_grace_period,
-                    'days_remaining': subscription.days_remaining,
+                    'days_remaining': alert.days_remaining if alert else None,
                     'plan_name': subscription.plan.display_name,
-                    'expires_soon': subscription.days_remaining <= 7 and subscription.days_remaining > 0,
+                    'expires_soon': alert is not None and alert.level in ('warning', 'critical'),
+                    'alert': alert,
                     'needs_attention': subscription.is_expired or subscription.is_in_grace_period,
                 }
         
@@ -215,7 +180,8 @@ def subscription_required(allowed_statuses=None, redirect_url=None):
                 messages.warning(request, 'Necesitas estar asociado a una organización.')
                 return redirect('orgs:my_organization')
             
-            subscription = SubscriptionService.get_subscription_or_create(request.user.organization)
+            # Solo lectura desde el contexto compartido (aplica la transición vencida)
+            subscription = get_request_tenant(request).subscription
             if not subscription:
                 messages.error(request, 'Error verificando tu suscripción.')
                 return redirect(redirect_url or 'plans:subscription_dashboard')
@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-18 12:41
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def backfill_transition_schedule(apps, schema_editor):
+    """Calcula next_transition_at/next_status para las suscripciones existentes"""
+    Subscription = apps.get_model('plans', 'Subscription')
+
+    for subscription in Subscription.objects.select_related('plan').iterator():
+        plan = subscription.plan
+        status = subscription.subscription_status
+        grace_end_date = subscription.grace_end_date
+        if not grace_end_date and subscription.end_date and plan.grace_period_days > 0:
+            grace_end_date = subscription.end_date + timedelta(days=plan.grace_period_days)
+
+        next_transition_at, next_status = None, ''
+        if status.endswith('_active') and subscription.end_date:
+            next_transition_at = subscription.end_date
+            next_status = f'{plan.name}_grace' if grace_end_date else f'{plan.name}_expired'
+        elif status.endswith('_grace') and grace_end_date:
+            next_transition_at = grace_end_date
+            next_status = f'{plan.name}_expired'
+
+        Subscription.objects.filter(pk=subscription.pk).update(
+            next_transition_at=next_transition_at,
+            next_status=next_status,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0004_alter_payment_processed_by'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscription',
+            name='next_status',
+            field=models.CharField(blank=True, default='', max_length=20, verbose_name='Próximo estado'),
+        ),
+        migrations.AddField(
+            model_name='subscription',
+            name='next_transition_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Próxima transición de estado'),
+        ),
+        migrations.RunPython(backfill_transition_schedule, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-18 13:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0005_subscription_transition_schedule'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='subscription',
+            name='end_date',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Fecha de vencimiento'),
+        ),
+        migrations.AlterField(
+            model_name='subscription',
+            name='grace_end_date',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Fin del período de gracia'),
+        ),
+        migrations.CreateModel(
+            name='SubscriptionNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('expiry', 'Vencimiento de suscripción'), ('grace', 'Fin del período de gracia')], max_length=20, verbose_name='Tipo')),
+                ('threshold', models.PositiveSmallIntegerField(verbose_name='Umbral (días)')),
+                ('period_end', models.DateTimeField(verbose_name='Fin del período')),
+                ('recipients', models.JSONField(blank=True, default=list, verbose_name='Destinatarios')),
+                ('sent_at', models.DateTimeField(auto_now_add=True, verbose_name='Encolado')),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='plans.subscription')),
+            ],
+            options={
+                'verbose_name': 'Recordatorio de suscripción',
+                'verbose_name_plural': 'Recordatorios de suscripción',
+                'ordering': ['-sent_at'],
+                'constraints': [models.UniqueConstraint(fields=('subscription', 'kind', 'threshold', 'period_end'), name='unique_subscription_notification')],
+            },
+        ),
+    ]
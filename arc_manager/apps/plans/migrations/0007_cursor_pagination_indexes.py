@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orgs', '0004_search_text'),
+        ('plans', '0006_subscription_notification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['subscription', '-created_at', '-id'], name='payment_sub_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-created_at', '-id'], name='payment_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscriptionnotification',
+            index=models.Index(fields=['-sent_at', '-id'], name='notification_sent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='upgraderequest',
+            index=models.Index(fields=['-created_at', '-id'], name='upgrade_created_idx'),
+        ),
+    ]
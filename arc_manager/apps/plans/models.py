@@ -53,20 +53,16 @@ class Plan(models.Model):
     def is_trial(self):
         return self.name == 'trial'
 
-    # Métodos de clase para obtener planes comunes
+    # Métodos de clase para obtener planes comunes (desde el catálogo en memoria)
     @classmethod
     def get_trial_plan(cls):
-        try:
-            return cls.objects.get(name='trial', is_active=True)
-        except cls.DoesNotExist:
-            return None
+        from .catalog import get_plan_by_name
+        return get_plan_by_name('trial')
     
     @classmethod
     def get_basic_plan(cls):
-        try:
-            return cls.objects.get(name='basic', is_active=True)
-        except cls.DoesNotExist:
-            return None
+        from .catalog import get_plan_by_name
+        return get_plan_by_name('basic')
 
     def get_usage_percentage(self, current_value, limit_type):
         """Calcula el porcentaje de uso para un límite específico de forma simple."""
@@ -97,11 +93,18 @@ class Subscription(models.Model):
     plan = models.ForeignKey(Plan, on_delete=models.PROTECT, verbose_name="Plan Actual")
     
     start_date = models.DateTimeField("Fecha de inicio", default=timezone.now)
-    end_date = models.DateTimeField("Fecha de vencimiento", null=True, blank=True)
-    grace_end_date = models.DateTimeField("Fin del período de gracia", null=True, blank=True)
+    # Indexadas: el pipeline de recordatorios busca por rango de vencimiento
+    end_date = models.DateTimeField("Fecha de vencimiento", null=True, blank=True, db_index=True)
+    grace_end_date = models.DateTimeField("Fin del período de gracia", null=True, blank=True, db_index=True)
     
     subscription_status = models.CharField("Estado de Suscripción", max_length=20, choices=SUBSCRIPTION_STATUS_CHOICES, default='trial_active')
     
+    # Próxima transición de estado precalculada (active -> grace -> expired).
+    # Permite verificar el estado en lecturas sin aritmética de fechas y que el
+    # cron procese solo las filas vencidas con una consulta por índice.
+    next_transition_at = models.DateTimeField("Próxima transición de estado", null=True, blank=True, db_index=True)
+    next_status = models.CharField("Próximo estado", max_length=20, blank=True, default='')
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -115,6 +118,11 @@ class Subscription(models.Model):
 
     def save(self, *args, **kwargs):
         is_new = not self.pk
+        # Mantener siempre sincronizada la transición programada con las fechas/estado
+        self.schedule_next_transition()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'next_transition_at', 'next_status'}
         super().save(*args, **kwargs)
         if is_new:
             self.setup_initial_subscription(self.plan)
@@ -147,7 +155,47 @@ class Subscription(models.Model):
         # Si ninguna de las condiciones anteriores se cumple, ha expirado
         return f'{plan_prefix}_expired'
 
-    def update_status(self):
+    def get_grace_end_date(self):
+        """Fecha de fin de gracia guardada o calculada a partir del plan."""
+        if self.grace_end_date:
+            return self.grace_end_date
+        if self.end_date and self.plan.grace_period_days > 0:
+            return self.end_date + timedelta(days=self.plan.grace_period_days)
+        return None
+
+    def schedule_next_transition(self):
+        """Precalcula cuándo y a qué estado debe pasar la suscripción, sin guardar."""
+        plan_prefix = self.plan.name
+        next_transition_at, next_status = None, ''
+
+        if self.subscription_status.endswith('_active') and self.end_date:
+            grace_end_date = self.get_grace_end_date()
+            next_transition_at = self.end_date
+            next_status = f'{plan_prefix}_grace' if grace_end_date else f'{plan_prefix}_expired'
+        elif self.subscription_status.endswith('_grace'):
+            next_transition_at = self.get_grace_end_date()
+            next_status = f'{plan_prefix}_expired' if next_transition_at else ''
+
+        self.next_transition_at = next_transition_at
+        self.next_status = next_status
+
+    def is_transition_due(self, now=None):
+        """Comprobación barata: solo compara contra la transición precalculada."""
+        if self.next_transition_at is None:
+            return False
+        return (now or timezone.now()) >= self.next_transition_at
+
+    def refresh_status_if_due(self, now=None, persist=True):
+        """
+        Aplica la transición de estado solo si ya venció.
+        Pensado para rutas calientes: sin transición pendiente no hay cálculo ni escritura.
+        Con persist=False el estado se corrige solo en memoria (requests de solo lectura).
+        """
+        if not self.is_transition_due(now):
+            return False
+        return self.update_status(persist=persist)
+
+    def update_status(self, persist=True):
         """Actualiza el estado si ha cambiado. Usado en vistas y cron jobs."""
         new_status = self.calculate_current_status()
         if new_status != self.subscription_status:
@@ -157,7 +205,8 @@ class Subscription(models.Model):
             if new_status.endswith('_grace') and not self.grace_end_date:
                 self.grace_end_date = self.end_date + timedelta(days=self.plan.grace_period_days)
 
-            self.save(update_fields=['subscription_status', 'grace_end_date', 'updated_at'])
+            if persist:
+                self.save(update_fields=['subscription_status', 'grace_end_date', 'updated_at'])
             return True
         return False
 
@@ -238,8 +287,19 @@ class Subscription(models.Model):
         self.save()
         return {'success': True, 'payment_id': payment.id}
 
-    def get_payment_history(self, limit=10):
-        return self.payments.filter(status='completed').order_by('-created_at')[:limit]
+    def get_payment_history(self, limit=10, cursor=None, query_params=None, param='payments'):
+        """Página de pagos completados (paginación por cursor, más recientes primero)"""
+        from core.pagination import CursorPaginator, InvalidCursor
+
+        paginator = CursorPaginator(
+            self.payments.filter(status='completed'), limit,
+            ordering=('-created_at', '-id'),
+            salt=f'payments:{self.pk}',
+        )
+        try:
+            return paginator.page(cursor, query_params, param)
+        except InvalidCursor:
+            return paginator.page(None, query_params, param)
 
 
 class Payment(models.Model):
@@ -266,6 +326,11 @@ class Payment(models.Model):
         verbose_name = "Pago"
         verbose_name_plural = "Pagos"
         ordering = ['-created_at']
+        # Paginación por cursor: historial por suscripción y listado del admin
+        indexes = [
+            models.Index(fields=['subscription', '-created_at', '-id'], name='payment_sub_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='payment_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.subscription.organization.name} - ${self.amount} ({self.get_status_display()})"
@@ -295,6 +360,9 @@ class UpgradeRequest(models.Model):
         verbose_name = "Solicitud de Upgrade"
         verbose_name_plural = "Solicitudes de Upgrade"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='upgrade_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.organization.name}: {self.current_plan.display_name} -> {self.requested_plan.display_name}"
@@ -331,3 +399,38 @@ class UpgradeRequest(models.Model):
         except Exception as e:
             logger.error(f"Error al aprobar la solicitud de upgrade {self.id}: {str(e)}", exc_info=True)
             return {'success': False, 'error': f'Error interno: {str(e)}'}        
+
+
+class SubscriptionNotification(models.Model):
+    """
+    Registro de recordatorios de vencimiento enviados. Evita repetir el mismo
+    umbral (14/7/3/1 días) para el mismo período de una suscripción.
+    """
+    KIND_CHOICES = [
+        ('expiry', 'Vencimiento de suscripción'),
+        ('grace', 'Fin del período de gracia'),
+    ]
+    
+    subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField("Tipo", max_length=20, choices=KIND_CHOICES)
+    threshold = models.PositiveSmallIntegerField("Umbral (días)")
+    period_end = models.DateTimeField("Fin del período")
+    recipients = models.JSONField("Destinatarios", default=list, blank=True)
+    sent_at = models.DateTimeField("Encolado", auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Recordatorio de suscripción"
+        verbose_name_plural = "Recordatorios de suscripción"
+        ordering = ['-sent_at']
+        indexes = [
+            models.Index(fields=['-sent_at', '-id'], name='notification_sent_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['subscription', 'kind', 'threshold', 'period_end'],
+                name='unique_subscription_notification',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.subscription_id} - {self.get_kind_display()} ({self.threshold} días)"
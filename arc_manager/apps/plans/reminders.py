@@ -0,0 +1,292 @@
+"""
+Recordatorios de vencimiento de suscripciones (pipeline nocturno).
+
+``run_expiry_reminders`` (comando ``send_expiry_reminders``, una vez al día):
+
+1. Una consulta por rango sobre ``end_date`` / ``grace_end_date`` (indexados)
+   trae las suscripciones que vencen dentro del umbral mayor (14 días).
+2. Cada una se asigna al menor umbral cruzado (14/7/3/1) y se descartan las
+   ya notificadas según ``SubscriptionNotification`` (una consulta).
+3. Los administradores de todas las organizaciones se traen en una consulta;
+   cada organización recibe un digest idéntico para todos sus admins, que
+   ``BatchMailer`` agrupa en un solo envío (destinatarios en BCC).
+4. Emails (outbox), registro de enviados y alertas por organización se
+   guardan en la misma transacción. El request solo lee ``OrganizationAlert``
+   desde el snapshot de la organización; no hace aritmética de fechas.
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Subscription, SubscriptionNotification
+
+logger = logging.getLogger(__name__)
+
+# Umbrales de aviso en días, de mayor a menor
+REMINDER_DAYS = tuple(sorted(set(getattr(settings, 'SUBSCRIPTION_REMINDER_DAYS', (14, 7, 3, 1))), reverse=True))
+
+# Vigencia de una alerta: hasta la siguiente corrida nocturna, con margen
+ALERT_TTL = timedelta(hours=getattr(settings, 'SUBSCRIPTION_ALERT_TTL_HOURS', 26))
+
+
+@dataclass
+class ExpiryReminder:
+    """Suscripción que cruzó un umbral, con los datos del aviso"""
+    subscription: Subscription
+    kind: str
+    period_end: object
+    days_remaining: int
+    threshold: int
+    admins: list = field(default_factory=list)
+
+    @property
+    def organization(self):
+        return self.subscription.organization
+
+    @property
+    def level(self):
+        if self.days_remaining <= 3:
+            return 'critical'
+        if self.days_remaining <= 7:
+            return 'warning'
+        return 'info'
+
+    @property
+    def reason(self):
+        return 'grace_ending' if self.kind == 'grace' else 'expires_soon'
+
+    @property
+    def when(self):
+        if self.days_remaining == 0:
+            return 'hoy'
+        if self.days_remaining == 1:
+            return 'mañana'
+        return f'en {self.days_remaining} días'
+
+    @property
+    def message(self):
+        date = timezone.localtime(self.period_end).strftime('%d/%m/%Y')
+        if self.kind == 'grace':
+            return (
+                f'Tu suscripción está en período de gracia y el acceso se suspende el {date} ({self.when}). '
+                'Renueva para no perder el acceso.'
+            )
+        return (
+            f'Tu suscripción al plan {self.subscription.plan.display_name} vence el {date} ({self.when}). '
+            'Renueva pronto para evitar interrupciones.'
+        )
+
+
+@dataclass
+class ReminderRunResult:
+    """Resumen de una corrida del pipeline"""
+    reminders: list = field(default_factory=list)
+    notified: list = field(default_factory=list)
+    already_sent: int = 0
+    without_admins: int = 0
+    emails: int = 0
+    alerts_cleared: int = 0
+    dry_run: bool = False
+
+
+def threshold_for(days_remaining, thresholds=REMINDER_DAYS):
+    """Menor umbral cruzado (p.ej. 5 días -> 7), o None si falta más que el mayor"""
+    crossed = [threshold for threshold in thresholds if days_remaining <= threshold]
+    return min(crossed) if crossed else None
+
+
+def expiring_subscriptions(now=None, max_days=None):
+    """
+    Suscripciones activas o en gracia que vencen dentro de `max_days` días.
+    Una consulta por rango sobre end_date / grace_end_date.
+    """
+    now = now or timezone.now()
+    max_days = REMINDER_DAYS[0] if max_days is None else max_days
+    # Superconjunto de los días de calendario: el último día llega hasta su medianoche
+    window_end = now + timedelta(days=max_days + 1)
+    return (
+        Subscription.objects
+        .select_related('organization', 'plan')
+        .filter(organization__is_active=True)
+        .filter(
+            Q(subscription_status__endswith='_active', end_date__gte=now, end_date__lt=window_end)
+            | Q(subscription_status__endswith='_grace', grace_end_date__gte=now, grace_end_date__lt=window_end)
+        )
+        .order_by('pk')
+    )
+
+
+def collect_reminders(now=None, thresholds=REMINDER_DAYS):
+    """Arma un ExpiryReminder por suscripción que cruzó algún umbral"""
+    now = now or timezone.now()
+    reminders = []
+    for subscription in expiring_subscriptions(now, max(thresholds)):
+        if subscription.is_in_grace_period:
+            kind, period_end = 'grace', subscription.grace_end_date
+        else:
+            kind, period_end = 'expiry', subscription.end_date
+        # Días de calendario (hora local): coincide con la fecha del mensaje
+        days_remaining = max(0, (timezone.localtime(period_end).date() - timezone.localdate(now)).days)
+        threshold = threshold_for(days_remaining, thresholds)
+        if threshold is not None:
+            reminders.append(ExpiryReminder(subscription, kind, period_end, days_remaining, threshold))
+    return reminders
+
+
+def _already_sent(reminders):
+    """Claves (suscripción, tipo, umbral, fin de período) ya registradas. Una consulta"""
+    if not reminders:
+        return set()
+    return set(
+        SubscriptionNotification.objects
+        .filter(subscription_id__in=[reminder.subscription.pk for reminder in reminders])
+        .values_list('subscription_id', 'kind', 'threshold', 'period_end')
+    )
+
+
+def _admins_by_organization(organization_ids):
+    """Admins activos (criterio de Organization.get_admins) agrupados por organización. Una consulta"""
+    from apps.accounts.models import User
+
+    admins = {}
+    queryset = (
+        User.objects
+        .filter(organization_id__in=organization_ids, is_org_admin=True, is_active=True)
+        .exclude(email='')
+        .only('pk', 'email', 'organization_id')
+        .order_by('pk')
+    )
+    for admin in queryset:
+        admins.setdefault(admin.organization_id, []).append(admin)
+    return admins
+
+
+def build_reminder_email(reminder, admin):
+    """
+    Construye (sin enviar) el digest para un admin. El contenido no depende del
+    admin, así BatchMailer envía un solo mensaje por organización.
+    """
+    site_name = getattr(settings, 'SITE_NAME', 'ARC Manager')
+    base_url = getattr(settings, 'SITE_URL', 'http://localhost:8000')
+    context = {
+        'site_name': site_name,
+        'organization': reminder.organization,
+        'subscription': reminder.subscription,
+        'plan': reminder.subscription.plan,
+        'reminder': reminder,
+        'renew_url': f"{base_url}{reverse('plans:subscription_dashboard')}",
+    }
+
+    if reminder.kind == 'grace':
+        subject = f'{site_name}: el período de gracia de {reminder.organization.name} termina {reminder.when}'
+    else:
+        subject = f'{site_name}: la suscripción de {reminder.organization.name} vence {reminder.when}'
+
+    email = EmailMultiAlternatives(
+        subject=subject,
+        body=render_to_string('plans/emails/expiry_reminder.txt', context),
+        from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@localhost'),
+        to=[admin.email],
+    )
+    email.attach_alternative(render_to_string('plans/emails/expiry_reminder.html', context), 'text/html')
+    return email
+
+
+def _save_alerts(reminders, now):
+    """Upsert de las alertas vigentes y limpieza de las que ya no aplican. Retorna las borradas"""
+    from apps.orgs.models import OrganizationAlert
+
+    alerts = [
+        OrganizationAlert(
+            organization_id=reminder.subscription.organization_id,
+            level=reminder.level,
+            reason=reminder.reason,
+            message=reminder.message,
+            days_remaining=reminder.days_remaining,
+            period_end=reminder.period_end,
+            valid_until=now + ALERT_TTL,
+            updated_at=now,
+        )
+        for reminder in reminders
+    ]
+    OrganizationAlert.objects.bulk_create(
+        alerts,
+        update_conflicts=True,
+        unique_fields=['organization'],
+        update_fields=['level', 'reason', 'message', 'days_remaining', 'period_end', 'valid_until', 'updated_at'],
+    )
+
+    current = [alert.organization_id for alert in alerts]
+    stale = list(OrganizationAlert.objects.exclude(organization_id__in=current).values_list('organization_id', flat=True))
+    if stale:
+        OrganizationAlert.objects.filter(organization_id__in=stale).delete()
+    return stale
+
+
+def run_expiry_reminders(now=None, dry_run=False, thresholds=REMINDER_DAYS):
+    """
+    Ejecuta el pipeline completo. Con dry_run solo calcula (no escribe ni
+    encola). Las consultas no dependen del número de suscripciones.
+    """
+    from apps.main.outbox import enqueue_emails
+    from apps.orgs.cache_utils import bump_organization_cache_versions
+
+    now = now or timezone.now()
+    result = ReminderRunResult(dry_run=dry_run)
+    result.reminders = collect_reminders(now, thresholds)
+
+    sent = _already_sent(result.reminders)
+    pending = [
+        reminder for reminder in result.reminders
+        if (reminder.subscription.pk, reminder.kind, reminder.threshold, reminder.period_end) not in sent
+    ]
+    result.already_sent = len(result.reminders) - len(pending)
+
+    admins = _admins_by_organization({reminder.subscription.organization_id for reminder in pending})
+    for reminder in pending:
+        reminder.admins = admins.get(reminder.subscription.organization_id, [])
+        if reminder.admins:
+            result.notified.append(reminder)
+        else:
+            result.without_admins += 1
+            logger.warning(f"Organización {reminder.organization.name} sin administradores para el aviso de vencimiento")
+
+    messages = [build_reminder_email(reminder, admin) for reminder in result.notified for admin in reminder.admins]
+    result.emails = len(messages)
+    if dry_run:
+        return result
+
+    with transaction.atomic():
+        # La restricción única evita duplicados si dos corridas se solapan:
+        # la segunda falla completa y no encola nada
+        SubscriptionNotification.objects.bulk_create([
+            SubscriptionNotification(
+                subscription=reminder.subscription,
+                kind=reminder.kind,
+                threshold=reminder.threshold,
+                period_end=reminder.period_end,
+                recipients=[admin.email for admin in reminder.admins],
+            )
+            for reminder in result.notified
+        ])
+        enqueue_emails(messages, category='subscription_expiry')
+        stale = _save_alerts(result.reminders, now)
+        result.alerts_cleared = len(stale)
+
+        # bulk_create/delete no disparan señales: invalidar los snapshots a mano
+        changed = [reminder.subscription.organization_id for reminder in result.reminders] + stale
+        transaction.on_commit(lambda: bump_organization_cache_versions(changed))
+
+    logger.info(
+        f"Recordatorios de vencimiento: {len(result.notified)} organizaciones avisadas, "
+        f"{result.emails} emails encolados, {result.already_sent} ya enviados"
+    )
+    return result
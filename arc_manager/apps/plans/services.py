@@ -1,7 +1,10 @@
 # apps/plans/services.py - Sistema de Suscripciones MVP Optimizado
+from datetime import timedelta
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import F, Q
 import logging
+import time
 
 from .models import Plan, Subscription, Payment
 
@@ -15,28 +18,25 @@ class SubscriptionService:
     """
     
     @staticmethod
-    def create_trial_subscription(organization):
+    def provision_subscription(organization, plan=None):
         """
-        Crea una suscripción trial automática para nuevas organizaciones.
+        Provisión idempotente de la suscripción de una organización (trial por defecto).
+        Segura ante requests/procesos concurrentes: get_or_create sobre el OneToOne,
+        si otro proceso la creó primero se retorna la existente.
+        Retorna (subscription, created); subscription es None si no hay plan disponible.
         """
-        logger.info(f"Creando suscripción trial para {organization.name}")
+        plan = plan or Plan.get_trial_plan()
+        if not plan:
+            logger.error(f"No hay plan para provisionar la suscripción de {organization.name}.")
+            return None, False
         
-        try:
-            if hasattr(organization, 'subscription'):
-                logger.warning(f"La organización {organization.name} ya tiene una suscripción.")
-                return {'success': False, 'error': 'La organización ya tiene una suscripción.'}
-            
-            trial_plan = Plan.get_trial_plan()
-            if not trial_plan:
-                logger.error("No se encontró un plan de prueba (trial) activo.")
-                return {'success': False, 'error': 'No hay plan trial configurado en el sistema.'}
+        with transaction.atomic():
+            subscription, created = Subscription.objects.get_or_create(
+                organization=organization,
+                defaults={'plan': plan},
+            )
             
-            with transaction.atomic():
-                subscription = Subscription.objects.create(
-                    organization=organization,
-                    plan=trial_plan
-                )
-                
+            if created and plan.name == 'trial':
                 Payment.objects.create(
                     subscription=subscription,
                     amount=0,
@@ -44,9 +44,29 @@ class SubscriptionService:
                     payment_type='trial_to_paid',
                     status='completed',
                     processed_by='system',
-                    description=f'Activación de trial automática - {trial_plan.display_name}',
-                    days_added=trial_plan.trial_days or 30
+                    description=f'Activación de trial automática - {plan.display_name}',
+                    days_added=plan.trial_days or 30
                 )
+        
+        if created:
+            logger.info(f"Suscripción {plan.name} provisionada para {organization.name}")
+        return subscription, created
+    
+    @staticmethod
+    def create_trial_subscription(organization):
+        """
+        Crea una suscripción trial automática para nuevas organizaciones.
+        """
+        logger.info(f"Creando suscripción trial para {organization.name}")
+        
+        try:
+            subscription, created = SubscriptionService.provision_subscription(organization)
+            if not subscription:
+                return {'success': False, 'error': 'No hay plan trial configurado en el sistema.'}
+            
+            if not created:
+                logger.warning(f"La organización {organization.name} ya tiene una suscripción.")
+                return {'success': False, 'error': 'La organización ya tiene una suscripción.'}
             
             logger.info(f"Suscripción trial creada exitosamente para {organization.name}")
             return {'success': True, 'subscription': subscription}
@@ -58,16 +78,223 @@ class SubscriptionService:
     @staticmethod
     def get_subscription_or_create(organization):
         """
-        Obtiene la suscripción de una organización o crea una trial si no existe.
-        Es un método de conveniencia para asegurar que una organización siempre tenga suscripción.
+        Obtiene la suscripción de una organización o provisiona una trial si no existe.
+        ESCRIBE: usar solo en rutas de provisión/reparación, nunca en middlewares o
+        vistas de lectura (la provisión ocurre al crear la organización).
         """
         try:
-            subscription = getattr(organization, 'subscription', None)
-            if not subscription:
-                result = SubscriptionService.create_trial_subscription(organization)
-                return result.get('subscription') if result['success'] else None
+            subscription, _ = SubscriptionService.provision_subscription(organization)
             return subscription
             
         except Exception as e:
             logger.error(f"Error obteniendo o creando suscripción para {organization.name}: {str(e)}", exc_info=True)
-            return None
\ No newline at end of file
+            return None
+
+    # Módulos que siguen disponibles con la suscripción expirada
+    LIMITED_ACCESS_MODULES = ('plans', 'billing')
+
+    @staticmethod
+    def check_access_permissions(subscription, module='general', access_level=None):
+        """
+        Determina si la suscripción permite acceder a un módulo.
+        `access_level` es el nivel que exige la ruta ('full' o 'limited');
+        si no se indica se deduce del módulo.
+        """
+        if access_level is None:
+            access_level = 'limited' if module in SubscriptionService.LIMITED_ACCESS_MODULES else 'full'
+
+        if subscription is None:
+            return {
+                'has_access': access_level == 'limited',
+                'access_level': 'none',
+                'message': 'Tu organización no tiene una suscripción activa. Contacta con soporte.',
+                'redirect_to': 'plans:subscription_dashboard',
+            }
+
+        if subscription.is_active:
+            return {'has_access': True, 'access_level': 'full', 'message': None, 'redirect_to': None}
+
+        if subscription.is_in_grace_period:
+            return {
+                'has_access': True,
+                'access_level': 'grace',
+                'message': 'Tu suscripción está en período de gracia. Renueva para evitar interrupciones.',
+                'redirect_to': None,
+            }
+
+        # Expirada: solo los módulos de acceso limitado (planes, facturación)
+        if access_level == 'limited':
+            return {
+                'has_access': True,
+                'access_level': 'limited',
+                'message': 'Tu suscripción ha expirado. Solo puedes gestionar tu plan.',
+                'redirect_to': None,
+            }
+        return {
+            'has_access': False,
+            'access_level': 'none',
+            'message': 'Tu suscripción ha expirado. Renueva tu plan para continuar.',
+            'redirect_to': 'plans:subscription_dashboard',
+        }
+
+
+class SubscriptionTransitionEngine:
+    """
+    Motor set-based para aplicar las transiciones de estado vencidas
+    (active -> grace -> expired) sin cargar ni guardar fila por fila.
+
+    Recorre las suscripciones vencidas en lotes por keyset (id ascendente) y,
+    por cada lote y plan, ejecuta unos pocos UPDATE ... WHERE, cada lote en su
+    propia transacción para acotar el tiempo que se mantienen los locks.
+    """
+
+    DEFAULT_BATCH_SIZE = 1000
+
+    def __init__(self, now=None, batch_size=DEFAULT_BATCH_SIZE, org_id=None, filter_status=None, dry_run=False):
+        self.now = now or timezone.now()
+        self.batch_size = batch_size
+        self.org_id = org_id
+        self.filter_status = filter_status
+        self.dry_run = dry_run
+
+    def due_subscriptions(self):
+        """Suscripciones con una transición vencida (consulta por índice)"""
+        queryset = Subscription.objects.filter(next_transition_at__lte=self.now).exclude(next_status='')
+        if self.org_id:
+            queryset = queryset.filter(organization_id=self.org_id)
+        if self.filter_status:
+            queryset = queryset.filter(subscription_status=self.filter_status)
+        return queryset
+
+    def _transitions_for_plan(self, plan):
+        """
+        Retorna [(etiqueta_origen, etiqueta_destino, filtro, valores_update)] para un plan.
+        Una suscripción activa cuya gracia también venció pasa directo a expirada.
+        """
+        active = f'{plan.name}_active'
+        grace = f'{plan.name}_grace'
+        expired = f'{plan.name}_expired'
+        expired_values = {
+            'subscription_status': expired,
+            'next_transition_at': None,
+            'next_status': '',
+            'updated_at': self.now,
+        }
+        transitions = []
+
+        if plan.grace_period_days > 0:
+            grace_delta = timedelta(days=plan.grace_period_days)
+            # Activa -> gracia (sin fecha de gracia guardada: se calcula desde end_date)
+            transitions.append((active, grace, {
+                'subscription_status': active,
+                'grace_end_date__isnull': True,
+                'end_date__gt': self.now - grace_delta,
+            }, {
+                'subscription_status': grace,
+                'grace_end_date': F('end_date') + grace_delta,
+                'next_transition_at': F('end_date') + grace_delta,
+                'next_status': expired,
+                'updated_at': self.now,
+            }))
+            # Activa -> gracia (con fecha de gracia ya guardada)
+            transitions.append((active, grace, {
+                'subscription_status': active,
+                'grace_end_date__gt': self.now,
+            }, {
+                'subscription_status': grace,
+                'next_transition_at': F('grace_end_date'),
+                'next_status': expired,
+                'updated_at': self.now,
+            }))
+            # Activa -> expirada (la gracia también venció)
+            transitions.append((active, expired, Q(subscription_status=active) & (
+                Q(grace_end_date__isnull=True, end_date__lte=self.now - grace_delta) |
+                Q(grace_end_date__lte=self.now)
+            ), expired_values))
+        else:
+            transitions.append((active, expired, {'subscription_status': active}, expired_values))
+
+        # Gracia -> expirada
+        transitions.append((grace, expired, {'subscription_status': grace}, expired_values))
+        return transitions
+
+    def run(self, on_batch=None):
+        """
+        Ejecuta el motor y retorna estadísticas.
+        on_batch(batch_number, batch_stats) se invoca tras cada lote (para reportar progreso).
+        """
+        from apps.orgs.cache_utils import bump_organization_cache_versions
+
+        started = time.monotonic()
+        stats = {
+            'processed': 0,
+            'changed': 0,
+            'errors': 0,
+            'expired': 0,
+            'grace_period': 0,
+            'reactivated': 0,
+            'status_changes': {},
+            'batches': 0,
+            'elapsed': 0.0,
+            'rows_per_second': 0.0,
+        }
+        plans = list(Plan.objects.all())
+        last_id = 0
+
+        while True:
+            batch = list(
+                self.due_subscriptions()
+                .filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', 'organization_id')[:self.batch_size]
+            )
+            if not batch:
+                break
+
+            first_id, last_id = batch[0][0], batch[-1][0]
+            batch_stats = {'processed': len(batch), 'changed': 0, 'status_changes': {}}
+
+            try:
+                with transaction.atomic():
+                    for plan in plans:
+                        for from_status, to_status, condition, values in self._transitions_for_plan(plan):
+                            queryset = self.due_subscriptions().filter(
+                                pk__gte=first_id, pk__lte=last_id, plan_id=plan.pk
+                            )
+                            queryset = queryset.filter(condition) if isinstance(condition, Q) else queryset.filter(**condition)
+                            rows = queryset.count() if self.dry_run else queryset.update(**values)
+                            if not rows:
+                                continue
+
+                            change_key = f"{from_status} → {to_status}"
+                            batch_stats['changed'] += rows
+                            batch_stats['status_changes'][change_key] = (
+                                batch_stats['status_changes'].get(change_key, 0) + rows
+                            )
+                            if to_status.endswith('_expired'):
+                                stats['expired'] += rows
+                            elif to_status.endswith('_grace'):
+                                stats['grace_period'] += rows
+            except Exception as e:
+                stats['errors'] += len(batch)
+                logger.error(f"Error aplicando transiciones en el lote {first_id}-{last_id}: {str(e)}", exc_info=True)
+                batch_stats['changed'] = 0
+                batch_stats['status_changes'] = {}
+            else:
+                if not self.dry_run and batch_stats['changed']:
+                    # update() no dispara señales: invalidar los snapshots a mano
+                    bump_organization_cache_versions(org_id for _, org_id in batch)
+
+            stats['batches'] += 1
+            stats['processed'] += batch_stats['processed']
+            stats['changed'] += batch_stats['changed']
+            for change_key, rows in batch_stats['status_changes'].items():
+                stats['status_changes'][change_key] = stats['status_changes'].get(change_key, 0) + rows
+
+            if on_batch:
+                on_batch(stats['batches'], batch_stats)
+
+        stats['elapsed'] = time.monotonic() - started
+        if stats['elapsed'] > 0:
+            stats['rows_per_second'] = stats['processed'] / stats['elapsed']
+        return stats
@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .catalog import invalidate_plan_catalog
+from .models import Plan
+
+
+@receiver([post_save, post_delete], sender=Plan)
+def plan_catalog_changed(sender, instance, **kwargs):
+    # Todos los workers recargan el catálogo en su próxima comprobación
+    transaction.on_commit(invalidate_plan_catalog)
@@ -1,3 +1,132 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.orgs.models import Organization
+
+from . import catalog
+from .models import Plan, Subscription
+from .services import SubscriptionTransitionEngine
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'plan-catalog'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'plan-catalog-sessions'},
+})
+class PlanCatalogTest(TestCase):
+    """Un cambio de Plan llega al catálogo en memoria al confirmarse la transacción"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.basic = Plan.objects.create(name='basic', display_name='Básico', price=299, max_users=10)
+
+    def setUp(self):
+        self.reset_process_catalog()
+        self.addCleanup(self.reset_process_catalog)
+
+    def reset_process_catalog(self):
+        catalog._catalog = None
+        catalog._checked_at = 0.0
+
+    def test_plan_edit_is_visible_after_commit(self):
+        self.assertEqual(catalog.get_plan(self.basic.pk).max_users, 10)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            plan = Plan.objects.get(pk=self.basic.pk)
+            plan.max_users = 25
+            plan.save()
+            # Antes del commit el catálogo sigue con la versión anterior
+            self.assertEqual(catalog.get_plan(self.basic.pk).max_users, 10)
+
+        self.assertEqual(catalog.get_plan(self.basic.pk).max_users, 25)
+        self.assertEqual(catalog.get_plan_by_name('basic').max_users, 25)
+
+    def test_other_workers_reload_on_next_check(self):
+        # El catálogo de "otro worker", cargado antes del cambio
+        stale = catalog.get_catalog()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Plan.objects.create(name='premium', display_name='Premium', price=999, max_users=50)
+
+        catalog._catalog = stale
+        catalog._checked_at = 0.0
+        self.assertEqual([plan.name for plan in catalog.active_plans()], ['basic', 'premium'])
+        self.assertNotEqual(catalog.get_catalog().version, stale.version)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'plan-transitions'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'plan-transitions-sessions'},
+})
+class SubscriptionTransitionTest(TestCase):
+    """Transición precalculada (next_transition_at) y motor set-based active -> grace -> expired"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.trial = Plan.objects.create(name='trial', display_name='Trial', max_users=5, trial_days=30)
+        cls.basic = Plan.objects.create(name='basic', display_name='Básico', price=299, max_users=10, grace_period_days=5)
+
+    def setUp(self):
+        catalog._catalog = None
+        self.now = timezone.now()
+
+    def subscription(self, plan, end_date):
+        organization = Organization.objects.create(name=f'Organización {plan.name}')
+        subscription = Subscription.objects.get(organization=organization)
+        subscription.plan = plan
+        subscription.subscription_status = f'{plan.name}_active'
+        subscription.end_date = end_date
+        subscription.save()
+        return subscription
+
+    def test_save_reschedules_next_transition(self):
+        subscription = self.subscription(self.basic, self.now + timedelta(days=10))
+        self.assertEqual(
+            (subscription.next_transition_at, subscription.next_status),
+            (subscription.end_date, 'basic_grace'),
+        )
+
+        # Una renovación mueve end_date: también con update_fields
+        subscription.end_date = self.now + timedelta(days=40)
+        subscription.save(update_fields=['end_date'])
+        subscription.refresh_from_db()
+        self.assertEqual(subscription.next_transition_at, self.now + timedelta(days=40))
+
+        subscription.subscription_status = 'basic_grace'
+        subscription.save()
+        subscription.refresh_from_db()
+        self.assertEqual(
+            (subscription.next_transition_at, subscription.next_status),
+            (self.now + timedelta(days=45), 'basic_expired'),
+        )
+
+        subscription.subscription_status = 'basic_expired'
+        subscription.save()
+        subscription.refresh_from_db()
+        self.assertEqual((subscription.next_transition_at, subscription.next_status), (None, ''))
+
+    def test_engine_moves_active_to_grace_to_expired(self):
+        end_date = self.now - timedelta(days=1)
+        basic = self.subscription(self.basic, end_date)
+        trial = self.subscription(self.trial, end_date)
+        current = self.subscription(self.basic, self.now + timedelta(days=10))
+
+        stats = SubscriptionTransitionEngine(now=self.now).run()
+
+        self.assertEqual(stats['status_changes'], {'basic_active → basic_grace': 1, 'trial_active → trial_expired': 1})
+        basic.refresh_from_db()
+        self.assertEqual(basic.subscription_status, 'basic_grace')
+        self.assertEqual(basic.grace_end_date, end_date + timedelta(days=5))
+        self.assertEqual((basic.next_transition_at, basic.next_status), (basic.grace_end_date, 'basic_expired'))
+        trial.refresh_from_db()
+        self.assertEqual((trial.subscription_status, trial.next_transition_at), ('trial_expired', None))
+
+        # Vence la gracia: solo esa fila sigue pendiente
+        stats = SubscriptionTransitionEngine(now=self.now + timedelta(days=5)).run()
+
+        self.assertEqual(stats['status_changes'], {'basic_grace → basic_expired': 1})
+        basic.refresh_from_db()
+        self.assertEqual((basic.subscription_status, basic.next_transition_at, basic.next_status), ('basic_expired', None, ''))
+        current.refresh_from_db()
+        self.assertEqual(current.subscription_status, 'basic_active')
@@ -9,7 +9,8 @@ from django.db import transaction
 from django.core.exceptions import PermissionDenied
 import logging
 
-from .models import Plan, Subscription, UpgradeRequest
+from .catalog import attach_plan, get_plan, upgrade_options
+from .models import Subscription, UpgradeRequest
 from apps.orgs.models import Organization
 
 
@@ -46,22 +47,15 @@ class SubscriptionDashboardView(LoginRequiredMixin, TemplateView):
             context['no_organization'] = True
             return context
         
-        # Usar el servicio simplificado para obtener o crear la suscripción
-        subscription = Subscription.objects.filter(organization=organization).first()
+        # Solo lectura: la suscripción se provisiona al crear la organización
+        subscription = attach_plan(Subscription.objects.filter(organization=organization).first())
         if not subscription:
-            trial_plan = Plan.get_trial_plan()
-            if trial_plan:
-                 subscription = Subscription.objects.create(
-                    organization=organization,
-                    plan=trial_plan
-                )
-            else:
-                # Fallback por si no hay plan de prueba
-                context['error'] = "No se pudo inicializar la suscripción. No hay un plan de prueba configurado."
-                return context
+            logging.getLogger(__name__).warning(f"Organización {organization.name} sin suscripción (pendiente de provisión)")
+            context['error'] = "Tu suscripción se está inicializando. Intenta nuevamente en unos minutos o contacta a soporte."
+            return context
 
-        # Actualiza el estado al cargar la página
-        subscription.update_status()
+        # Aplica la transición de estado solo si ya venció
+        subscription.refresh_status_if_due()
 
         context['subscription'] = subscription
         context['organization'] = organization
@@ -74,13 +68,12 @@ class SubscriptionDashboardView(LoginRequiredMixin, TemplateView):
         ).first()
         
         # Pasar los planes disponibles para que la plantilla decida si mostrarlos
-        context['available_plans'] = Plan.objects.filter(
-            is_active=True,
-            price__gt=subscription.plan.price
-        ).order_by('price')
+        context['available_plans'] = upgrade_options(subscription.plan)
 
-        # Pasar el historial de pagos directamente
-        context['payment_history'] = subscription.get_payment_history(limit=5)
+        # Historial de pagos paginado por cursor (?payments=...)
+        context['payment_history'] = subscription.get_payment_history(
+            limit=5, cursor=self.request.GET.get('payments'), query_params=self.request.GET,
+        )
         
         return context
 
@@ -95,7 +88,7 @@ class RequestUpgradeView(LoginRequiredMixin, OrgAdminRequiredMixin, TemplateView
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         organization = self.request.user.organization
-        subscription = get_object_or_404(Subscription, organization=organization)
+        subscription = attach_plan(get_object_or_404(Subscription, organization=organization))
 
         context['subscription'] = subscription
         context['has_pending_request'] = UpgradeRequest.objects.filter(
@@ -104,17 +97,14 @@ class RequestUpgradeView(LoginRequiredMixin, OrgAdminRequiredMixin, TemplateView
         ).exists()
         
         if not context['has_pending_request']:
-            context['available_plans'] = Plan.objects.filter(
-                is_active=True,
-                price__gt=subscription.plan.price
-            ).order_by('price')
+            context['available_plans'] = upgrade_options(subscription.plan)
             
         return context
     
     def post(self, request, *args, **kwargs):
         """Procesa una solicitud de upgrade de forma simple y directa."""
         organization = request.user.organization
-        subscription = get_object_or_404(Subscription, organization=organization)
+        subscription = attach_plan(get_object_or_404(Subscription, organization=organization))
         requested_plan_id = request.POST.get('requested_plan')
         
         # 1. Verificar que no haya una solicitud pendiente
@@ -127,9 +117,8 @@ class RequestUpgradeView(LoginRequiredMixin, OrgAdminRequiredMixin, TemplateView
             messages.error(request, "Debes seleccionar un plan.")
             return redirect('plans:request_upgrade')
             
-        try:
-            requested_plan = Plan.objects.get(id=requested_plan_id, is_active=True)
-        except Plan.DoesNotExist:
+        requested_plan = get_plan(requested_plan_id, active_only=True)
+        if requested_plan is None:
             messages.error(request, "El plan seleccionado no es válido.")
             return redirect('plans:request_upgrade')
             
@@ -1,24 +1,30 @@
 from django.contrib import admin
+
+from core.pagination import ApproximateCountAdminMixin
 from .models import Project, Task, ProjectFile
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(ApproximateCountAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'client', 'owner', 'phase', 'created_at')
     list_filter = ('phase', 'owner', 'created_at')
     search_fields = ('name', 'client', 'owner__username')
     ordering = ('-created_at',)
     readonly_fields = ('created_at',)
+    list_select_related = ('owner',)
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(ApproximateCountAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'project', 'assigned_to', 'completed', 'created_at')
     list_filter = ('completed', 'project__name', 'assigned_to')
     search_fields = ('title', 'project__name')
     ordering = ('-created_at',)
+    # assigned_to es nullable: el select_related automático del admin no lo incluye
+    list_select_related = ('project', 'assigned_to')
 
 @admin.register(ProjectFile)
-class ProjectFileAdmin(admin.ModelAdmin):
+class ProjectFileAdmin(ApproximateCountAdminMixin, admin.ModelAdmin):
     list_display = ('file', 'project', 'upload_phase', 'uploaded_at')
     list_filter = ('upload_phase', 'project__name')
     search_fields = ('file__name',)
+    list_select_related = ('project',)
     ordering = ('-uploaded_at',)
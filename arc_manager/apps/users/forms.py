@@ -1,8 +1,10 @@
 # apps/users/forms.py - Formularios para gestión de usuarios
 from django import forms
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from apps.orgs.models import Organization
-from .utils import generate_random_password, send_new_user_email
+from .utils import generate_random_password, get_login_url, queue_new_user_email
 
 
 User = get_user_model()
@@ -171,21 +173,22 @@ class SimpleUserCreateForm(forms.Form):
         is_superuser = user_role == 'superuser'
         is_staff = is_superuser  # Los superusers también son staff
         
-        user = User.objects.create_user(
-            email=self.cleaned_data['email'],
-            password=password,
-            first_name=self.cleaned_data['first_name'],
-            last_name=self.cleaned_data['last_name'],
-            organization=organization,
-            is_active=self.cleaned_data.get('is_active', True),
-            is_org_admin=is_org_admin,
-            is_superuser=is_superuser,
-            is_staff=is_staff
-        )
+        # Usuario y email de credenciales en la misma transacción (lo entrega send_outbox)
+        with transaction.atomic():
+            user = User.objects.create_user(
+                email=self.cleaned_data['email'],
+                password=password,
+                first_name=self.cleaned_data['first_name'],
+                last_name=self.cleaned_data['last_name'],
+                organization=organization,
+                is_active=self.cleaned_data.get('is_active', True),
+                is_org_admin=is_org_admin,
+                is_superuser=is_superuser,
+                is_staff=is_staff
+            )
+            queue_new_user_email(user, password, get_login_url(request))
         
-        # Enviar credenciales
-        email_sent = send_new_user_email(user, password, request)
-        return user, password, email_sent
+        return user
 
 
 class SimpleUserEditForm(forms.ModelForm):
@@ -253,4 +256,40 @@ class SimpleUserEditForm(forms.ModelForm):
         if commit:
             user.save()
         
-        return user 
\ No newline at end of file
+        return user 
+
+class UserImportForm(forms.Form):
+    """Formulario para importar usuarios en lote desde un archivo CSV o JSONL"""
+    
+    file = forms.FileField(
+        label="Archivo de usuarios",
+        help_text="CSV con encabezados (email, first_name, last_name, role, is_active) o JSONL",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.jsonl,.ndjson,.txt'})
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        label="Solo validar (no crear usuarios)",
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    
+    def __init__(self, *args, **kwargs):
+        from .importers import MAX_ROWS, WEB_MAX_ROWS
+        
+        super().__init__(*args, **kwargs)
+        self.fields['file'].help_text += (
+            f". Hasta {WEB_MAX_ROWS} usuarios por importación (validar admite {MAX_ROWS}); "
+            f"los archivos más grandes los importa soporte"
+        )
+    
+    def clean_file(self):
+        from .importers import UserImportError, detect_format
+        
+        uploaded = self.cleaned_data['file']
+        max_size = getattr(settings, 'USER_IMPORT_MAX_FILE_SIZE', 5 * 1024 * 1024)
+        if uploaded.size > max_size:
+            raise forms.ValidationError(f"El archivo supera el tamaño máximo de {max_size // (1024 * 1024)} MB.")
+        try:
+            self.file_format = detect_format(uploaded.name)
+        except UserImportError as e:
+            raise forms.ValidationError(str(e))
+        return uploaded
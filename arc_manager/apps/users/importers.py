@@ -0,0 +1,493 @@
+"""
+Importación masiva de usuarios (CSV o JSONL) para una organización.
+
+El archivo completo se valida en memoria antes de tocar la base:
+
+- unicidad de emails contra la BD con una sola consulta ``IN`` (y duplicados
+  dentro del archivo con un set);
+- límite de usuarios una sola vez, con la organización bloqueada
+  (``apps.orgs.seats.lock_organization``) en la transacción del alta;
+- usernames únicos generados en memoria (una consulta para descartar choques);
+- hash de contraseñas en un pool de procesos desde ``manage.py import_users``
+  (PBKDF2 domina el costo); la vista hashea en el mismo proceso;
+- ``bulk_create`` por lotes y contadores de la organización en un UPDATE.
+
+Los emails de credenciales se encolan en el outbox en la misma transacción
+(``apps.main.outbox``) y los entrega el worker ``send_outbox``.
+Cada fila queda con su estado y el resultado se exporta como CSV; esos
+archivos (con emails) vencen a las ``USER_IMPORT_RESULT_TTL_HOURS`` y los
+borra ``manage.py clean_import_results``.
+
+Formato (CSV con encabezados o un objeto JSON por línea)::
+
+    email,first_name,last_name,role,is_active
+    ana@empresa.com,Ana,López,admin,true
+"""
+import csv
+import io
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+
+from apps.orgs.cache_utils import bump_organization_cache_version
+from apps.orgs.counters import apply_user_counter_deltas
+from apps.orgs.seats import lock_organization
+from .utils import generate_random_password, queue_new_user_emails
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Máximo de filas por archivo
+MAX_ROWS = getattr(settings, 'USER_IMPORT_MAX_ROWS', 5000)
+
+# Máximo de filas al CREAR desde la web: el hash de contraseñas (~0.5 s cada una)
+# corre dentro del request y debe terminar antes del timeout de gunicorn.
+# Los archivos más grandes se importan con `manage.py import_users`
+WEB_MAX_ROWS = getattr(settings, 'USER_IMPORT_WEB_MAX_ROWS', 100)
+
+# Horas que se puede descargar el CSV de resultado (luego lo borra clean_import_results)
+RESULT_FILE_TTL_HOURS = getattr(settings, 'USER_IMPORT_RESULT_TTL_HOURS', 24)
+
+# Tamaño de lote de bulk_create
+CHUNK_SIZE = getattr(settings, 'USER_IMPORT_CHUNK_SIZE', 500)
+
+# Procesos para hashear contraseñas en el comando import_users (0/1 = en el mismo proceso)
+HASH_WORKERS = getattr(settings, 'USER_IMPORT_HASH_WORKERS', min(4, os.cpu_count() or 1))
+
+# Por debajo de esta cantidad no vale la pena levantar procesos
+HASH_POOL_MIN_ROWS = 20
+
+# Encabezados aceptados -> campo
+COLUMN_ALIASES = {
+    'email': 'email',
+    'correo': 'email',
+    'first_name': 'first_name',
+    'nombre': 'first_name',
+    'last_name': 'last_name',
+    'apellido': 'last_name',
+    'role': 'role',
+    'rol': 'role',
+    'is_active': 'is_active',
+    'activo': 'is_active',
+}
+
+ROLES = ('user', 'admin')
+
+TRUE_VALUES = ('1', 'true', 'si', 'sí', 'yes', 'y')
+FALSE_VALUES = ('0', 'false', 'no', 'n')
+
+STATUS_CREATED = 'creado'
+STATUS_ERROR = 'error'
+STATUS_VALID = 'valido'
+
+
+class UserImportError(Exception):
+    """Error que invalida el archivo completo (formato, tamaño, organización)"""
+
+
+class ImportRow:
+    """Fila del archivo con sus datos normalizados y su resultado"""
+
+    def __init__(self, line, data):
+        self.line = line
+        self.data = data
+        self.errors = []
+        self.user = None
+        self.password = None
+
+    @property
+    def email(self):
+        return self.data.get('email', '')
+
+    @property
+    def is_valid(self):
+        return not self.errors
+
+    @property
+    def status(self):
+        if self.errors:
+            return STATUS_ERROR
+        return STATUS_CREATED if self.user is not None and self.user.pk else STATUS_VALID
+
+    def add_error(self, message):
+        self.errors.append(message)
+
+
+class UserImportResult:
+    """Resultado de una importación: filas con su estado y archivo descargable"""
+
+    def __init__(self, rows, dry_run=False):
+        self.rows = rows
+        self.dry_run = dry_run
+        self.result_file = None
+
+    @property
+    def total(self):
+        return len(self.rows)
+
+    @property
+    def created_count(self):
+        return sum(1 for row in self.rows if row.status == STATUS_CREATED)
+
+    @property
+    def valid_count(self):
+        return sum(1 for row in self.rows if row.is_valid)
+
+    @property
+    def error_count(self):
+        return sum(1 for row in self.rows if not row.is_valid)
+
+    @property
+    def error_rows(self):
+        return [row for row in self.rows if not row.is_valid]
+
+    def as_csv(self):
+        """Resultado por fila: linea, email, estado, detalle"""
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['linea', 'email', 'estado', 'detalle'])
+        for row in self.rows:
+            detail = '; '.join(row.errors) if row.errors else (row.user.username if row.user else '')
+            writer.writerow([row.line, row.email, row.status, detail])
+        return output.getvalue()
+
+
+# =============================================================================
+# Lectura del archivo
+# =============================================================================
+
+def _read_text(source):
+    """Acepta str, bytes o un archivo (UploadedFile incluido)"""
+    if hasattr(source, 'read'):
+        source = source.read()
+    if isinstance(source, bytes):
+        try:
+            source = source.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise UserImportError("El archivo debe estar codificado en UTF-8")
+    return source
+
+
+def detect_format(filename):
+    """csv o jsonl según la extensión"""
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    if extension in ('.csv', '.txt', ''):
+        return 'csv'
+    raise UserImportError(f"Formato no soportado: {extension} (usa .csv o .jsonl)")
+
+
+def _normalize_record(record):
+    data = {}
+    for key, value in record.items():
+        field = COLUMN_ALIASES.get(str(key or '').strip().lower())
+        if field:
+            data[field] = value.strip() if isinstance(value, str) else value
+    return data
+
+
+def parse_rows(source, file_format='csv', max_rows=MAX_ROWS):
+    """Convierte el archivo en una lista de ImportRow (línea 1 = encabezado en CSV)"""
+    text = _read_text(source)
+    rows = []
+
+    if file_format == 'jsonl':
+        for line_number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            row = ImportRow(line_number, {})
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("se esperaba un objeto")
+                row.data = _normalize_record(record)
+            except ValueError as e:
+                row.add_error(f"JSON inválido: {e}")
+            rows.append(row)
+    else:
+        reader = csv.DictReader(io.StringIO(text))
+        if not reader.fieldnames or 'email' not in [COLUMN_ALIASES.get(h.strip().lower()) for h in reader.fieldnames if h]:
+            raise UserImportError("El CSV debe tener encabezados e incluir la columna 'email'")
+        for record in reader:
+            if not any((value or '').strip() for value in record.values() if isinstance(value, str)):
+                continue
+            rows.append(ImportRow(reader.line_num, _normalize_record(record)))
+
+    if not rows:
+        raise UserImportError("El archivo no contiene usuarios")
+    if len(rows) > max_rows:
+        raise UserImportError(f"El archivo tiene {len(rows)} filas; el máximo es {max_rows}")
+    return rows
+
+
+# =============================================================================
+# Hash de contraseñas
+# =============================================================================
+
+def _init_hash_worker(settings_module):
+    # Con spawn/forkserver el proceso hijo arranca sin Django configurado
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _hash_password(password):
+    return make_password(password)
+
+
+def hash_passwords(passwords, workers=1):
+    """Hashea las contraseñas (en orden); con `workers` > 1, en un pool de procesos"""
+    if workers <= 1 or len(passwords) < HASH_POOL_MIN_ROWS:
+        return [make_password(password) for password in passwords]
+
+    settings_module = os.environ.get('DJANGO_SETTINGS_MODULE', 'core.settings')
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_hash_worker, initargs=(settings_module,)) as pool:
+        return list(pool.map(_hash_password, passwords, chunksize=chunksize))
+
+
+# =============================================================================
+# Importador
+# =============================================================================
+
+class UserImporter:
+    """Valida e importa un archivo de usuarios en una organización"""
+
+    def __init__(self, organization, created_by=None, send_emails=True,
+                 chunk_size=None, hash_workers=1, login_url=None):
+        if organization is None:
+            raise UserImportError("La importación requiere una organización")
+        self.organization = organization
+        self.created_by = created_by
+        self.send_emails = send_emails
+        self.chunk_size = chunk_size or CHUNK_SIZE
+        self.hash_workers = hash_workers
+        self.login_url = login_url
+
+    def run(self, source, file_format='csv', dry_run=False, max_rows=MAX_ROWS):
+        rows = parse_rows(source, file_format, max_rows=max_rows)
+        self.validate(rows)
+
+        if not dry_run:
+            self.create_users([row for row in rows if row.is_valid])
+
+        result = UserImportResult(rows, dry_run=dry_run)
+        logger.info(
+            f"Importación de usuarios en {self.organization.name}"
+            f"{' (simulación)' if dry_run else ''}: {result.created_count} creados, "
+            f"{result.error_count} con errores de {result.total} filas"
+            f"{f' por {self.created_by.email}' if self.created_by else ''}"
+        )
+        return result
+
+    # -- Validación -----------------------------------------------------------
+
+    def validate(self, rows):
+        seen = set()
+        for row in rows:
+            if row.errors:
+                continue
+            self._validate_row(row)
+            email = row.email.lower()
+            if email:
+                if email in seen:
+                    row.add_error("Email duplicado en el archivo")
+                seen.add(email)
+
+        # Unicidad contra la BD: una sola consulta
+        candidates = {row.email.lower(): row for row in rows if row.is_valid}
+        if candidates:
+            existing = User.objects.filter(email__in=[row.email for row in candidates.values()]).values_list('email', flat=True)
+            for email in existing:
+                row = candidates.get(email.lower())
+                if row is not None:
+                    row.add_error("Este correo ya está registrado")
+
+        self._check_seats(rows, self.organization)
+        return rows
+
+    def _validate_row(self, row):
+        data = row.data
+        data['email'] = User.objects.normalize_email(data.get('email') or '')
+        try:
+            validate_email(data['email'])
+        except ValidationError:
+            row.add_error("Email inválido" if data['email'] else "Email requerido")
+
+        for field, label in (('first_name', 'Nombre'), ('last_name', 'Apellido')):
+            value = data.get(field) or ''
+            if not value:
+                row.add_error(f"{label} requerido")
+            elif len(value) > 150:
+                row.add_error(f"{label} demasiado largo (máx. 150)")
+
+        role = (data.get('role') or 'user').lower()
+        if role not in ROLES:
+            row.add_error(f"Rol inválido '{role}' (usa: {', '.join(ROLES)})")
+        data['role'] = role
+
+        is_active = data.get('is_active')
+        if is_active in (None, ''):
+            data['is_active'] = True
+        elif isinstance(is_active, bool):
+            data['is_active'] = is_active
+        elif str(is_active).lower() in TRUE_VALUES:
+            data['is_active'] = True
+        elif str(is_active).lower() in FALSE_VALUES:
+            data['is_active'] = False
+        else:
+            row.add_error(f"Valor inválido para is_active: '{is_active}'")
+
+    def _check_seats(self, rows, organization):
+        """Marca como error las filas que exceden los asientos disponibles"""
+        check = organization.can_create_user_with_subscription()
+        if check['subscription_required']:
+            for row in rows:
+                if row.is_valid:
+                    row.add_error(check['reason'])
+            return
+
+        # Los usuarios inactivos también ocupan asiento (el límite es sobre el total)
+        available = max(0, check['limit'] - check['current_count'])
+        for row in rows:
+            if not row.is_valid:
+                continue
+            if available > 0:
+                available -= 1
+            else:
+                row.add_error(f"Límite de usuarios alcanzado ({check['limit']})")
+
+    # -- Alta -----------------------------------------------------------------
+
+    def _generate_usernames(self, rows):
+        """Usernames únicos en memoria, como User.save pero sin una consulta por usuario"""
+        def candidate(email):
+            return f"{email.split('@')[0]}_{uuid4().hex[:4]}"
+
+        pending = {row: candidate(row.email) for row in rows}
+        while pending:
+            taken = set(User.objects.filter(username__in=list(pending.values())).values_list('username', flat=True))
+            used = set()
+            retry = {}
+            for row, username in pending.items():
+                if username in taken or username in used:
+                    retry[row] = candidate(row.email)
+                else:
+                    used.add(username)
+                    row.data['username'] = username
+            pending = retry
+
+    def create_users(self, rows):
+        if not rows:
+            return []
+
+        self._generate_usernames(rows)
+        for row in rows:
+            row.password = generate_random_password()
+        hashed = hash_passwords([row.password for row in rows], workers=self.hash_workers)
+        for row, password_hash in zip(rows, hashed):
+            row.data['password_hash'] = password_hash
+
+        now = timezone.now()
+        organization = self.organization
+        with transaction.atomic():
+            # Revalidar los asientos con la organización bloqueada (otras altas concurrentes)
+            locked = lock_organization(organization.pk)
+            self._check_seats(rows, locked)
+            rows = [row for row in rows if row.is_valid]
+
+            users = [
+                User(
+                    email=row.email,
+                    username=row.data['username'],
+                    password=row.data['password_hash'],
+                    first_name=row.data['first_name'],
+                    last_name=row.data['last_name'],
+                    organization_id=organization.pk,
+                    is_active=row.data['is_active'],
+                    is_org_admin=row.data['role'] == 'admin',
+                    date_joined=now,
+                )
+                for row in rows
+            ]
+            for user in users:
+                # bulk_create no pasa por User.save
+                user.search_text = user.get_search_text()
+            User.objects.bulk_create(users, batch_size=self.chunk_size)
+            for row, user in zip(rows, users):
+                user.organization = locked
+                row.user = user
+
+            # bulk_create no pasa por User.save: contadores en un UPDATE
+            apply_user_counter_deltas(
+                [(None, (organization.pk, user.is_active, user.is_org_admin)) for user in users],
+                organizations=[organization],
+            )
+            transaction.on_commit(lambda: bump_organization_cache_version(organization.pk))
+
+            if self.send_emails:
+                queue_new_user_emails([(row.user, row.password) for row in rows], self.login_url)
+
+        return users
+
+
+def save_result_file(result, organization):
+    """Guarda el CSV de resultado en el storage y retorna su token de descarga"""
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import default_storage
+
+    token = uuid4().hex
+    default_storage.save(result_file_path(organization.pk, token), ContentFile(result.as_csv().encode('utf-8')))
+    result.result_file = token
+    return token
+
+
+RESULT_FILES_DIR = 'user_imports'
+
+
+def result_file_path(organization_id, token):
+    return f"{RESULT_FILES_DIR}/{organization_id}/{token}.csv"
+
+
+def result_file_expired(path, now=None):
+    """True si el CSV de resultado ya venció (o el storage no informa su fecha)"""
+    from django.core.files.storage import default_storage
+
+    try:
+        modified = default_storage.get_modified_time(path)
+    except NotImplementedError:
+        return False
+    now = now or timezone.now()
+    return modified < now - timedelta(hours=RESULT_FILE_TTL_HOURS)
+
+
+def delete_expired_result_files(now=None):
+    """Borra los CSV de resultado vencidos. Retorna la cantidad borrada"""
+    from django.core.files.storage import default_storage
+
+    if not default_storage.exists(RESULT_FILES_DIR):
+        return 0
+
+    deleted = 0
+    organization_dirs, _ = default_storage.listdir(RESULT_FILES_DIR)
+    for organization_dir in organization_dirs:
+        _, files = default_storage.listdir(f"{RESULT_FILES_DIR}/{organization_dir}")
+        for name in files:
+            path = f"{RESULT_FILES_DIR}/{organization_dir}/{name}"
+            if result_file_expired(path, now):
+                default_storage.delete(path)
+                deleted += 1
+    return deleted
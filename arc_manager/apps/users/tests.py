@@ -1,3 +1,79 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.orgs.models import Organization
+from apps.plans.models import Plan
+from core.cache import tiered_cache
+from core.pagination import CursorPaginator
+
+User = get_user_model()
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'user-cursor'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'user-cursor-sessions'},
+})
+class UserListCursorPaginationTest(TestCase):
+    """El listado de usuarios se recorre por cursor sin saltear ni repetir filas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Plan.objects.create(name='trial', display_name='Trial', max_users=50, trial_days=30)
+        cls.organization = Organization.objects.create(name='Acme')
+        cls.admin = User.objects.create_user(
+            email='admin@acme.com', password='x', first_name='A', last_name='B',
+            organization=cls.organization, is_org_admin=True,
+        )
+        joined = timezone.now() - timedelta(days=1)
+        for i in range(34):
+            # De a pares con la misma fecha: el desempate es el id
+            User.objects.create(
+                email=f'usuario{i}@acme.com', password='!', first_name='U', last_name=str(i),
+                organization=cls.organization, date_joined=joined - timedelta(minutes=i // 2),
+            )
+
+    def setUp(self):
+        tiered_cache.clear_local()
+        self.client.force_login(self.admin)
+        self.url = reverse('users:user_list')
+
+    def expected_ids(self):
+        return list(
+            User.objects.filter(organization=self.organization, is_superuser=False)
+            .order_by('-date_joined', '-id').values_list('pk', flat=True)
+        )
+
+    def test_next_and_previous_cursors_round_trip(self):
+        pages = []
+        url = self.url
+        while url:
+            response = self.client.get(self.url + url if url.startswith('?') else url)
+            self.assertEqual(response.status_code, 200)
+            page = response.context['page_obj']
+            pages.append((url, [user.pk for user in page]))
+            url = page.next_url
+
+        self.assertEqual([len(ids) for _, ids in pages], [15, 15, 5])
+        self.assertEqual([pk for _, ids in pages for pk in ids], self.expected_ids())
+
+        # Desde la última página, "anterior" devuelve exactamente la página previa
+        response = self.client.get(self.url + pages[-1][0])
+        previous = self.client.get(self.url + response.context['page_obj'].previous_url)
+        self.assertEqual([user.pk for user in previous.context['page_obj']], pages[1][1])
+
+    def test_tampered_cursor_returns_404(self):
+        response = self.client.get(self.url)
+        cursor = response.context['page_obj'].next_cursor
+
+        tampered = cursor[:-2] + ('AA' if not cursor.endswith('AA') else 'BB')
+        self.assertEqual(self.client.get(self.url, {'cursor': tampered}).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'cursor': 'no-es-un-cursor'}).status_code, 404)
+
+        # Un cursor válido de otro listado (otro salt) tampoco sirve
+        other = CursorPaginator(User.objects.all(), 15, ordering=('-date_joined', '-id'), salt='otro')
+        foreign = other.encode_cursor(User.objects.get(pk=self.expected_ids()[14]), 'next')
+        self.assertEqual(self.client.get(self.url, {'cursor': foreign}).status_code, 404)
@@ -1,5 +1,8 @@
 from django.urls import path
-from .views import UserListView, SimpleUserCreateView, UserEditView, UserDetailView, UserDeleteAjaxView
+from .views import (
+    UserListView, SimpleUserCreateView, UserEditView, UserDetailView, UserDeleteAjaxView,
+    UserImportView, UserImportResultView, UserSearchView,
+)
 
 app_name = 'users'
 
@@ -7,6 +10,9 @@ urlpatterns = [
     # URLs principales de usuarios
     path('', UserListView.as_view(), name='user_list'),
     path('create/', SimpleUserCreateView.as_view(), name='create'),
+    path('search/', UserSearchView.as_view(), name='search'),
+    path('import/', UserImportView.as_view(), name='import'),
+    path('import/<slug:token>/result.csv', UserImportResultView.as_view(), name='import_result'),
     path('<int:pk>/', UserDetailView.as_view(), name='detail'),
     path('<int:pk>/edit/', UserEditView.as_view(), name='edit'),
 
@@ -37,40 +37,38 @@ def generate_random_password(length=12):
     # Convertir la lista a string
     return ''.join(password)
 
-def send_new_user_email(user, password, request=None):
+def get_login_url(request=None):
+    """URL absoluta de login (desde el request o SITE_URL)"""
+    if request:
+        return request.build_absolute_uri('/accounts/login/')
+    base_url = getattr(settings, 'SITE_URL', 'http://localhost:8000')
+    return f"{base_url}/accounts/login/"
+
+def build_new_user_email(user, password, login_url):
     """
-    Envía un email al nuevo usuario con sus credenciales de acceso.
-    Retorna True si el email se envió correctamente, False en caso contrario.
+    Construye (sin enviar) el email de bienvenida con las credenciales del usuario.
     """
-    try:
-        # Obtener el site_name de manera segura
-        site_name = getattr(settings, 'SITE_NAME', 'ARC Manager')
-        
-        # Construir la URL de login
-        if request:
-            login_url = request.build_absolute_uri('/accounts/login/')
-        else:
-            base_url = getattr(settings, 'SITE_URL', 'http://localhost:8000')
-            login_url = f"{base_url}/accounts/login/"
-        
-        # Preparar el contexto para el template
-        context = {
-            'user': user,
-            'password': password,
-            'site_name': site_name,
-            'login_url': login_url
-        }
-        
-        # Renderizar los templates HTML y texto plano
-        html_message = render_to_string('users/emails/new_user_credentials.html', context)
-        
-        # Determinar el nombre para mostrar
-        display_name = f"{user.first_name} {user.last_name}".strip()
-        if not display_name:
-            display_name = user.username or user.email
-        
-        # Crear también una versión en texto plano para compatibilidad
-        text_message = f"""
+    # Obtener el site_name de manera segura
+    site_name = getattr(settings, 'SITE_NAME', 'ARC Manager')
+    
+    # Preparar el contexto para el template
+    context = {
+        'user': user,
+        'password': password,
+        'site_name': site_name,
+        'login_url': login_url
+    }
+    
+    # Renderizar los templates HTML y texto plano
+    html_message = render_to_string('users/emails/new_user_credentials.html', context)
+    
+    # Determinar el nombre para mostrar
+    display_name = f"{user.first_name} {user.last_name}".strip()
+    if not display_name:
+        display_name = user.username or user.email
+    
+    # Crear también una versión en texto plano para compatibilidad
+    text_message = f"""
 ¡Bienvenido a {site_name}!
 
 Hola {display_name},
@@ -100,20 +98,28 @@ Este mensaje fue generado automáticamente, por favor no respondas a este email.
 
 {site_name} - Sistema de Gestión
         """
-        
-        # Crear email con contenido HTML y texto plano
-        subject = f'Bienvenido a {site_name} - Tus credenciales de acceso'
-        from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@localhost')
-        to_emails = [user.email]
-        
-        # Usar EmailMultiAlternatives para enviar tanto HTML como texto plano
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=text_message,
-            from_email=from_email,
-            to=to_emails
-        )
-        email.attach_alternative(html_message, "text/html")
+    
+    # Crear email con contenido HTML y texto plano
+    subject = f'Bienvenido a {site_name} - Tus credenciales de acceso'
+    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@localhost')
+    
+    # Usar EmailMultiAlternatives para enviar tanto HTML como texto plano
+    email = EmailMultiAlternatives(
+        subject=subject,
+        body=text_message,
+        from_email=from_email,
+        to=[user.email]
+    )
+    email.attach_alternative(html_message, "text/html")
+    return email
+
+def send_new_user_email(user, password, request=None):
+    """
+    Envía un email al nuevo usuario con sus credenciales de acceso.
+    Retorna True si el email se envió correctamente, False en caso contrario.
+    """
+    try:
+        email = build_new_user_email(user, password, get_login_url(request))
         email.send()
         
         logger.info(f"Email de credenciales enviado a {user.email}")
@@ -121,4 +127,22 @@ Este mensaje fue generado automáticamente, por favor no respondas a este email.
         
     except Exception as e:
         logger.error(f"Error enviando email a {user.email}: {str(e)}")
-        return False 
\ No newline at end of file
+        return False
+
+def queue_new_user_email(user, password, login_url=None):
+    """
+    Encola el email de credenciales en el outbox (se entrega con send_outbox).
+    Llamar dentro de la transacción que crea al usuario.
+    """
+    from apps.main.outbox import enqueue_email
+    
+    email = build_new_user_email(user, password, login_url or get_login_url())
+    return enqueue_email(email, category='new_user_credentials', sensitive=True)
+
+def queue_new_user_emails(credentials, login_url=None):
+    """Encola los emails de credenciales de varios usuarios [(user, password), ...]"""
+    from apps.main.outbox import enqueue_emails
+    
+    login_url = login_url or get_login_url()
+    messages = [build_new_user_email(user, password, login_url) for user, password in credentials]
+    return enqueue_emails(messages, category='new_user_credentials', sensitive=True)
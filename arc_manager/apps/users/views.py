@@ -1,27 +1,47 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, View
 from django.contrib import messages
 from django.core.exceptions import PermissionDenied
 from django.contrib.auth import get_user_model
-from django.db.models import Q
-from django.http import JsonResponse
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 import logging
 from django.conf import settings
 
-from .forms import SimpleUserCreateForm, SimpleUserEditForm
+from apps.orgs.ratelimit import rate_limit
+from apps.orgs.context import get_request_tenant
+from apps.orgs.identity import get_identity_map
+from core.pagination import CursorPaginationMixin
+from core.search import search_queryset
+from apps.orgs.seats import SeatLimitExceeded
+
+from .forms import SimpleUserCreateForm, SimpleUserEditForm, UserImportForm
+from .importers import (
+    MAX_ROWS, RESULT_FILE_TTL_HOURS, WEB_MAX_ROWS, UserImporter, UserImportError,
+    result_file_expired, result_file_path, save_result_file,
+)
+from .utils import get_login_url
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
-class UserListView(LoginRequiredMixin, ListView):
+class UserListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     """Vista para listar usuarios - Solo para org_admin"""
     model = User
     template_name = 'users/user_list.html'
     context_object_name = 'users'
     paginate_by = 15
+    # Paginación por cursor (sin COUNT ni OFFSET), más recientes primero
+    cursor_ordering = ('-date_joined', '-id')
+    
+    def get_cursor_total(self):
+        # Sin búsqueda el total es el contador desnormalizado; con búsqueda no se cuenta
+        if self.request.GET.get('search'):
+            return None
+        return get_request_tenant(self.request).user_count
     
     def get_queryset(self):
         user = self.request.user
@@ -36,36 +56,26 @@ class UserListView(LoginRequiredMixin, ListView):
             is_superuser=False  # Excluir superusers de la vista
         ).select_related('organization')
         
-        # Filtro de búsqueda
+        # Filtro de búsqueda (columna normalizada con índice trigram/FTS5)
         search = self.request.GET.get('search', '')
         if search:
-            queryset = queryset.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(email__icontains=search) |
-                Q(username__icontains=search)
-            )
+            queryset = search_queryset(queryset, search)
         
-        return queryset.order_by('-date_joined')
+        return queryset.order_by(*self.cursor_ordering)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         
-        # Calcular solo las métricas esenciales basadas en la organización del usuario
-        org_users = User.objects.filter(
-            organization=user.organization,
-            is_superuser=False  # Excluir superusers para consistencia
-        )
-        
-        # Métricas mejoradas
-        total_users = org_users.count()
-        active_users = org_users.filter(is_active=True).count()
+        # Métricas desde los contadores desnormalizados de la organización (sin COUNT)
+        tenant = get_request_tenant(self.request)
+        total_users = tenant.user_count
+        active_users = tenant.active_user_count
         inactive_users = total_users - active_users
         percentage_active = round((active_users / total_users * 100) if total_users > 0 else 0)
         
         # Obtener límites de la organización
-        max_users = user.organization.get_max_users() if user.organization else 0
+        max_users = user.organization.get_max_users(context=tenant) if user.organization else 0
         remaining_slots = max(0, max_users - total_users) if max_users > 0 else 0
         
         context['total_users'] = total_users
@@ -80,6 +90,31 @@ class UserListView(LoginRequiredMixin, ListView):
         
         return context
 
+@method_decorator(rate_limit('user_search'), name='get')
+class UserSearchView(LoginRequiredMixin, View):
+    """Búsqueda por prefijo para autocompletar (JSON), limitada a la organización"""
+    
+    max_results = 10
+    
+    def get(self, request):
+        user = request.user
+        if not user.is_org_admin or not user.organization_id:
+            raise PermissionDenied("No tienes permisos para ver usuarios")
+        
+        query = request.GET.get('q', '').strip()
+        if not query:
+            return JsonResponse({'success': True, 'results': []})
+        
+        queryset = User.objects.filter(organization_id=user.organization_id, is_superuser=False)
+        users = (
+            search_queryset(queryset, query, prefix=True)
+            .order_by('first_name', 'last_name')
+            .values('id', 'first_name', 'last_name', 'email', 'is_active')[:self.max_results]
+        )
+        return JsonResponse({'success': True, 'results': list(users)})
+
+
+@method_decorator(rate_limit('user_create'), name='dispatch')
 class SimpleUserCreateView(LoginRequiredMixin, View):
     """Vista para crear usuarios - Solo para org_admin"""
     template_name = 'users/simple_create_user.html'
@@ -108,31 +143,25 @@ class SimpleUserCreateView(LoginRequiredMixin, View):
         
         if form.is_valid():
             try:
-                user, temp_password, email_sent = form.save(request)
+                user = form.save(request)
                 
                 # Log solo el resultado importante
                 logger.info(f"Usuario creado: {user.email} por {request.user.email}")
                 
-                if email_sent:
-                    messages.success(
-                        request,
-                        f'Usuario {user.username or user.email} creado exitosamente. '
-                        f'Se han enviado las credenciales por correo electrónico.'
-                    )
-                else:
-                    # Siempre mostrar mensaje amigable, errores técnicos solo en logs
-                    messages.warning(
-                        request,
-                        f'Usuario {user.username or user.email} creado exitosamente, '
-                        f'pero no se pudo enviar el correo electrónico. '
-                        f'Por favor, proporciona las credenciales manualmente: {user.email}'
-                    )
-                    
-                    # Log detallado para desarrolladores (incluir contraseña temporal)
-                    logger.warning(f"Error enviando email a usuario creado: {user.email} - Contraseña temporal: {temp_password}")
+                # El email de credenciales queda encolado en el outbox (lo entrega send_outbox)
+                messages.success(
+                    request,
+                    f'Usuario {user.username or user.email} creado exitosamente. '
+                    f'Las credenciales se enviarán por correo electrónico.'
+                )
                 
                 return redirect('users:user_list')
                 
+            except SeatLimitExceeded as e:
+                # Otra alta concurrente ocupó el último asiento después de validar el formulario
+                logger.warning(f"Límite de usuarios alcanzado al guardar en {e.organization.name}: {e.reason}")
+                messages.error(request, f"No se pudo crear el usuario: {e.reason}.")
+                
             except Exception as e:
                 # Log detallado del error para desarrolladores
                 logger.error(f"Error al crear usuario: {str(e)}", exc_info=True)
@@ -149,12 +178,87 @@ class SimpleUserCreateView(LoginRequiredMixin, View):
     
 
 
+@method_decorator(rate_limit('user_import'), name='post')
+class UserImportView(LoginRequiredMixin, View):
+    """Importación masiva de usuarios desde CSV/JSONL - Solo para org_admin"""
+    template_name = 'users/user_import.html'
+    
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_org_admin or not request.user.organization:
+            logger.warning(f"Acceso denegado para importar usuarios: {request.user.email}")
+            raise PermissionDenied("No tienes permisos para importar usuarios")
+        
+        return super().dispatch(request, *args, **kwargs)
+    
+    def get(self, request):
+        return render(request, self.template_name, {'form': UserImportForm()})
+    
+    def post(self, request):
+        form = UserImportForm(request.POST, request.FILES)
+        context = {'form': form}
+        
+        if form.is_valid():
+            organization = request.user.organization
+            # Hash en el mismo proceso: el pool de procesos es solo del comando import_users
+            importer = UserImporter(
+                organization,
+                created_by=request.user,
+                login_url=get_login_url(request),
+            )
+            dry_run = form.cleaned_data['dry_run']
+            try:
+                # Validar no hashea contraseñas: admite el archivo completo
+                result = importer.run(
+                    form.cleaned_data['file'],
+                    file_format=form.file_format,
+                    dry_run=dry_run,
+                    max_rows=MAX_ROWS if dry_run else WEB_MAX_ROWS,
+                )
+            except UserImportError as e:
+                form.add_error('file', str(e))
+            else:
+                save_result_file(result, organization)
+                context['result'] = result
+                context['result_ttl_hours'] = RESULT_FILE_TTL_HOURS
+                
+                if result.dry_run:
+                    messages.info(request, f"Validación completa: {result.valid_count} filas válidas, {result.error_count} con errores.")
+                elif result.created_count:
+                    messages.success(
+                        request,
+                        f"{result.created_count} usuarios creados. Las credenciales se enviarán por correo electrónico."
+                    )
+                if result.error_count:
+                    messages.warning(request, f"{result.error_count} filas no se importaron. Descarga el resultado para ver el detalle.")
+        
+        return render(request, self.template_name, context)
+
+
+class UserImportResultView(LoginRequiredMixin, View):
+    """Descarga del CSV de resultado de una importación de la propia organización"""
+    
+    def get(self, request, token):
+        if not request.user.is_org_admin or not request.user.organization:
+            raise PermissionDenied("No tienes permisos para ver importaciones")
+        
+        path = result_file_path(request.user.organization.pk, token)
+        if not default_storage.exists(path) or result_file_expired(path):
+            raise Http404("Resultado de importación no encontrado")
+        
+        return FileResponse(
+            default_storage.open(path, 'rb'),
+            as_attachment=True,
+            filename=f"importacion_usuarios_{token[:8]}.csv",
+            content_type='text/csv',
+        )
+
+
 class UserEditView(LoginRequiredMixin, View):
     """Vista para editar usuarios"""
     template_name = 'users/user_edit.html'
     
     def dispatch(self, request, *args, **kwargs):
-        user_to_edit = get_object_or_404(User, pk=kwargs['pk'])
+        user_to_edit = get_identity_map(request).get_or_404(User, kwargs['pk'])
         current_user = request.user
         
         # Excluir superusers de la edición
@@ -164,7 +268,7 @@ class UserEditView(LoginRequiredMixin, View):
         # Verificar permisos
         if current_user.is_org_admin and current_user.organization:
             # Admin de org solo puede editar usuarios de su organización
-            if user_to_edit.organization != current_user.organization:
+            if user_to_edit.organization_id != current_user.organization_id:
                 raise PermissionDenied("No tienes permisos para editar este usuario")
         else:
             # Solo pueden editar su propio perfil
@@ -174,7 +278,7 @@ class UserEditView(LoginRequiredMixin, View):
         return super().dispatch(request, *args, **kwargs)
     
     def get(self, request, pk):
-        user_to_edit = get_object_or_404(User, pk=pk)
+        user_to_edit = get_identity_map(request).get_or_404(User, pk)
         form = SimpleUserEditForm(instance=user_to_edit, user=request.user)
         return render(request, self.template_name, {
             'form': form, 
@@ -182,7 +286,7 @@ class UserEditView(LoginRequiredMixin, View):
         })
     
     def post(self, request, pk):
-        user_to_edit = get_object_or_404(User, pk=pk)
+        user_to_edit = get_identity_map(request).get_or_404(User, pk)
         form = SimpleUserEditForm(request.POST, instance=user_to_edit, user=request.user)
         
         if form.is_valid():
@@ -200,7 +304,7 @@ class UserDetailView(LoginRequiredMixin, View):
     template_name = 'users/user_detail.html'
     
     def dispatch(self, request, *args, **kwargs):
-        user_to_view = get_object_or_404(User, pk=kwargs['pk'])
+        user_to_view = get_identity_map(request).get_or_404(User, kwargs['pk'])
         current_user = request.user
         
         # Excluir superusers de la vista
@@ -210,7 +314,7 @@ class UserDetailView(LoginRequiredMixin, View):
         # Verificar permisos
         if current_user.is_org_admin and current_user.organization:
             # Admin de org solo puede ver usuarios de su organización
-            if user_to_view.organization != current_user.organization:
+            if user_to_view.organization_id != current_user.organization_id:
                 raise PermissionDenied("No tienes permisos para ver este usuario")
         else:
             # Solo pueden ver su propio perfil
@@ -220,7 +324,7 @@ class UserDetailView(LoginRequiredMixin, View):
         return super().dispatch(request, *args, **kwargs)
     
     def get(self, request, pk):
-        user_to_view = get_object_or_404(User, pk=pk)
+        user_to_view = get_identity_map(request).get_or_404(User, pk)
         return render(request, self.template_name, {'user_to_view': user_to_view})
 
 
@@ -229,7 +333,7 @@ class UserDeleteAjaxView(LoginRequiredMixin, View):
     """Vista AJAX para obtener información del usuario a eliminar"""
     
     def dispatch(self, request, *args, **kwargs):
-        user_to_delete = get_object_or_404(User, pk=kwargs['pk'])
+        user_to_delete = get_identity_map(request).get_or_404(User, kwargs['pk'])
         current_user = request.user
         
         # Excluir superusers de la eliminación
@@ -238,7 +342,7 @@ class UserDeleteAjaxView(LoginRequiredMixin, View):
         
         # Solo org_admin puede eliminar usuarios de su organización
         if not (current_user.is_org_admin and current_user.organization and 
-                user_to_delete.organization == current_user.organization):
+                user_to_delete.organization_id == current_user.organization_id):
             raise PermissionDenied("No tienes permisos para eliminar este usuario")
         
         # No se puede eliminar a si mismo
@@ -249,7 +353,7 @@ class UserDeleteAjaxView(LoginRequiredMixin, View):
     
     def get(self, request, pk):
         """Obtener información del usuario para mostrar en el modal"""
-        user_to_delete = get_object_or_404(User, pk=pk)
+        user_to_delete = get_identity_map(request).get_or_404(User, pk)
         
         user_data = {
             'id': user_to_delete.id,
@@ -271,7 +375,7 @@ class UserDeleteAjaxView(LoginRequiredMixin, View):
     
     def post(self, request, pk):
         """Procesar la eliminación del usuario"""
-        user_to_delete = get_object_or_404(User, pk=pk)
+        user_to_delete = get_identity_map(request).get_or_404(User, pk)
         
         try:
             # Verificar que se confirmó la eliminación
@@ -288,6 +392,7 @@ class UserDeleteAjaxView(LoginRequiredMixin, View):
             # Log importante para auditoría
             logger.info(f"Usuario eliminado: {user_to_delete.email} por {request.user.email}")
             
+            get_identity_map(request).discard(user_to_delete)
             user_to_delete.delete()
             
             return JsonResponse({
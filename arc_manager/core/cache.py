@@ -0,0 +1,375 @@
+"""
+Cache de dos niveles: LRU en memoria del proceso delante de Redis.
+
+Las lecturas calientes (versiones y snapshots de organización, métricas del
+dashboard) se repiten decenas de veces por segundo en el mismo worker; cada
+una era un round-trip a Redis. ``TwoTierCache`` responde primero desde un LRU
+acotado por proceso y solo va a Redis cuando la copia local venció.
+
+- TTL local corto y configurable por llamada (``local_timeout``): las claves
+  versionadas (su contenido no cambia) pueden vivir más; los contadores de
+  versión muy poco, porque de ellos depende la invalidación entre workers.
+- Jitter en el TTL remoto: las claves creadas juntas no vencen juntas.
+- ``get_or_set`` evita la estampida al vencer: cada entrada guarda cuánto
+  costó calcularla y se refresca antes de tiempo con probabilidad creciente
+  (XFetch); en un miss completo solo un worker recalcula (lock con
+  ``cache.add``) y el resto espera el resultado unos instantes.
+- ``get_many`` resuelve lo local y pide el resto en un solo ``get_many``
+  (MGET en Redis).
+- Contadores de aciertos/fallos/latencia por namespace (``stats()``), visibles
+  en ``/health/cache/`` para staff.
+
+Uso::
+
+    from core.cache import tiered_cache
+
+    snapshot = tiered_cache.get_or_set(key, build, timeout=900, namespace='org_snapshot')
+    versions = tiered_cache.get_many([global_key, org_key], namespace='org_version', local_timeout=1)
+"""
+import logging
+import math
+import random
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Entradas en el LRU de cada worker
+LOCAL_MAX_ENTRIES = getattr(settings, 'CACHE_LOCAL_MAX_ENTRIES', 2000)
+
+# Vigencia por defecto de la copia local (segundos)
+LOCAL_TIMEOUT = getattr(settings, 'CACHE_LOCAL_TIMEOUT', 5)
+
+# Fracción máxima que se descuenta del TTL remoto (0.1 = hasta 10% antes)
+TTL_JITTER = getattr(settings, 'CACHE_TTL_JITTER', 0.1)
+
+# XFetch: >1 refresca antes, <1 más tarde
+EARLY_REFRESH_BETA = 1.0
+
+# Miss completo: tiempo que los demás workers esperan al que recalcula
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 0.5
+LOCK_POLL_INTERVAL = 0.025
+
+_MISSING = object()
+
+
+class LocalLRUCache:
+    """LRU en memoria con TTL por entrada"""
+
+    def __init__(self, max_size=LOCAL_MAX_ENTRIES, ttl=LOCAL_TIMEOUT, clock=time.monotonic):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires <= self.clock():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CachedValue:
+    """Valor de get_or_set en el cache remoto: costo de cálculo y vencimiento (XFetch)"""
+
+    __slots__ = ('value', 'delta', 'expires')
+
+    def __init__(self, value, delta, expires):
+        self.value = value
+        self.delta = delta
+        self.expires = expires
+
+    def __getstate__(self):
+        return (self.value, self.delta, self.expires)
+
+    def __setstate__(self, state):
+        self.value, self.delta, self.expires = state
+
+    def should_refresh(self, now, beta=EARLY_REFRESH_BETA):
+        # -log(U) con U en (0, 1]: casi siempre pequeño, a veces grande
+        return now - self.delta * beta * math.log(1.0 - random.random()) >= self.expires
+
+
+def _unwrap(value):
+    return value.value if isinstance(value, CachedValue) else value
+
+
+class CacheStats:
+    """Contadores por namespace (por proceso)"""
+
+    FIELDS = (
+        'local_hits', 'hits', 'misses', 'sets', 'recomputes', 'early_refreshes',
+        'lock_waits', 'errors', 'remote_calls', 'remote_seconds',
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: dict.fromkeys(self.FIELDS, 0))
+
+    def incr(self, namespace, name, amount=1):
+        with self._lock:
+            self._counters[namespace][name] += amount
+
+    def remote(self, namespace, seconds):
+        with self._lock:
+            counters = self._counters[namespace]
+            counters['remote_calls'] += 1
+            counters['remote_seconds'] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for namespace, counters in self._counters.items():
+                counters = dict(counters)
+                reads = counters['local_hits'] + counters['hits'] + counters['misses']
+                counters['hit_ratio'] = round((counters['local_hits'] + counters['hits']) / reads, 4) if reads else None
+                counters['remote_avg_ms'] = (
+                    round(counters['remote_seconds'] * 1000 / counters['remote_calls'], 3)
+                    if counters['remote_calls'] else None
+                )
+                counters['remote_seconds'] = round(counters['remote_seconds'], 6)
+                result[namespace] = counters
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+
+def namespace_of(key):
+    return key.split(':', 1)[0]
+
+
+class TwoTierCache:
+    """Fachada sobre un alias de CACHES con un LRU local delante"""
+
+    def __init__(self, alias='default', local=None, jitter=TTL_JITTER):
+        self.alias = alias
+        self.local = local if local is not None else LocalLRUCache()
+        self.jitter = jitter
+        self.stats = CacheStats()
+
+    @property
+    def remote(self):
+        return caches[self.alias]
+
+    def _timeout(self, timeout):
+        if not timeout or not self.jitter:
+            return timeout
+        return max(1, int(timeout * (1 - self.jitter * random.random())))
+
+    def _call(self, namespace, method, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return getattr(self.remote, method)(*args, **kwargs)
+        finally:
+            self.stats.remote(namespace, time.perf_counter() - started)
+
+    # -- Lectura / escritura --------------------------------------------------
+
+    def get(self, key, default=None, namespace=None, local_timeout=None):
+        namespace = namespace or namespace_of(key)
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self.stats.incr(namespace, 'local_hits')
+            return value
+        try:
+            value = self._call(namespace, 'get', key, _MISSING)
+        except Exception as e:
+            self.stats.incr(namespace, 'errors')
+            logger.warning(f"Cache remoto no disponible ({key}): {e}")
+            return default
+        if value is _MISSING:
+            self.stats.incr(namespace, 'misses')
+            return default
+        self.stats.incr(namespace, 'hits')
+        value = _unwrap(value)
+        self.local.set(key, value, local_timeout)
+        return value
+
+    def get_many(self, keys, namespace=None, local_timeout=None):
+        """Dict {clave: valor} de las claves presentes; lo que falta localmente va en UN get_many"""
+        found = {}
+        pending = []
+        for key in keys:
+            value = self.local.get(key, _MISSING)
+            if value is _MISSING:
+                pending.append(key)
+            else:
+                found[key] = value
+                self.stats.incr(namespace or namespace_of(key), 'local_hits')
+        if not pending:
+            return found
+
+        try:
+            remote = self._call(namespace or namespace_of(pending[0]), 'get_many', pending)
+        except Exception as e:
+            for key in pending:
+                self.stats.incr(namespace or namespace_of(key), 'errors')
+            logger.warning(f"Cache remoto no disponible ({len(pending)} claves): {e}")
+            return found
+        for key in pending:
+            key_namespace = namespace or namespace_of(key)
+            if key in remote:
+                value = _unwrap(remote[key])
+                found[key] = value
+                self.local.set(key, value, local_timeout)
+                self.stats.incr(key_namespace, 'hits')
+            else:
+                self.stats.incr(key_namespace, 'misses')
+        return found
+
+    def set(self, key, value, timeout=None, namespace=None, local_timeout=None):
+        namespace = namespace or namespace_of(key)
+        self.stats.incr(namespace, 'sets')
+        self.local.set(key, value, local_timeout)
+        try:
+            self._call(namespace, 'set', key, value, self._timeout(timeout))
+        except Exception as e:
+            self.stats.incr(namespace, 'errors')
+            logger.warning(f"No se pudo escribir en el cache remoto ({key}): {e}")
+
+    def delete(self, key, namespace=None):
+        self.local.delete(key)
+        self._call(namespace or namespace_of(key), 'delete', key)
+
+    def add(self, key, value, timeout=None, namespace=None):
+        """Atómico en el cache remoto (no pasa por el LRU local)"""
+        self.local.delete(key)
+        return self._call(namespace or namespace_of(key), 'add', key, value, timeout)
+
+    def incr(self, key, delta=1, namespace=None):
+        """Atómico en el cache remoto; descarta la copia local"""
+        self.local.delete(key)
+        return self._call(namespace or namespace_of(key), 'incr', key, delta)
+
+    def clear_local(self):
+        self.local.clear()
+
+    # -- Recalculo sin estampida ----------------------------------------------
+
+    def get_or_set(self, key, compute, timeout, namespace=None, local_timeout=None, single_flight=True):
+        """
+        Valor cacheado de `key` o `compute()`. El valor None no se cachea.
+        Con single_flight, en un miss solo un worker calcula a la vez.
+        """
+        namespace = namespace or namespace_of(key)
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self.stats.incr(namespace, 'local_hits')
+            return value
+
+        try:
+            entry = self._call(namespace, 'get', key, _MISSING)
+        except Exception as e:
+            self.stats.incr(namespace, 'errors')
+            logger.warning(f"Cache remoto no disponible ({key}): {e}")
+            return compute()
+
+        if entry is not _MISSING:
+            self.stats.incr(namespace, 'hits')
+            if isinstance(entry, CachedValue) and entry.should_refresh(time.time()):
+                # Refresco anticipado: solo quien obtiene el lock; el resto sirve el valor vigente
+                if not single_flight or self._acquire(key, namespace):
+                    self.stats.incr(namespace, 'early_refreshes')
+                    try:
+                        return self._store_or_skip(key, compute, timeout, namespace, local_timeout)
+                    finally:
+                        self._release(key, namespace, single_flight)
+            value = _unwrap(entry)
+            self.local.set(key, value, local_timeout)
+            return value
+
+        self.stats.incr(namespace, 'misses')
+        if not single_flight:
+            return self._store_or_skip(key, compute, timeout, namespace, local_timeout)
+
+        if self._acquire(key, namespace):
+            try:
+                return self._store_or_skip(key, compute, timeout, namespace, local_timeout)
+            finally:
+                self._release(key, namespace)
+
+        # Otro worker está calculando: esperar su resultado un momento
+        self.stats.incr(namespace, 'lock_waits')
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            try:
+                entry = self._call(namespace, 'get', key, _MISSING)
+            except Exception:
+                break
+            if entry is not _MISSING:
+                value = _unwrap(entry)
+                self.local.set(key, value, local_timeout)
+                return value
+        return self._store_or_skip(key, compute, timeout, namespace, local_timeout)
+
+    def _store_or_skip(self, key, compute, timeout, namespace, local_timeout):
+        started = time.perf_counter()
+        value = compute()
+        if value is None:
+            return None
+        delta = time.perf_counter() - started
+        self.stats.incr(namespace, 'recomputes')
+        timeout = self._timeout(timeout)
+        # timeout=None no vence: tampoco se refresca antes de tiempo
+        expires = math.inf if timeout is None else time.time() + timeout
+        self.local.set(key, value, local_timeout)
+        try:
+            self._call(namespace, 'set', key, CachedValue(value, delta, expires), timeout)
+        except Exception as e:
+            self.stats.incr(namespace, 'errors')
+            logger.warning(f"No se pudo escribir en el cache remoto ({key}): {e}")
+        return value
+
+    def _acquire(self, key, namespace):
+        try:
+            return bool(self._call(namespace, 'add', f'{key}:lock', 1, LOCK_TIMEOUT))
+        except Exception:
+            # Sin cache remoto no hay coordinación: calcular
+            return True
+
+    def _release(self, key, namespace, locked=True):
+        if not locked:
+            return
+        try:
+            self._call(namespace, 'delete', f'{key}:lock')
+        except Exception:
+            pass
+
+
+tiered_cache = TwoTierCache()
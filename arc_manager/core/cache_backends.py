@@ -0,0 +1,218 @@
+"""
+Backend de cache Redis con circuit breaker.
+
+Si Redis se cuelga, cada ``cache.get`` del request espera hasta el timeout del
+socket y los workers se agotan. ``ResilientRedisCache`` (subclase del
+``RedisCache`` de Django):
+
+- Usa timeouts cortos de conexión y lectura (``socket_connect_timeout`` /
+  ``socket_timeout`` en ``OPTIONS``, los recibe el pool de redis-py).
+- Cuenta los errores de conexión/timeout consecutivos; al llegar a
+  ``FAILURE_THRESHOLD`` el circuito se ABRE y durante ``RESET_TIMEOUT``
+  segundos ninguna operación toca Redis.
+- Con el circuito abierto responde desde un cache en memoria del proceso:
+  las lecturas que no estén ahí son un miss (quien llama recalcula) y las
+  escrituras quedan locales.
+- Pasado ``RESET_TIMEOUT`` deja pasar UNA operación de prueba (SEMI-ABIERTO):
+  si funciona el circuito se cierra y se descarta la memoria local; si falla
+  vuelve a abrirse.
+
+En modo degradado las invalidaciones (contadores de versión) y los ``add``
+atómicos solo valen dentro del worker; los TTL limitan lo que dure la
+inconsistencia después de recuperar Redis.
+
+Configuración (``CACHES``)::
+
+    'default': {
+        'BACKEND': 'core.cache_backends.ResilientRedisCache',
+        'LOCATION': REDIS_URL,
+        'OPTIONS': {
+            'socket_connect_timeout': 0.25,
+            'socket_timeout': 0.25,
+            'FAILURE_THRESHOLD': 5,
+            'RESET_TIMEOUT': 10,
+            'FALLBACK_MAX_ENTRIES': 1000,
+        },
+    }
+
+Quien usa el cliente redis-py directamente (el rate limit con scripts Lua)
+consulta ``breaker.allow()`` antes y reporta el resultado con
+``record_success()`` / ``record_failure()``, así comparte el mismo circuito.
+
+El estado de cada circuito y los contadores de fallback se ven en
+``/health/cache/`` y con ``manage.py check_cache_breaker``.
+"""
+import logging
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Errores que cuentan como "Redis no disponible"
+UNAVAILABLE_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Circuit breaker por proceso: closed -> open -> half_open -> closed"""
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=10, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._probing = False
+
+    def allow(self):
+        """True si la operación puede ir a Redis"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                logger.info(f"Cache '{self.name}': circuito semi-abierto, probando Redis")
+            if self.state == HALF_OPEN and not self._probing:
+                # Una sola operación de prueba a la vez
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            recovered = self.state != CLOSED
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+        if recovered:
+            logger.warning(f"Cache '{self.name}': Redis respondió, circuito cerrado")
+        return recovered
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = self.clock()
+                self.trips += 1
+                logger.error(
+                    f"Cache '{self.name}': circuito abierto tras {self.failures} errores; "
+                    f"se usa memoria local durante {self.reset_timeout}s"
+                )
+
+
+class ResilientRedisCache(RedisCache):
+    """RedisCache con circuit breaker y cache en memoria mientras Redis no responde"""
+
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        # Las opciones propias no van al pool de redis-py
+        options = dict(self._options)
+        failure_threshold = options.pop('FAILURE_THRESHOLD', 5)
+        reset_timeout = options.pop('RESET_TIMEOUT', 10)
+        fallback_max_entries = options.pop('FALLBACK_MAX_ENTRIES', 1000)
+        self._options = options
+
+        name = params.get('KEY_PREFIX') or str(server)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.fallback = LocMemCache(f'resilient:{name}', {
+            'TIMEOUT': params.get('TIMEOUT', 300),
+            'OPTIONS': {'MAX_ENTRIES': fallback_max_entries},
+        })
+        self._counters_lock = threading.Lock()
+        self.counters = {'errors': 0, 'fallback_reads': 0, 'fallback_writes': 0}
+
+    def _count(self, name):
+        with self._counters_lock:
+            self.counters[name] += 1
+
+    def _call(self, method, kind, *args, **kwargs):
+        """Ejecuta `method` contra Redis o, si el circuito está abierto o falla, contra la memoria local"""
+        if self.breaker.allow():
+            try:
+                result = getattr(super(), method)(*args, **kwargs)
+            except UNAVAILABLE_ERRORS as e:
+                self.record_failure(method, e)
+            except Exception:
+                # Error de la operación (p.ej. incr de una clave inexistente): Redis respondió
+                self.record_success()
+                raise
+            else:
+                self.record_success()
+                return result
+
+        self._count(f'fallback_{kind}')
+        return getattr(self.fallback, method)(*args, **kwargs)
+
+    def record_success(self):
+        if self.breaker.record_success():
+            # Lo escrito durante la caída no se replica: Redis vuelve a ser la fuente
+            self.fallback.clear()
+
+    def record_failure(self, operation, error):
+        self._count('errors')
+        logger.warning(f"Cache '{self.breaker.name}' no disponible ({operation}): {error}")
+        self.breaker.record_failure()
+
+    def stats(self):
+        breaker = self.breaker
+        with self._counters_lock:
+            counters = dict(self.counters)
+        return {
+            'state': breaker.state,
+            'failures': breaker.failures,
+            'trips': breaker.trips,
+            'open_for_seconds': (
+                round(breaker.clock() - breaker.opened_at, 3) if breaker.state != CLOSED else None
+            ),
+            **counters,
+        }
+
+    # -- API de cache ---------------------------------------------------------
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('add', 'writes', key, value, timeout, version)
+
+    def get(self, key, default=None, version=None):
+        return self._call('get', 'reads', key, default, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('set', 'writes', key, value, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('touch', 'writes', key, timeout, version)
+
+    def delete(self, key, version=None):
+        return self._call('delete', 'writes', key, version)
+
+    def get_many(self, keys, version=None):
+        return self._call('get_many', 'reads', keys, version)
+
+    def has_key(self, key, version=None):
+        return self._call('has_key', 'reads', key, version)
+
+    def incr(self, key, delta=1, version=None):
+        return self._call('incr', 'writes', key, delta, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('set_many', 'writes', data, timeout, version)
+
+    def delete_many(self, keys, version=None):
+        return self._call('delete_many', 'writes', keys, version)
+
+    def clear(self):
+        self.fallback.clear()
+        return self._call('clear', 'writes')
@@ -0,0 +1,350 @@
+"""
+Paginación por cursor (keyset).
+
+El ``Paginator`` de Django hace ``COUNT(*)`` y ``OFFSET n``: cada página más
+profunda es más lenta. ``CursorPaginator`` ordena por columnas indexadas
+terminando en la PK (p.ej. ``('-date_joined', '-id')``) y pide "las filas
+después de la última que vi" con un ``WHERE`` sobre esas columnas, así
+cualquier página cuesta lo mismo.
+
+El cursor es opaco y firmado (``django.core.signing``, con un salt por
+listado): no se puede fabricar ni reutilizar en otro listado. El total es
+opcional y perezoso (un int o un callable, p.ej. los contadores
+desnormalizados); sin total no hay COUNT.
+
+Uso en una ListView::
+
+    class UserListView(CursorPaginationMixin, ListView):
+        paginate_by = 15
+        cursor_ordering = ('-date_joined', '-id')
+
+En la plantilla: ``{% include 'includes/cursor_pagination.html' %}``.
+
+Conteos aproximados: en PostgreSQL ``approximate_count`` usa
+``pg_class.reltuples`` (tabla sin filtros) o la estimación de ``EXPLAIN``
+(con filtros) y solo cuenta exacto por debajo de
+``ADMIN_EXACT_COUNT_THRESHOLD``. En otros motores el conteo es exacto.
+``ApproximateCountAdminMixin`` lo aplica a los changelists del admin.
+"""
+import datetime
+import decimal
+import json
+import logging
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.http import Http404, QueryDict
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+CURSOR_PARAM = 'cursor'
+
+# Por debajo de este número de filas (estimadas) se cuenta exacto
+EXACT_COUNT_THRESHOLD = getattr(settings, 'ADMIN_EXACT_COUNT_THRESHOLD', 10000)
+
+
+class InvalidCursor(Exception):
+    """Cursor alterado, vencido o de otro listado"""
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+# =============================================================================
+# Conteos aproximados
+# =============================================================================
+
+def _plan_rows(explain_output):
+    plan = json.loads(explain_output) if isinstance(explain_output, str) else explain_output
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def estimate_count(queryset):
+    """
+    Filas estimadas por el planner de PostgreSQL, o None si no hay estimación
+    (otro motor, tabla nunca analizada o error).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        with connection.cursor() as cursor:
+            if not queryset.query.where and not queryset.query.distinct:
+                # Sin filtros: estadística de la tabla, sin tocar las filas
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)',
+                    [connection.ops.quote_name(queryset.model._meta.db_table)],
+                )
+                row = cursor.fetchone()
+                # reltuples = -1: la tabla nunca se analizó
+                if row and row[0] is not None and row[0] >= 0:
+                    return int(row[0])
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            return _plan_rows(cursor.fetchone()[0])
+    except (DatabaseError, KeyError, IndexError, TypeError, ValueError) as e:
+        logger.warning(f"No se pudo estimar el conteo de {queryset.model._meta.label}: {e}")
+        return None
+
+
+def approximate_count(queryset, threshold=None):
+    """(conteo, es_estimado): exacto si la estimación no existe o es menor al umbral"""
+    threshold = EXACT_COUNT_THRESHOLD if threshold is None else threshold
+    estimate = estimate_count(queryset)
+    if estimate is None or estimate < threshold:
+        return queryset.count(), False
+    return estimate, True
+
+
+class ApproximateCountPaginator(Paginator):
+    """Paginator cuyo count es aproximado en tablas grandes (ver approximate_count)"""
+
+    is_estimate = False
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        count, self.is_estimate = approximate_count(self.object_list)
+        return count
+
+
+class ApproximateCountAdminMixin:
+    """
+    Para ModelAdmin: conteo aproximado en el changelist (marcado con ≈) y sin
+    el segundo COUNT del total sin filtros.
+    """
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+
+
+class CursorPage:
+    """Página de resultados con cursores hacia la siguiente y la anterior"""
+
+    def __init__(self, object_list, paginator, has_next, has_previous, query_params=None, param=CURSOR_PARAM):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.query_params = query_params if query_params is not None else QueryDict()
+        self.param = param
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f'<CursorPage ({len(self)} elementos)>'
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @cached_property
+    def next_cursor(self):
+        if not self.has_next or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1], 'next')
+
+    @cached_property
+    def previous_cursor(self):
+        if not self.has_previous or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0], 'previous')
+
+    @property
+    def total(self):
+        return self.paginator.total
+
+    def _url(self, cursor):
+        params = self.query_params.copy()
+        params.pop(self.param, None)
+        if cursor is not None:
+            params[self.param] = cursor
+        return f'?{params.urlencode()}'
+
+    @property
+    def next_url(self):
+        return self._url(self.next_cursor) if self.next_cursor else None
+
+    @property
+    def previous_url(self):
+        return self._url(self.previous_cursor) if self.previous_cursor else None
+
+    @property
+    def first_url(self):
+        return self._url(None)
+
+
+class CursorPaginator:
+    """
+    Paginador keyset sobre `queryset` ordenado por `ordering`. Las columnas
+    de `ordering` no pueden ser nulas y la última debe ser única (la PK).
+    """
+
+    is_estimate = False
+
+    def __init__(self, queryset, per_page, ordering=('-pk',), salt='', total=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.salt = f'cursor:{salt or queryset.model._meta.label_lower}'
+        self._total = total
+        self._fields = [
+            (name.lstrip('-'), name.startswith('-'))
+            for name in self.ordering
+        ]
+
+    @cached_property
+    def total(self):
+        """Total (si se configuró): se evalúa solo cuando la plantilla lo pide"""
+        return self._total() if callable(self._total) else self._total
+
+    # -- Cursores -------------------------------------------------------------
+
+    def _field(self, name):
+        opts = self.queryset.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def encode_cursor(self, instance, direction):
+        values = [_encode_value(getattr(instance, self._field(name).attname)) for name, _ in self._fields]
+        return signing.dumps({'k': values, 'd': direction[0]}, salt=self.salt, compress=True)
+
+    def decode_cursor(self, cursor):
+        try:
+            data = signing.loads(cursor, salt=self.salt)
+            values, direction = data['k'], data['d']
+            if direction not in ('n', 'p') or len(values) != len(self._fields):
+                raise ValueError('cursor incompleto')
+            values = [self._field(name).to_python(value) for (name, _), value in zip(self._fields, values)]
+        except (signing.BadSignature, KeyError, TypeError, ValueError) as e:
+            raise InvalidCursor(str(e))
+        return values, 'next' if direction == 'n' else 'previous'
+
+    # -- Consulta -------------------------------------------------------------
+
+    def _after(self, values, forward):
+        """WHERE (a, b) < (va, vb) expandido: a < va OR (a = va AND b < vb)"""
+        conditions = []
+        for index, (name, descending) in enumerate(self._fields):
+            equal = {field: value for (field, _), value in zip(self._fields[:index], values[:index])}
+            lookup = 'lt' if descending == forward else 'gt'
+            conditions.append(Q(**equal, **{f'{name}__{lookup}': values[index]}))
+        return reduce(or_, conditions)
+
+    def page(self, cursor=None, query_params=None, param=CURSOR_PARAM):
+        """Página a partir de un cursor (None: primera página)"""
+        queryset = self.queryset.order_by(*self.ordering)
+        if not cursor:
+            rows = list(queryset[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], self, len(rows) > self.per_page, False, query_params, param)
+
+        values, direction = self.decode_cursor(cursor)
+        if direction == 'next':
+            rows = list(queryset.filter(self._after(values, forward=True))[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], self, len(rows) > self.per_page, True, query_params, param)
+
+        # Hacia atrás: orden invertido y se da vuelta el resultado
+        reverse = [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+        rows = list(queryset.filter(self._after(values, forward=False)).order_by(*reverse)[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        return CursorPage(rows[:self.per_page][::-1], self, True, has_previous, query_params, param)
+
+
+class CursorPaginationMixin:
+    """
+    Para ListView: reemplaza la paginación por OFFSET por cursores.
+    ``get_cursor_total`` puede retornar un total ya conocido (sin COUNT).
+    """
+    cursor_ordering = ('-pk',)
+    cursor_param = CURSOR_PARAM
+
+    def get_cursor_total(self):
+        return None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(
+            queryset, page_size,
+            ordering=self.cursor_ordering,
+            salt=f'{type(self).__module__}.{type(self).__name__}',
+            total=self.get_cursor_total,
+        )
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_param), self.request.GET, self.cursor_param)
+        except InvalidCursor:
+            raise Http404("Página inválida")
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+# =============================================================================
+# Admin
+# =============================================================================
+
+class CursorChangeList(ChangeList):
+    """
+    ChangeList con paginación por cursor para el orden por defecto. Si el
+    usuario ordena por una columna se usa la paginación estándar del admin.
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_PARAM, None)
+        return lookup_params
+
+    def get_results(self, request):
+        cursor = request.GET.get(CURSOR_PARAM)
+        # No arrastrar el cursor en los enlaces de filtros y orden
+        self.params.pop(CURSOR_PARAM, None)
+        self.filter_params.pop(CURSOR_PARAM, None)
+
+        self.cursor_page = None
+        if ORDER_VAR in self.params or self.show_all:
+            return super().get_results(request)
+
+        counter = ApproximateCountPaginator(self.queryset, self.list_per_page)
+        paginator = CursorPaginator(
+            self.queryset, self.list_per_page,
+            ordering=self.model_admin.cursor_ordering,
+            salt=f'admin:{self.opts.label_lower}',
+            total=lambda: counter.count,
+        )
+        try:
+            page = paginator.page(cursor, request.GET)
+        except InvalidCursor:
+            page = paginator.page(None, request.GET)
+
+        self.cursor_page = page
+        self.result_count = paginator.total
+        paginator.is_estimate = counter.is_estimate
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = page.object_list
+        self.can_show_all = False
+        self.multi_page = page.has_other_pages()
+        self.paginator = paginator
+
+
+class CursorPaginationAdminMixin(ApproximateCountAdminMixin):
+    """Para ModelAdmin de tablas grandes: paginación por cursor y conteo aproximado"""
+    cursor_ordering = ('-pk',)
+    change_list_template = 'admin/cursor_change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return CursorChangeList
@@ -0,0 +1,182 @@
+"""
+Clasificación de rutas compartida por los middlewares.
+
+Las reglas de prefijo (exenciones, módulo, nivel de acceso) se compilan una
+sola vez en un trie por segmentos de la URL. Cada nodo guarda los atributos ya
+combinados con los de sus ancestros, así que clasificar una ruta es un
+``split`` y unos pocos accesos a diccionario; el resultado se memoriza por
+ruta. Las URLs exentas de login (``LOGIN_EXEMPT_URLS``, regex) se combinan en
+una única expresión regular.
+
+Uso desde un middleware::
+
+    route = classify_request(request)
+    if route.subscription_exempt:
+        ...
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# Cada regla es (prefijo, atributos). Los atributos de un prefijo más largo
+# sobreescriben a los del prefijo que lo contiene.
+DEFAULT_ROUTE_RULES = [
+    ('/admin/', {'is_admin': True, 'superuser_allowed': True, 'subscription_exempt': True, 'tenant_exempt': True}),
+    ('/accounts/login/', {'superuser_allowed': True, 'subscription_exempt': True, 'tenant_exempt': True}),
+    ('/accounts/logout/', {'superuser_allowed': True, 'subscription_exempt': True, 'tenant_exempt': True}),
+    ('/accounts/password_reset/', {'subscription_exempt': True}),
+    ('/static/', {'superuser_allowed': True, 'subscription_exempt': True, 'tenant_exempt': True}),
+    ('/media/', {'superuser_allowed': True, 'subscription_exempt': True, 'tenant_exempt': True}),
+    ('/favicon.ico', {'subscription_exempt': True}),
+    ('/api/', {'tenant_exempt': True}),
+    ('/api/check-limits/', {'subscription_exempt': True}),
+    ('/health/', {'subscription_exempt': True, 'tenant_exempt': True}),
+    ('/health/cache/', {'superuser_allowed': True}),
+
+    # Módulos con acceso completo
+    ('/dashboard/', {'module': 'dashboard', 'access_level': 'full', 'subscription_warning': True}),
+    ('/main/', {'module': 'dashboard', 'access_level': 'full', 'subscription_warning': True}),
+    ('/orgs/', {'module': 'organizations', 'access_level': 'full'}),
+    ('/organizations/', {'module': 'organizations', 'access_level': 'full'}),
+    ('/users/', {'module': 'users', 'access_level': 'full', 'subscription_warning': True}),
+    ('/projects/', {'module': 'projects', 'access_level': 'full'}),
+    ('/reports/', {'module': 'reports', 'access_level': 'full'}),
+
+    # Módulos que funcionan con acceso limitado
+    ('/plans/', {'module': 'plans', 'access_level': 'limited', 'subscription_exempt': True, 'subscription_warning': True}),
+    ('/subscription/', {'module': 'plans', 'access_level': 'limited'}),
+    ('/billing/', {'module': 'billing', 'access_level': 'limited'}),
+]
+
+
+class Route:
+    """Resultado de clasificar una ruta"""
+
+    __slots__ = (
+        'module', 'access_level', 'login_exempt', 'is_admin', 'superuser_allowed',
+        'subscription_exempt', 'tenant_exempt', 'subscription_warning',
+    )
+
+    DEFAULTS = {
+        'module': 'general',
+        'access_level': 'full',
+        'login_exempt': False,
+        'is_admin': False,
+        'superuser_allowed': False,
+        'subscription_exempt': False,
+        'tenant_exempt': False,
+        'subscription_warning': False,
+    }
+
+    def __init__(self, **attrs):
+        for name in self.__slots__:
+            setattr(self, name, attrs.get(name, self.DEFAULTS[name]))
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"Route({self.as_dict()})"
+
+
+class _Node:
+    __slots__ = ('children', 'attrs', 'route', 'login_exempt_route')
+
+    def __init__(self, attrs):
+        self.children = {}
+        self.attrs = attrs
+        self.route = None
+        self.login_exempt_route = None
+
+    def freeze(self):
+        """Precalcula las dos clasificaciones posibles del nodo"""
+        self.route = Route(**self.attrs)
+        self.login_exempt_route = Route(**dict(self.attrs, login_exempt=True))
+        for child in self.children.values():
+            child.freeze()
+
+
+class PathRouter:
+    """Trie de prefijos por segmento + regex combinada de URLs exentas de login"""
+
+    def __init__(self, rules=None, login_exempt_urls=None, login_url=None, cache_size=4096):
+        self.root = _Node(dict(Route.DEFAULTS))
+
+        # Insertar de menor a mayor profundidad para heredar los atributos del padre
+        rules = rules if rules is not None else DEFAULT_ROUTE_RULES
+        for prefix, attrs in sorted(rules, key=lambda rule: len(self._segments(rule[0]))):
+            self._insert(prefix, attrs)
+        self.root.freeze()
+
+        patterns = list(login_exempt_urls or [])
+        if login_url:
+            patterns.append(re.escape(login_url.lstrip('/')) + '$')
+        self.login_exempt_re = re.compile('|'.join(f'(?:{pattern})' for pattern in patterns)) if patterns else None
+
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    @staticmethod
+    def _segments(path):
+        return [segment for segment in path.split('/') if segment]
+
+    def _insert(self, prefix, attrs):
+        node = self.root
+        for segment in self._segments(prefix):
+            child = node.children.get(segment)
+            if child is None:
+                child = _Node(dict(node.attrs))
+                node.children[segment] = child
+            node = child
+        node.attrs.update(attrs)
+
+    def _classify(self, path):
+        node = self.root
+        for segment in path.split('/'):
+            if not segment:
+                continue
+            child = node.children.get(segment)
+            if child is None:
+                break
+            node = child
+
+        if self.login_exempt_re is not None and self.login_exempt_re.match(path.lstrip('/')):
+            return node.login_exempt_route
+        return node.route
+
+
+_router = None
+
+
+def get_router():
+    """Router construido desde settings la primera vez que se usa"""
+    global _router
+    if _router is None:
+        _router = PathRouter(
+            rules=getattr(settings, 'ROUTE_RULES', None),
+            login_exempt_urls=getattr(settings, 'LOGIN_EXEMPT_URLS', []),
+            login_url=getattr(settings, 'LOGIN_URL', '/accounts/login/'),
+        )
+    return _router
+
+
+def classify_path(path):
+    return get_router().classify(path)
+
+
+def classify_request(request):
+    """Clasifica la ruta del request una sola vez y la comparte vía ``request.route``"""
+    route = getattr(request, 'route', None)
+    if route is None:
+        route = classify_path(request.path_info)
+        request.route = route
+    return route
+
+
+@receiver(setting_changed)
+def _reset_router(setting, **kwargs):
+    global _router
+    if setting in ('ROUTE_RULES', 'LOGIN_EXEMPT_URLS', 'LOGIN_URL'):
+        _router = None
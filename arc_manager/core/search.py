@@ -0,0 +1,259 @@
+"""
+Búsqueda indexada sobre una columna normalizada.
+
+Los modelos buscables (``INDEXED_MODELS``) guardan en ``search_text`` sus
+campos de texto en minúsculas y sin acentos, cada valor precedido por un
+espacio (``" juan perez juan@acme.com"``). La columna se mantiene en
+``save()``; las altas masivas la calculan con ``build_search_text``.
+
+- PostgreSQL: índice GIN con ``gin_trgm_ops`` (pg_trgm). Un ``LIKE '%term%'``
+  sobre la columna usa el índice en lugar de recorrer la tabla.
+- SQLite (local): tabla virtual FTS5 con tokenizer trigram, sincronizada por
+  triggers. Los términos de menos de 3 caracteres usan ``LIKE``.
+
+Cada término debe aparecer (AND). Con ``prefix=True`` (type-ahead) los
+términos deben coincidir con el inicio de una palabra: se busca
+``" term"``, que el índice trigram resuelve igual.
+
+Uso::
+
+    users = search_queryset(User.objects.filter(organization=org), 'juan pér')
+    users = search_queryset(queryset, 'ju', prefix=True)
+"""
+import logging
+import unicodedata
+from functools import reduce
+from operator import and_
+
+from django.apps import apps
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELD = 'search_text'
+
+# Modelos con columna search_text e índice de búsqueda
+INDEXED_MODELS = ('accounts.User', 'orgs.Organization')
+
+# Longitud mínima de un término para el índice trigram
+MIN_TRIGRAM_LENGTH = 3
+
+# Términos por búsqueda (el resto se ignora)
+MAX_TERMS = 8
+
+
+# =============================================================================
+# Normalización
+# =============================================================================
+
+def normalize_search_text(value):
+    """Minúsculas, sin acentos y con espacios colapsados"""
+    value = unicodedata.normalize('NFKD', str(value or ''))
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(value.lower().split())
+
+
+def build_search_text(*values):
+    """Documento de búsqueda: cada valor normalizado precedido por un espacio"""
+    return ''.join(f' {value}' for value in map(normalize_search_text, values) if value)
+
+
+def search_terms(query):
+    """Términos normalizados y sin repetir de una búsqueda"""
+    terms = []
+    for term in normalize_search_text(query).split():
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+# =============================================================================
+# Consultas
+# =============================================================================
+
+def search_table(db_table):
+    """Tabla FTS5 de SQLite asociada a una tabla buscable"""
+    return f'{db_table}_search'
+
+
+_fts_tables = {}
+
+
+def has_fts_index(model, using='default'):
+    """La tabla FTS5 existe (SQLite con FTS5 disponible). Se consulta una vez por proceso"""
+    key = (using, model._meta.db_table)
+    if key not in _fts_tables:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                [search_table(model._meta.db_table)],
+            )
+            _fts_tables[key] = cursor.fetchone() is not None
+    return _fts_tables[key]
+
+
+def _fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def search_condition(model, query, prefix=False, using='default'):
+    """Q que exige todos los términos en search_text, o None si no hay términos"""
+    terms = search_terms(query)
+    if not terms:
+        return None
+    needles = [f' {term}' if prefix else term for term in terms]
+
+    if connections[using].vendor == 'sqlite' and has_fts_index(model, using):
+        indexed = [needle for needle in needles if len(needle) >= MIN_TRIGRAM_LENGTH]
+        conditions = [Q(**{f'{SEARCH_FIELD}__contains': needle}) for needle in needles if needle not in indexed]
+        if indexed:
+            table = search_table(model._meta.db_table)
+            conditions.append(Q(pk__in=RawSQL(
+                f'SELECT rowid FROM "{table}" WHERE "{table}" MATCH %s',
+                [' AND '.join(_fts_phrase(needle) for needle in indexed)],
+            )))
+        return reduce(and_, conditions)
+
+    # PostgreSQL: LIKE '%term%' sobre la columna usa el índice GIN trigram
+    return reduce(and_, [Q(**{f'{SEARCH_FIELD}__contains': needle}) for needle in needles])
+
+
+def search_queryset(queryset, query, prefix=False, related=()):
+    """
+    Filtra `queryset` por la búsqueda. `related` son FKs a otros modelos
+    buscables: también coinciden las filas cuyo relacionado coincide
+    (p.ej. usuarios por nombre de organización).
+    """
+    using = queryset.db
+    condition = search_condition(queryset.model, query, prefix, using)
+    if condition is None:
+        return queryset
+
+    for name in related:
+        related_model = queryset.model._meta.get_field(name).related_model
+        related_condition = search_condition(related_model, query, prefix, using)
+        condition |= Q(**{f'{name}__in': related_model._default_manager.using(using).filter(related_condition).values('pk')})
+
+    return queryset.filter(condition)
+
+
+class IndexedSearchMixin:
+    """
+    Para ModelAdmin: reemplaza la búsqueda por ``search_fields`` (un ILIKE por
+    campo y fila) por la columna indexada. ``search_fields`` se mantiene solo
+    para mostrar el buscador; ``search_related`` suma FKs buscables.
+    """
+    search_related = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search_queryset(queryset, search_term, related=self.search_related), False
+
+
+# =============================================================================
+# Índices (migraciones y post_migrate)
+# =============================================================================
+
+def _sqlite_index_sql(db_table):
+    table = search_table(db_table)
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS "{table}" USING fts5(
+            {SEARCH_FIELD}, content='{db_table}', content_rowid='id', tokenize='trigram')""",
+        f"""CREATE TRIGGER IF NOT EXISTS "{table}_ai" AFTER INSERT ON "{db_table}" BEGIN
+            INSERT INTO "{table}"(rowid, {SEARCH_FIELD}) VALUES (new.id, new.{SEARCH_FIELD});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS "{table}_ad" AFTER DELETE ON "{db_table}" BEGIN
+            INSERT INTO "{table}"("{table}", rowid, {SEARCH_FIELD}) VALUES ('delete', old.id, old.{SEARCH_FIELD});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS "{table}_au" AFTER UPDATE OF {SEARCH_FIELD} ON "{db_table}" BEGIN
+            INSERT INTO "{table}"("{table}", rowid, {SEARCH_FIELD}) VALUES ('delete', old.id, old.{SEARCH_FIELD});
+            INSERT INTO "{table}"(rowid, {SEARCH_FIELD}) VALUES (new.id, new.{SEARCH_FIELD});
+        END""",
+        f"""INSERT INTO "{table}"("{table}") VALUES ('rebuild')""",
+    ]
+
+
+def create_search_index(schema_editor, db_table):
+    """Crea el índice de búsqueda de la tabla según el motor (idempotente)"""
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        try:
+            with transaction.atomic(using=connection.alias):
+                schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        except DatabaseError as e:
+            # Sin permisos para crear la extensión: la búsqueda funciona, sin índice
+            logger.warning(f"No se pudo habilitar pg_trgm ({e}); búsqueda sin índice en {db_table}")
+            return
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{db_table}_search_trgm" '
+            f'ON "{db_table}" USING gin ({SEARCH_FIELD} gin_trgm_ops)'
+        )
+    elif connection.vendor == 'sqlite':
+        try:
+            with transaction.atomic(using=connection.alias):
+                for sql in _sqlite_index_sql(db_table):
+                    schema_editor.execute(sql)
+        except DatabaseError as e:
+            # SQLite sin FTS5/trigram: search_condition cae a LIKE sobre la columna
+            logger.warning(f"No se pudo crear el índice FTS5 de {db_table} ({e}); búsqueda con LIKE")
+    _fts_tables.clear()
+
+
+def drop_search_index(schema_editor, db_table):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{db_table}_search_trgm"')
+    elif connection.vendor == 'sqlite':
+        table = search_table(db_table)
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS "{table}_{suffix}"')
+        schema_editor.execute(f'DROP TABLE IF EXISTS "{table}"')
+    _fts_tables.clear()
+
+
+def ensure_search_indexes(using='default', **kwargs):
+    """
+    post_migrate: en SQLite, las migraciones que reconstruyen una tabla
+    (ALTER vía copia) eliminan sus triggers; se recrean y se reindexa.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {row[0] for row in cursor.fetchall()}
+
+    missing = []
+    for label in INDEXED_MODELS:
+        db_table = apps.get_model(label)._meta.db_table
+        table = search_table(db_table)
+        expected = {table, f'{table}_ai', f'{table}_ad', f'{table}_au'}
+        if db_table in existing and not expected <= existing:
+            missing.append(db_table)
+
+    if missing:
+        with connection.schema_editor() as schema_editor:
+            for db_table in missing:
+                create_search_index(schema_editor, db_table)
+
+
+def reindex_search_text(model, batch_size=1000):
+    """Recalcula search_text de todas las filas (tras cambiar la normalización)"""
+    updated = 0
+    batch = []
+    for instance in model._default_manager.order_by('pk').iterator(chunk_size=batch_size):
+        text = instance.get_search_text()
+        if text != getattr(instance, SEARCH_FIELD):
+            setattr(instance, SEARCH_FIELD, text)
+            batch.append(instance)
+        if len(batch) >= batch_size:
+            model._default_manager.bulk_update(batch, [SEARCH_FIELD])
+            updated += len(batch)
+            batch = []
+    if batch:
+        model._default_manager.bulk_update(batch, [SEARCH_FIELD])
+        updated += len(batch)
+    return updated
@@ -61,18 +61,33 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'axes.middleware.AxesMiddleware',
-    'apps.accounts.middleware.LoginRequiredMiddleware',
-    'apps.accounts.middleware.SuperuserRestrictMiddleware',
-    'apps.orgs.middleware.OrganizationContextMiddleware',
+    'apps.orgs.pipeline.TenantPipelineMiddleware',  # Login, superuser y contexto de organización
     'apps.accounts.middleware.ErrorHandlingMiddleware',  # Agregar al final
 ]
 
+# Etapas del pipeline de tenant, en orden (apps.orgs.pipeline). Disponibles además:
+# 'tenant_validation', 'subscription_access', 'subscription_info'
+TENANT_PIPELINE_STAGES = [
+    'login_required',
+    'superuser_restrict',
+    'organization_context',
+]
+# En GET/HEAD/OPTIONS las etapas no pueden escribir en la base de datos
+TENANT_PIPELINE_STRICT_READS = DEBUG
+
 ROOT_URLCONF = 'core.urls'
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
+    'apps.accounts.backends.CachedModelBackend',  # get_user desde cache (LRU local + Redis)
     'axes.backends.AxesBackend',
+    # Solo para sesiones iniciadas antes de CachedModelBackend; quitar pasado SESSION_COOKIE_AGE
+    'django.contrib.auth.backends.ModelBackend',
 ]
 
+# Cache del usuario autenticado (apps.accounts.backends)
+USER_CACHE_TIMEOUT = 5 * 60  # Entrada en Redis (se invalida por versión al guardar el usuario)
+USER_CACHE_LOCAL_TTL = 5  # Copia en memoria de cada worker: otros workers ven cambios en <= 5 s
+USER_CACHE_LOCAL_SIZE = 1000  # Usuarios por worker (LRU)
+
 # Configuración completa de Django Axes
 # Configuración básica
 AXES_ENABLED = True  # Habilitar Django Axes
@@ -108,28 +123,55 @@ AXES_VERBOSE = True  # Mensaje verboso en los logs
 # Configuración de Redis para cache
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://redis:6379/0')
 
+# Rate limiting (apps.orgs.ratelimit): límite de peticiones POST por ventana en segundos.
+# scope: 'ip', 'user' o 'tenant' (organización); tenant_limits permite {org_id: límite}
+RATE_LIMIT_POLICIES = {
+    'login': {'limit': 10, 'window': 300, 'scope': 'ip'},
+    'password_reset': {'limit': 5, 'window': 900, 'scope': 'ip'},
+    'user_create': {'limit': 30, 'window': 3600, 'scope': 'tenant'},
+    'user_import': {'limit': 10, 'window': 3600, 'scope': 'tenant'},
+    'user_search': {'limit': 120, 'window': 60, 'scope': 'user', 'methods': ('GET',)},
+}
+# Proxies de confianza delante de Django (la IP del cliente es la entrada N desde la
+# derecha de X-Forwarded-For; 0 = usar REMOTE_ADDR). El cliente controla el resto del header
+RATELIMIT_TRUSTED_PROXIES = int(os.environ.get('RATELIMIT_TRUSTED_PROXIES', 0))
+
+# Redis con circuit breaker (core.cache_backends): timeouts cortos y, tras
+# FAILURE_THRESHOLD errores seguidos, RESET_TIMEOUT segundos sirviendo desde
+# memoria del proceso antes de volver a probar Redis
+REDIS_CACHE_OPTIONS = {
+    'socket_connect_timeout': 0.25,  # Segundos para conectar
+    'socket_timeout': 0.25,  # Segundos por operación
+    'FAILURE_THRESHOLD': 5,
+    'RESET_TIMEOUT': 10,
+    'FALLBACK_MAX_ENTRIES': 1000,  # Entradas en memoria mientras el circuito está abierto
+}
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'BACKEND': 'core.cache_backends.ResilientRedisCache',
         'LOCATION': REDIS_URL,
-        'OPTIONS': {
-            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-        },
+        'OPTIONS': REDIS_CACHE_OPTIONS,
         'KEY_PREFIX': 'arc_manager',
         'TIMEOUT': 300,  # 5 minutos por defecto
     },
     # Cache específico para sesiones
     'sessions': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'BACKEND': 'core.cache_backends.ResilientRedisCache',
         'LOCATION': REDIS_URL,
-        'OPTIONS': {
-            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-        },
+        'OPTIONS': REDIS_CACHE_OPTIONS,
         'KEY_PREFIX': 'arc_sessions',
         'TIMEOUT': 86400,  # 24 horas
     }
 }
 
+# Cache de dos niveles (core.cache): LRU en memoria de cada worker delante de Redis
+CACHE_LOCAL_MAX_ENTRIES = 2000  # Entradas por worker
+CACHE_LOCAL_TIMEOUT = 5  # Vigencia por defecto de la copia en memoria (segundos)
+CACHE_TTL_JITTER = 0.1  # Hasta 10% menos de TTL en Redis: las claves creadas juntas no vencen juntas
+ORG_VERSION_LOCAL_TIMEOUT = 1  # Versiones de organización en memoria: otros workers ven la invalidación en <= 1 s
+ORG_SNAPSHOT_LOCAL_TIMEOUT = 60  # Snapshots (clave versionada, contenido inmutable)
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -384,6 +426,26 @@ DEFAULT_FROM_EMAIL = f'{SITE_NAME} <noreply@{SITE_DOMAIN}>'
 SERVER_EMAIL = f'admin@{SITE_DOMAIN}'
 ADMINS = [('Admin', 'admin@example.com')]  # Cambiar en producción
 
+# Outbox de emails (apps.main.outbox): los entrega el worker `manage.py send_outbox --loop`
+EMAIL_OUTBOX_BATCH_SIZE = 50  # Emails por lote (una conexión al backend por lote)
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5  # Intentos antes de marcar como fallido
+EMAIL_OUTBOX_RETRY_BASE = 60  # Backoff exponencial: 1, 2, 4, 8... minutos
+# Velocidad de envío en destinatarios/segundo (apps.main.mailer). Sin valor se usa
+# el MaxSendRate de SES (get_send_quota, cacheado 1 hora); en desarrollo no se dosifica
+EMAIL_SEND_RATE = os.environ.get('EMAIL_SEND_RATE')
+
+# Importación de usuarios (apps.users.importers): los CSV de resultado tienen emails;
+# vencen a las N horas y los borra el cron `manage.py clean_import_results`
+USER_IMPORT_RESULT_TTL_HOURS = 24
+
+# Recordatorios de vencimiento (apps.plans.reminders): cron nocturno `manage.py send_expiry_reminders`
+SUBSCRIPTION_REMINDER_DAYS = (14, 7, 3, 1)  # Umbrales de aviso a los admins, en días
+SUBSCRIPTION_ALERT_TTL_HOURS = 26  # Vigencia del banner precalculado (hasta la siguiente corrida)
+
+# Catálogo de planes en memoria (apps.plans.catalog): segundos entre comprobaciones
+# de la versión compartida en el cache; un cambio de Plan llega a todos los workers en ese plazo
+PLAN_CATALOG_CHECK_INTERVAL = 30
+
 if DEBUG:
     # Para desarrollo: mostrar emails en la consola
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
@@ -422,6 +484,10 @@ ADMIN_EMAIL = 'admin@tudominio.com'
 # URL del sitio para enlaces en emails
 SITE_URL = 'http://localhost:8000' if DEBUG else 'https://tudominio.com'
 
+# Changelists del admin (core.pagination): en PostgreSQL, las tablas con más filas
+# estimadas que este umbral muestran un conteo aproximado (≈) en lugar de COUNT(*)
+ADMIN_EXACT_COUNT_THRESHOLD = 10000
+
 # ========================================
 # CONFIGURACIONES ESPECÍFICAS PARA AWS BEANSTALK
 # ========================================
@@ -435,6 +501,9 @@ if IS_AWS_ENVIRONMENT:
     # Forzar HTTPS en producción
     SECURE_SSL_REDIRECT = True
     SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+
+    # El balanceador (ALB) agrega la IP real del cliente al final de X-Forwarded-For
+    RATELIMIT_TRUSTED_PROXIES = int(os.environ.get('RATELIMIT_TRUSTED_PROXIES', 1))
     
     # Configuración de cookies seguras
     SESSION_COOKIE_SECURE = True
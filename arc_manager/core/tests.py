@@ -0,0 +1,88 @@
+import math
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import CachedValue, LocalLRUCache, TwoTierCache
+from core.cache_backends import CLOSED, OPEN, ResilientRedisCache
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'core-cache'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'core-cache-sessions'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TwoTierCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = TwoTierCache(local=LocalLRUCache(max_size=10, ttl=60))
+        self.addCleanup(caches['default'].clear)
+
+    def test_get_or_set_without_timeout_never_expires(self):
+        value = self.cache.get_or_set('test:forever', lambda: 'valor', None)
+
+        self.assertEqual(value, 'valor')
+        entry = caches['default'].get('test:forever')
+        self.assertIsInstance(entry, CachedValue)
+        self.assertEqual(entry.expires, math.inf)
+        self.assertFalse(entry.should_refresh(now=1e12))
+
+        # Sin la copia local se lee del remoto sin recalcular
+        self.cache.clear_local()
+        self.assertEqual(self.cache.get_or_set('test:forever', lambda: 'otro', None), 'valor')
+        self.assertEqual(self.cache.stats.snapshot()['test']['recomputes'], 1)
+
+
+class ResilientRedisCacheTest(SimpleTestCase):
+    """Con Redis caído el circuito se abre y el cache responde desde memoria local"""
+
+    def setUp(self):
+        self.now = 0.0
+        # Nada escucha en el puerto 1: la conexión se rechaza en el acto
+        self.backend = ResilientRedisCache('redis://127.0.0.1:1/0', {
+            'KEY_PREFIX': 'breaker_test',
+            'OPTIONS': {
+                'socket_connect_timeout': 0.1,
+                'socket_timeout': 0.1,
+                'FAILURE_THRESHOLD': 2,
+                'RESET_TIMEOUT': 10,
+            },
+        })
+        self.backend.breaker.clock = lambda: self.now
+
+    def test_breaker_opens_and_serves_local_fallback(self):
+        with self.assertLogs('core.cache_backends', 'WARNING'):
+            self.assertIsNone(self.backend.get('clave'))
+            self.assertIsNone(self.backend.get('clave'))
+        self.assertEqual(self.backend.breaker.state, OPEN)
+
+        # Con el circuito abierto no se intenta Redis
+        with mock.patch.object(RedisCache, 'set') as redis_set, mock.patch.object(RedisCache, 'get') as redis_get:
+            self.backend.set('clave', 'local')
+            self.assertEqual(self.backend.get('clave'), 'local')
+        redis_set.assert_not_called()
+        redis_get.assert_not_called()
+
+        stats = self.backend.stats()
+        self.assertEqual(
+            {key: stats[key] for key in ('state', 'trips', 'errors', 'fallback_reads', 'fallback_writes')},
+            {'state': OPEN, 'trips': 1, 'errors': 2, 'fallback_reads': 3, 'fallback_writes': 1},
+        )
+
+    def test_half_open_probe_closes_circuit_and_drops_fallback(self):
+        with self.assertLogs('core.cache_backends', 'WARNING'):
+            for _ in range(2):
+                self.backend.get('clave')
+        self.backend.set('clave', 'local')
+
+        self.now += 10
+        with self.assertLogs('core.cache_backends', 'WARNING'), \
+                mock.patch.object(RedisCache, 'get', return_value='remoto'):
+            self.assertEqual(self.backend.get('clave'), 'remoto')
+
+        self.assertEqual(self.backend.breaker.state, CLOSED)
+        # Lo escrito durante la caída se descarta: Redis vuelve a ser la fuente
+        self.assertIsNone(self.backend.fallback.get('clave'))
@@ -4,6 +4,9 @@ from django.urls import path, include
 from django.shortcuts import redirect
 from django.conf.urls.static import static
 from django.http import JsonResponse
+from django.core.cache import caches
+from django.contrib.admin.views.decorators import staff_member_required
+from core.cache import tiered_cache
 
 def root_redirect(request):
     if not request.user.is_authenticated:
@@ -14,6 +17,20 @@ def health_check(request):
     """Endpoint for AWS Beanstalk health check"""
     return JsonResponse({'status': 'healthy', 'service': 'arc-manager'})
 
+@staff_member_required
+def cache_stats(request):
+    """Aciertos/fallos/latencia por namespace y estado de los circuit breakers (este worker)"""
+    return JsonResponse({
+        'local_entries': len(tiered_cache.local),
+        'namespaces': tiered_cache.stats.snapshot(),
+        # Estado del circuit breaker de cada alias (core.cache_backends)
+        'backends': {
+            alias: caches[alias].stats()
+            for alias in settings.CACHES
+            if hasattr(caches[alias], 'breaker')
+        },
+    })
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('apps.accounts.urls')),
@@ -23,6 +40,7 @@ urlpatterns = [
     path('plans/', include('apps.plans.urls')),
     path('projects/', include('apps.projects.urls')),
     path('health/', health_check, name='health_check'),
+    path('health/cache/', cache_stats, name='cache_stats'),
     path('', root_redirect),
 ]
 
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Catálogo de planes en memoria de cada worker (apps.plans.catalog)
+from apps.plans.catalog import warm_plan_catalog  # noqa: E402
+
+warm_plan_catalog()